@@ -3,14 +3,23 @@ import MTA_RP # MTA Remedy Path algorithm
 import MTP_NPaths # MTA N-Path algorithm
 import MTP_NPaths_BFS # MTA N-Path BFS algorithm
 import RSTA # Rapid Spanning Tree algorithm
+import STA # IEEE Rapid Spanning Tree algorithm (port roles)
 import DA # Dijkstra's algorithm
 import YA # Yen's Algorithm
+import FailureSweep # Single link failure sweep
+import Distances # All-pairs distance matrix cache
+import Instrumentation
 import logging
+import Tracer
 import networkx as nx
 from os.path import join as getFile
+from PathBundle import setVertexIndices
 
 LOG_FILE = "{}{}_Output.log"
 LOG_FILE_BATCH = "{}batch_test.csv"
+TRACE_FILE = "{}{}_Trace.{}"
+METRICS_FILE = "{}{}_Metrics.jsonl"
+PROFILE_PREFIX = "{}{}_Profile"
 
 '''
 Run the specified SPT algorithm with any included additional options
@@ -22,11 +31,34 @@ def runAlgorithmOnGraph(graph, args, logFilePath, nameOfTest, batch=False):
     # Make sure the root is the right type
     root = sanatizeRootType(args.root)
 
+    # Test the failure of every edge instead of a single run
+    if(args.sweep):
+        if(args.algorithm == "mta"):
+            setVertexLabels(graph, root)
+
+        FailureSweep.run(graph, root, args.algorithm, args.remedy, args.backups, logFilePath, nameOfTest, workers=args.workers)
+        return
+
+    # set where algorithm events are written
+    setTraceSinks(logFilePath, batch, nameOfTest, args.algorithm, args.trace)
+
+    # share the cached all-pairs distances of the graph with the algorithm
+    if(args.distance_cache):
+        graph.graph["distanceMatrix"] = Distances.getDistanceMatrix(graph, args.distance_cache, args.workers)
+
+    # measure the time and memory of each phase of the algorithm
+    if(args.measure or args.cprofile):
+        startInstrumentation(graph, logFilePath, nameOfTest, args.algorithm, args.cprofile)
+
     ## Run the specified algorithm
     # Rapid Spanning Tree Algorithm
     if(args.algorithm == "rsta"):
         RSTA.init(G=graph, r=root, logFilePath=logFilePath, batch=batch, testName=nameOfTest, removal=removedEdge(graph, args.remove))
 
+    # IEEE Rapid Spanning Tree Algorithm - port roles
+    elif(args.algorithm == "sta"):
+        STA.init(Graph=graph, root=root, logFilePath=logFilePath, batch=batch, testName=nameOfTest)
+
     # Meshed Tree Algorithm - N-Paths
     elif(args.algorithm == "npaths"):
         # If a valid edge is to be removed, it will be included in the analysis
@@ -44,15 +76,24 @@ def runAlgorithmOnGraph(graph, args, logFilePath, nameOfTest, batch=False):
 
     # Dijkstra's Algorithm
     elif(args.algorithm == "da"):
-        DA.init(Graph=graph, root=root, logFilePath=logFilePath, batch=batch, testName=nameOfTest)
+        DA.init(Graph=graph, root=root, logFilePath=logFilePath, batch=batch, testName=nameOfTest, stepModel=args.step_model)
 
     # Yen's Algorithm
     elif(args.algorithm == "ya"):
-        YA.init(baseGraph=graph, source=root, sink=args.target)
+        if(args.target is None):
+            # K shortest paths to every vertex, comparable to the N-Paths bundles (N = m+1)
+            YA.run(graph, root, args.backups + 1, logFilePath, nameOfTest, workers=args.workers)
+        else:
+            YA.init(baseGraph=graph, source=root, sink=args.target, K=args.backups + 1)
 
     else:
         raise nx.NetworkXError("Graph type is not valid")
 
+    Tracer.closeSinks()
+
+    if(Instrumentation.enabled):
+        stopInstrumentation(logFilePath, batch, nameOfTest, args.algorithm)
+
     return
 
 '''
@@ -94,6 +135,50 @@ def setLoggingLevel(logFilePath, batch, testName, algoName):
                                                           level=logging.WARNING)
     return
 
+'''
+Determine where algorithm events are written for a given simulation
+
+The text log is only written outside of batch testing (batch logs only keep the ERROR-level results),
+so batch runs skip building log messages entirely. A structured trace (jsonl or binary) can be added.
+'''
+def setTraceSinks(logFilePath, batch, testName, algoName, traceFormat=None):
+    if(testName):
+        testName = testName + "_"
+    else:
+        testName = ""
+
+    sinks = [] if batch else [Tracer.TextSink()]
+
+    if(traceFormat):
+        sinks.append(Tracer.SINKS[traceFormat](getFile(logFilePath, TRACE_FILE.format(testName, algoName, Tracer.SINK_EXTENSIONS[traceFormat]))))
+
+    Tracer.setSinks(sinks)
+    return
+
+'''
+Measure the wall time, CPU time and peak memory of each phase of a simulation
+
+Every run adds one JSON line to the metrics file (batch runs append to it), optionally with a cProfile dump per phase.
+'''
+def startInstrumentation(graph, logFilePath, testName, algoName, profile=False):
+    if(testName):
+        testName = testName + "_"
+    else:
+        testName = ""
+
+    profileFilePrefix = getFile(logFilePath, PROFILE_PREFIX.format(testName, algoName)) if profile else None
+    Instrumentation.start(graph, algoName, profileFilePrefix=profileFilePrefix)
+    return
+
+def stopInstrumentation(logFilePath, batch, testName, algoName):
+    if(testName):
+        testName = testName + "_"
+    else:
+        testName = ""
+
+    Instrumentation.write(Instrumentation.stop(), getFile(logFilePath, METRICS_FILE.format(testName, algoName)), append=batch)
+    return
+
 '''
 Create graph and node-wide structures for algorithm analysis
 
@@ -103,16 +188,22 @@ root = The root of the tree
 def setVertexLabels(Graph, root):
     IDCount = 0
     Graph.graph['ID_to_vertex'] = {} # Define a graph-wide dictionary to translate IDs back to vertices
+    Graph.graph['index_to_ID'] = [] # IDs are only used to write paths out to the log, paths store vertex indices
+
+    # Paths are built from integer vertex indices
+    setVertexIndices(Graph)
 
     for node in sorted(Graph.nodes):
         # Add a mapping in both directions, node --> ID (vertex-level) and ID --> node (graph-level)
         Graph.nodes[node]['ID'] = chr(65 + IDCount) # 65 is the decimal value for the character 'A'
         Graph.graph['ID_to_vertex'][chr(65 + IDCount)] = node
+        Graph.graph['index_to_ID'].append(chr(65 + IDCount))
 
-        if(node == root):
-            logging.warning("Root node is {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
-        else:
-            logging.warning("Non-Root node {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
+        if(Tracer.textEnabled):
+            if(node == root):
+                Tracer.text("Root node is {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
+            else:
+                Tracer.text("Non-Root node {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
 
         if(IDCount == 25): # jump to lowercase Latin alphabet
             IDCount += 7
@@ -121,6 +212,7 @@ def setVertexLabels(Graph, root):
         else:
             IDCount += 1
 
-    logging.warning("---------\n")
+    if(Tracer.textEnabled):
+        Tracer.text("---------\n")
 
     return
\ No newline at end of file
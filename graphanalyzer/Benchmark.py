@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+'''
+===========================
+ALGORITHM BENCHMARK SUITE
+===========================
+'''
+## Standard modules
+import copy
+import csv
+import json
+import logging
+import math
+from os.path import exists as fileExists
+from os.path import join as getFile
+
+## External modules
+import networkx as nx
+from networkx import NetworkXError
+from tabulate import tabulate # Printing formatted ASCII tables
+
+## Custom modules
+import DA # Dijkstra's algorithm
+import MTA_RP # MTA Remedy Path algorithm
+import MTP_NPaths # MTA N-Path algorithm
+import MTP_NPaths_BFS # MTA N-Path BFS algorithm
+import RSTA # Rapid Spanning Tree algorithm
+import STA # IEEE Rapid Spanning Tree algorithm (port roles)
+import GraphGenerator
+import Instrumentation
+import Tracer
+from Algorithms import setVertexLabels
+
+#
+# Constants
+#
+BENCHMARK_FILE = "{}benchmark.csv"
+BENCHMARK_COLUMNS = ["family", "size", "vertices", "edges", "algorithm", "wall_time", "cpu_time", "peak_memory", "steps", "messages", "regressions", "error"]
+BENCHMARK_METRICS = ["wall_time", "cpu_time", "peak_memory", "steps", "messages"]
+BENCHMARK_ALGORITHMS = ["da", "rsta", "sta", "mta", "npaths", "remedy", "bfs"] # remedy = MTA N-Paths with remedy paths
+GRAPH_FAMILIES = ["binomial", "smallWorld", "harary", "kRegular", "torus", "ring", "internet"]
+INTERNET_SIZES = range(1000, 10001) # The AS-level generator only supports these sizes
+MEASURED_PHASES = ("init", "convergence") # Result analysis (e.g. network survival) is not part of the cost
+
+# Regression thresholds, a metric regresses when it is more than threshold times its baseline value
+DEFAULT_THRESHOLDS = {"wall_time": 1.5, "cpu_time": 1.5, "peak_memory": 1.25, "steps": 1.0, "messages": 1.0}
+TIME_FLOOR = 0.05 # Times (in seconds) below this are too noisy to compare
+MEMORY_FLOOR = 64 * 1024 # Peak memory (in bytes) below this is too noisy to compare
+
+'''
+Run every algorithm on fixed-seed instances of each graph family and compare against a stored baseline
+
+benchmarkConfig = The "benchmark" object of the graph configuration:
+    seed = Seed of the random graph families
+    sizes = Number of vertices of each instance
+    families = Graph families to generate at each size (default: every GraphGenerator family)
+    clos = [k, t] of each folded-Clos instance
+    algorithms = Algorithms to run (default: all of BENCHMARK_ALGORITHMS)
+    backups = (MTA N-Paths) number of backup paths
+    repeats = Number of timed runs, the fastest is kept
+    memory = If an extra run measures the peak memory (tracemalloc slows a run down, so it is not timed)
+    baseline = File the baseline results are kept in
+    thresholds = Regression threshold of each metric (see DEFAULT_THRESHOLDS)
+logFilePath = Directory the results table is written to
+nameOfTest = Name prefixed to the results table
+algorithm = Only run this algorithm (None for all of them)
+storeBaseline = Store the results as the new baseline instead of comparing against it
+
+Returns the rows of the results table and the rows that regressed
+'''
+def run(benchmarkConfig, logFilePath, nameOfTest, algorithm=None, storeBaseline=False):
+    algorithms = [algorithm] if algorithm else benchmarkConfig.get("algorithms", BENCHMARK_ALGORITHMS)
+    thresholds = dict(DEFAULT_THRESHOLDS, **benchmarkConfig.get("thresholds", {}))
+    baselineFile = benchmarkConfig.get("baseline", "benchmark_baseline.json")
+
+    for name in algorithms:
+        if(name not in BENCHMARK_ALGORITHMS):
+            raise NetworkXError("Benchmark is only supported for {0}".format(", ".join(BENCHMARK_ALGORITHMS)))
+
+    baseline = {}
+    if(not storeBaseline and fileExists(baselineFile)):
+        with open(baselineFile) as file:
+            baseline = json.load(file)
+
+    # The suite only reports its own table, algorithm and generator logging is turned off (and put back afterwards)
+    disabledLevel = logging.root.manager.disable
+    sinks = Tracer.sinks
+    logging.disable(logging.CRITICAL)
+    Tracer.setSinks([])
+
+    rows = []
+    try:
+        for family, size, graph in generateInstances(benchmarkConfig):
+            for name in algorithms:
+                row = {"family": family, "size": size, "vertices": None, "edges": None, "algorithm": name, "regressions": "", "error": ""}
+
+                if(isinstance(graph, Exception)):
+                    row["error"] = "{0}: {1}".format(type(graph).__name__, graph)
+                else:
+                    row["vertices"] = graph.number_of_nodes()
+                    row["edges"] = graph.number_of_edges()
+                    row.update(measure(name, graph, benchmarkConfig))
+
+                row["regressions"] = " ".join(compare(row, baseline.get(getKey(row)), thresholds))
+                rows.append(row)
+
+                print("{family} {size} {algorithm}: {0}".format(row["error"] or "{:0.3f}s".format(row["wall_time"]), **row))
+    finally:
+        logging.disable(disabledLevel)
+        Tracer.setSinks(sinks)
+
+    regressions = [row for row in rows if row["regressions"]]
+    writeResults(rows, getFile(logFilePath, BENCHMARK_FILE.format(nameOfTest + "_" if nameOfTest else "")))
+
+    print(tabulate([[row[column] for column in BENCHMARK_COLUMNS] for row in rows], headers=BENCHMARK_COLUMNS))
+
+    if(storeBaseline):
+        with open(baselineFile, "w") as file:
+            json.dump({getKey(row): {metric: row.get(metric) for metric in BENCHMARK_METRICS} for row in rows if not row["error"]}, file, indent=4)
+        print("Baseline written to {0}".format(baselineFile))
+    elif(not baseline):
+        print("No baseline in {0} to compare against (run with --baseline to store one)".format(baselineFile))
+    elif(regressions):
+        print("{0} regression(s) against {1}".format(len(regressions), baselineFile))
+    else:
+        print("No regressions against {0}".format(baselineFile))
+
+    return rows, regressions
+
+'''
+Generate the fixed-seed instances of the suite, vertices are relabelled 0..n-1 (the root is vertex 0)
+
+Yields (family, size, graph), graph is the exception raised if the instance could not be generated
+'''
+def generateInstances(benchmarkConfig):
+    seed = benchmarkConfig.get("seed", 37)
+
+    for size in benchmarkConfig.get("sizes", [10, 100, 1000]):
+        for family in benchmarkConfig.get("families", GRAPH_FAMILIES):
+            if(family == "internet" and size not in INTERNET_SIZES):
+                continue
+
+            try:
+                graph = GraphGenerator.generateGraph(family, familyConfig(family, size), seed=seed, storeDirectory=benchmarkConfig.get("store"))
+            except NetworkXError as error:
+                graph = error
+            else:
+                graph = nx.convert_node_labels_to_integers(graph)
+
+            yield family, size, graph
+
+    for k, t in benchmarkConfig.get("clos", []):
+        # The top tier is built first, so vertex 0 is a top-of-fabric node
+        graph = nx.convert_node_labels_to_integers(GraphGenerator.generateFoldedClosGraph(k, t, None, None))
+
+        yield "foldedClos", "k{0}_t{1}".format(k, t), graph
+
+    return
+
+'''
+Generator options of a graph family for a number of vertices (the same options generateGraph reads)
+'''
+def familyConfig(family, n):
+    if(family == "binomial"):
+        # Well above the connectivity threshold, so most instances are biconnected
+        return {"numberOfVertices": n, "edgeProbability": min(1.0, 3*math.log(n)/n)}
+    elif(family == "smallWorld"):
+        return {"numberOfVertices": n, "connectedNearestNeighbors": 4, "rewiringProbability": 0.1}
+    elif(family == "harary"):
+        return {"nodeConnectivity": 3, "numberOfVertices": n}
+    elif(family == "kRegular"):
+        return {"sharedDegree": 4, "numberOfVertices": n}
+    elif(family == "torus"):
+        rows = max(3, math.isqrt(n))
+        return {"rowsOfVertices": rows, "columnsOfVertices": max(3, n // rows)}
+    elif(family == "ring"):
+        return {"numberOfVertices": n}
+    elif(family == "internet"):
+        return {"numberOfVertices": n}
+    else:
+        raise NetworkXError("Graph type is not valid")
+
+'''
+Converge an algorithm on a copy of the graph
+
+Returns the metrics of the run: the fastest wall and CPU time of the timed runs, the peak memory, the
+steps and the messages (deliveries) it took to converge
+'''
+def measure(algorithm, graph, benchmarkConfig):
+    metrics = {"wall_time": None, "cpu_time": None, "peak_memory": None, "steps": None, "messages": None}
+    messageCounter = Tracer.CountSink()
+
+    try:
+        for _ in range(benchmarkConfig.get("repeats", 3)):
+            messageCounter.counts.clear()
+            record = runAlgorithm(algorithm, graph, benchmarkConfig, memory=False, sinks=[messageCounter])
+            phases = [phase for phase in record["phases"] if phase["phase"] in MEASURED_PHASES]
+
+            wallTime = sum(phase["wall_time"] for phase in phases)
+            cpuTime = sum(phase["cpu_time"] for phase in phases)
+            metrics["wall_time"] = wallTime if metrics["wall_time"] is None else min(metrics["wall_time"], wallTime)
+            metrics["cpu_time"] = cpuTime if metrics["cpu_time"] is None else min(metrics["cpu_time"], cpuTime)
+
+            metrics["steps"] = phases[-1]["steps"]
+            metrics["messages"] = messageCounter.counts[Tracer.DELIVER]
+
+        if(benchmarkConfig.get("memory", True)):
+            record = runAlgorithm(algorithm, graph, benchmarkConfig, memory=True)
+            metrics["peak_memory"] = max(phase["peak_memory"] for phase in record["phases"] if phase["phase"] in MEASURED_PHASES)
+
+    except Exception as error:
+        # Record the algorithms that fail on an instance instead of stopping the suite
+        Instrumentation.stop()
+        metrics["error"] = "{0}: {1}".format(type(error).__name__, error)
+
+    finally:
+        Tracer.setSinks([])
+
+    return metrics
+
+def runAlgorithm(algorithm, graph, benchmarkConfig, memory, sinks=()):
+    Graph = copy.deepcopy(graph)
+    root = 0
+    m = benchmarkConfig.get("backups", 2)
+
+    Tracer.setSinks(sinks)
+    Instrumentation.start(Graph, algorithm, memory=memory)
+
+    if(algorithm == "da"):
+        DA.init(Graph=Graph, root=root, logFilePath="", batch=True)
+    elif(algorithm == "rsta"):
+        RSTA.init(G=Graph, r=root, logFilePath="", batch=True)
+    elif(algorithm == "sta"):
+        STA.init(Graph=Graph, root=root, logFilePath="", batch=True)
+    elif(algorithm == "mta"):
+        setVertexLabels(Graph, root)
+        MTA_RP.init(Graph=Graph, root=root, logFilePath="", batch=True)
+    elif(algorithm == "npaths"):
+        MTP_NPaths.init(Graph=Graph, root=root, logFilePath="", m=m, batch=True)
+    elif(algorithm == "remedy"):
+        MTP_NPaths.init(Graph=Graph, root=root, logFilePath="", remedyPaths=True, m=m, batch=True)
+    else:
+        setVertexLabels(Graph, root)
+        MTP_NPaths_BFS.init(Graph=Graph, root=root, m=m)
+
+    record = Instrumentation.stop()
+    Tracer.setSinks([])
+
+    return record
+
+'''
+Compare a result against its baseline
+
+Returns the metrics that regressed, as "metric xratio"
+'''
+def compare(row, baselineRow, thresholds):
+    regressions = []
+
+    if(not baselineRow or row["error"]):
+        return regressions
+
+    for metric in BENCHMARK_METRICS:
+        current = row.get(metric)
+        previous = baselineRow.get(metric)
+
+        if(current is None or not previous):
+            continue
+        if(metric in ("wall_time", "cpu_time") and max(current, previous) < TIME_FLOOR):
+            continue
+        if(metric == "peak_memory" and max(current, previous) < MEMORY_FLOOR):
+            continue
+
+        ratio = current / previous
+        if(ratio > thresholds[metric]):
+            regressions.append("{0} x{1:.2f}".format(metric, ratio))
+
+    return regressions
+
+def getKey(row):
+    return "{family}/{size}/{algorithm}".format(**row)
+
+'''
+Write the benchmark results as a table with one column per measurement and one row per instance and algorithm
+'''
+def writeResults(rows, fileName):
+    with open(fileName, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=BENCHMARK_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print("Benchmark results written to {0}".format(fileName))
+
+    return
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+'''
+===========================
+CSR GRAPH CORE
+===========================
+'''
+#
+# Constants
+#
+GRAPH_ATTRIBUTE = "csr" # Graph attribute the core of a graph is cached in
+
+'''
+Read-only adjacency core of a NetworkX graph, for the simulation hot paths
+
+The NetworkX graph stays the input/output format; the algorithms walk this core instead of the nested
+dictionary views of Graph.neighbors. Vertices are numbered in graph order (the order iterating the
+graph lists them), and every vertex keeps its neighbors in the graph's own adjacency order, so the
+algorithms visit and send in exactly the order they did on the NetworkX graph.
+
+    vertices = Vertex labels, by vertex number
+    index = Vertex label --> vertex number
+    neighborIndices = Neighbor numbers of each vertex, as a tuple per vertex number (DA, BFS)
+    neighborLabels = Vertex label --> tuple of its neighbors' labels (the message passing algorithms)
+    numOfEdges = Number of edges
+
+Only the adjacency lives here. The per-vertex state of the algorithms stays where it was: path bundles
+and labels are node attributes, and the RSTA/STA ports are in a PortTable.
+
+The algorithms never change the core. Edges are removed through Snapshot.removeEdge, which refreshes
+the rows of the two endpoints (see updateCSR), so a failure experiment costs no rebuild.
+'''
+class CSRGraph:
+    __slots__ = ("vertices", "index", "neighborIndices", "neighborLabels", "numOfEdges")
+
+    def __init__(self, Graph):
+        adjacency = Graph._adj
+
+        self.vertices = list(Graph)
+        self.index = {vertex: number for number, vertex in enumerate(self.vertices)}
+        self.neighborLabels = {vertex: tuple(adjacency[vertex]) for vertex in self.vertices}
+        self.neighborIndices = [tuple(map(self.index.__getitem__, self.neighborLabels[vertex])) for vertex in self.vertices]
+        self.numOfEdges = Graph.number_of_edges()
+
+    def __len__(self):
+        return len(self.vertices)
+
+    # Neighbor labels of a vertex, in the graph's adjacency order
+    def neighbors(self, vertex):
+        return self.neighborLabels[vertex]
+
+    def degree(self, vertex):
+        return len(self.neighborLabels[vertex])
+
+    # Read the rows of the given vertices from the graph again (after an edge between them was removed or put back)
+    def refresh(self, Graph, vertices):
+        adjacency = Graph._adj
+        change = 0
+
+        for vertex in vertices:
+            neighbors = tuple(adjacency[vertex])
+            change += len(neighbors) - len(self.neighborLabels[vertex])
+
+            self.neighborLabels[vertex] = neighbors
+            self.neighborIndices[self.index[vertex]] = tuple(map(self.index.__getitem__, neighbors))
+
+        self.numOfEdges += change // 2
+
+        return
+
+'''
+The core of a graph, built on first use and cached in Graph.graph["csr"]
+
+A cached core with a different number of vertices or edges than the graph (the graph was changed
+without updateCSR) is rebuilt. Counting the edges walks every vertex, so the algorithms call this once
+per phase and read the checked core with cachedCSR while passing messages.
+'''
+def getCSR(Graph):
+    core = Graph.graph.get(GRAPH_ATTRIBUTE)
+
+    if(core is None or len(core) != len(Graph._node) or core.numOfEdges != Graph.number_of_edges()):
+        core = CSRGraph(Graph)
+        Graph.graph[GRAPH_ATTRIBUTE] = core
+
+    return core
+
+# The core getCSR last checked for the graph, without checking it again (built if there is none)
+def cachedCSR(Graph):
+    core = Graph.graph.get(GRAPH_ATTRIBUTE)
+
+    if(core is None):
+        core = getCSR(Graph)
+
+    return core
+
+'''
+Bring the cached core of a graph (if any) up to date after edges between the given vertices changed
+
+Graph = The graph whose edges changed
+vertices = The endpoints of the changed edges
+'''
+def updateCSR(Graph, *vertices):
+    core = Graph.graph.get(GRAPH_ATTRIBUTE)
+
+    if(core is not None):
+        core.refresh(Graph, set(vertices))
+
+    return
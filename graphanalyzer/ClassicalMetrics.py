@@ -1,15 +1,113 @@
 # Standard modules
 import math
 import statistics
+from multiprocessing import Pool, cpu_count
 
 # External modules
 import networkx as nx # Graph creation and analysis
 import numpy as np # For all thinks linear algebra, matricies, etc and efficent memory usage compared to Py lists
-
-
-def calculateClassicalMetricsResults(G):
+import scipy.sparse as sparse # Sparse adjacency and Laplacian matrices
+from scipy.sparse.linalg import LinearOperator, eigsh, splu # Lanczos eigensolver for extremal eigenvalues, sparse LU
+
+# Custom modules
+import Distances # All-pairs BFS distances and their cache
+
+#
+# Constants
+#
+DENSE_SPECTRUM_LIMIT = 1000 # Up to this many vertices the full spectrum is computed, above it extremal eigenvalues use Lanczos
+EIGENVALUE_TOLERANCE = 1e-8 # Eigenvalues closer than this (relative to the spectral radius) are counted as one
+EXACT_SPANNING_TREE_LIMIT = 150 # Up to this many vertices the spanning trees are counted exactly with integers
+SPANNING_TREE_METHODS = ("exact", "lu")
+BETWEENNESS_CHUNK_SIZE = 128 # Brandes sources searched together (columns of the dense level matrices)
+BETWEENNESS_CHUNKS_PER_WORKER = 4 # Source chunks are handed out in several chunks per worker so uneven chunks balance out
+BETWEENNESS_CONFIDENCE = 0.1 # Probability that a sampled estimate misses its error budget on some vertex
+
+# Forward (predecessor to successor) and backward adjacency matrices of this process (Brandes' algorithm)
+betweennessForward = None
+betweennessBackward = None
+
+'''
+Spectral quantities of a graph, built once per graph and shared by the metrics that need them
+
+The adjacency and Laplacian matrices are kept sparse. Extremal eigenvalues (spectral radius, algebraic
+connectivity) of large graphs come from Lanczos iterations (eigsh), only the metrics that need every
+eigenvalue (the number of distinct eigenvalues) decompose the dense matrix. Every spectrum is cached
+the first time it is computed.
+'''
+class GraphSpectrum:
+    def __init__(self, G):
+        self.numOfVertices = G.number_of_nodes()
+        self.adjacency = nx.to_scipy_sparse_array(G, dtype=float, format="csr")
+
+        degrees = np.asarray(self.adjacency.sum(axis=1)).ravel()
+        self.laplacian = (sparse.diags(degrees) - self.adjacency).tocsr()
+
+        self.adjacencyEigenvalues = None # Full spectra in ascending order, computed on first use
+        self.laplacianEigenvalues = None
+
+    def isSmall(self):
+        return self.numOfVertices <= DENSE_SPECTRUM_LIMIT
+
+    # Every eigenvalue of the adjacency matrix, ascending
+    def getAdjacencyEigenvalues(self):
+        if(self.adjacencyEigenvalues is None):
+            self.adjacencyEigenvalues = np.linalg.eigvalsh(self.adjacency.toarray())
+
+        return self.adjacencyEigenvalues
+
+    # Every eigenvalue of the Laplacian matrix, ascending
+    def getLaplacianEigenvalues(self):
+        if(self.laplacianEigenvalues is None):
+            self.laplacianEigenvalues = np.linalg.eigvalsh(self.laplacian.toarray())
+
+        return self.laplacianEigenvalues
+
+    # Largest eigenvalue of the adjacency matrix
+    def spectralRadius(self):
+        if(self.adjacencyEigenvalues is not None or self.isSmall()):
+            return self.getAdjacencyEigenvalues()[-1]
+
+        return eigsh(self.adjacency, k=1, which="LA", return_eigenvectors=False)[0]
+
+    # Second smallest eigenvalue of the Laplacian matrix
+    def algebraicConnectivity(self):
+        if(self.laplacianEigenvalues is not None or self.isSmall()):
+            return self.getLaplacianEigenvalues()[1]
+
+        # The constant vector is the eigenvector of eigenvalue 0, so on the vectors orthogonal to it the
+        # smallest Laplacian eigenvalue is the algebraic connectivity. It is found as the largest eigenvalue
+        # of (bound*I - L) there, bound being at least the largest Laplacian eigenvalue (Gershgorin)
+        bound = 2 * self.laplacian.diagonal().max()
+
+        def shiftedLaplacian(vector):
+            vector = vector.ravel()
+            vector = vector - vector.mean()
+            result = bound * vector - self.laplacian @ vector
+            return result - result.mean()
+
+        operator = LinearOperator((self.numOfVertices, self.numOfVertices), matvec=shiftedLaplacian, dtype=float)
+        largest = eigsh(operator, k=1, which="LA", return_eigenvectors=False)[0]
+
+        return max(0.0, bound - largest)
+
+    # Number of distinct eigenvalues of the adjacency matrix (needs the full spectrum)
+    def distinctEigenvalueCount(self):
+        eigenvalues = self.getAdjacencyEigenvalues()
+        tolerance = EIGENVALUE_TOLERANCE * max(1.0, abs(eigenvalues).max())
+
+        return 1 + int(np.count_nonzero(np.diff(eigenvalues) > tolerance))
+
+
+'''
+G = The graph
+workers = Number of processes to spread the all-pairs BFS over (None for every core)
+cacheDirectory = Directory of the all-pairs distance cache (see Distances.getDistanceMatrix), None to not cache
+'''
+def calculateClassicalMetricsResults(G, workers=1, cacheDirectory=None):
     # Collect results for output
     results = []
+    spectrum = GraphSpectrum(G)
 
     # Get other graph-related information
     numOfVerticies = G.number_of_nodes()
@@ -27,13 +125,19 @@ def calculateClassicalMetricsResults(G):
     linkConnectivity = nx.edge_connectivity(G)
     results.append(["Link Connectivity", linkConnectivity])
 
-    algebraicConnectivity = nx.algebraic_connectivity(G)
+    algebraicConnectivity = spectrum.algebraicConnectivity()
     results.append(["Algebraic Connectivity", algebraicConnectivity])
 
-    graphDiameter = nx.diameter(G)
+    # One BFS sweep (or the cached distance matrix) for every distance metric
+    if(cacheDirectory):
+        distances = Distances.getDistanceMatrix(G, cacheDirectory, workers).summary()
+    else:
+        distances = Distances.DistanceSummary(G, spectrum.adjacency, workers)
+
+    graphDiameter = distances.diameter
     results.append(["Diameter", graphDiameter])
 
-    avgShortestPathLength = nx.average_shortest_path_length(G)
+    avgShortestPathLength = distances.averagePathLength
     results.append(["Average Shortest Path Length", avgShortestPathLength])
 
     assortativityCoefficient = nx.degree_pearson_correlation_coefficient(G)
@@ -42,8 +146,8 @@ def calculateClassicalMetricsResults(G):
     completeStatus = graphIsComplete(G)
     results.append(["Is the graph complete (full mesh)", completeStatus])
 
-    numOfSpanningTrees = SpanningTreeCount(G)
-    results.append(["Number of Possible Spanning Trees", numOfSpanningTrees])
+    numOfSpanningTrees = SpanningTreeCount(G, spectrum)
+    results.append(["Number of Possible Spanning Trees (log10)", numOfSpanningTrees])
 
     averageNodeDegree = graphDegreeAverage(G)
     results.append(["Average Nodal Degree", averageNodeDegree])
@@ -51,10 +155,10 @@ def calculateClassicalMetricsResults(G):
     heterogeneity = graphHeterogeneity(G)
     results.append(["Heterogeneity", heterogeneity])
 
-    spectralRadius = graphSpectralRadius(G)
+    spectralRadius = graphSpectralRadius(G, spectrum)
     results.append(["Spectral Radius (largest eigenvalue)", spectralRadius])
 
-    symmetryRatio = graphSymmetryRatio(G)
+    symmetryRatio = graphSymmetryRatio(G, spectrum, graphDiameter)
     results.append(["Symmetry Ratio", symmetryRatio])
 
     #TODO: Based on the paper, this needs to switch to being the transitivity function, not average_clustering
@@ -65,15 +169,100 @@ def calculateClassicalMetricsResults(G):
     return results
 
 
-def calculatePerNodeBetweennessCentrality(G):
+'''
+Normalized betweenness centrality of every vertex (the values of nx.betweenness_centrality), as [vertex, value] rows
+
+Brandes' algorithm runs from chunks of sources at a time: the BFS levels, path counts and dependencies of
+every source of a chunk are columns of dense matrices, and each level is one sparse matrix product. The
+chunks are spread over a process pool and their partial sums added up.
+
+With an error budget, only a sample of pivot sources is searched (Brandes and Pich) and the sums scaled
+up. The number of pivots, ln(2n/delta)/(2*epsilon^2), bounds the error of every vertex's value by
+epsilon with probability 1 - delta (Hoeffding's inequality over the vertices), so it does not grow with
+the size of the graph beyond the log factor.
+
+G = The graph
+workers = Number of processes to spread the sources over (None for every core)
+epsilon = Error budget of the sampled estimate (absolute, on the normalized values), None for the exact values
+delta = Probability of exceeding the error budget
+seed = Seed of the pivot sample
+'''
+def calculatePerNodeBetweennessCentrality(G, workers=1, epsilon=None, delta=BETWEENNESS_CONFIDENCE, seed=None):
     BC_results  = []
 
-    betweennessCentrality = nx.betweenness_centrality(G)
-    for key, value in betweennessCentrality.items():
+    vertices = list(G)
+    numOfVertices = len(vertices)
+    sources = list(range(numOfVertices))
+    scale = 1 / ((numOfVertices - 1) * (numOfVertices - 2)) if numOfVertices > 2 else 1
+
+    if(epsilon is not None):
+        numOfPivots = math.ceil(math.log(2 * numOfVertices / delta) / (2 * epsilon**2)) if numOfVertices > 2 else numOfVertices
+        if(numOfPivots < numOfVertices):
+            sources = np.random.default_rng(seed).choice(numOfVertices, size=numOfPivots, replace=False).tolist()
+            scale *= numOfVertices / numOfPivots
+
+    if(workers is None):
+        workers = cpu_count()
+    workers = max(1, min(workers, -(-len(sources) // BETWEENNESS_CHUNK_SIZE)))
+    chunkSize = BETWEENNESS_CHUNK_SIZE
+    if(workers > 1):
+        chunkSize = max(1, min(chunkSize, -(-len(sources) // (workers * BETWEENNESS_CHUNKS_PER_WORKER))))
+    chunks = [sources[i:i+chunkSize] for i in range(0, len(sources), chunkSize)]
+
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=vertices, weight=None, dtype=float, format="csr")
+    if(workers == 1):
+        initBetweennessWorker(adjacency)
+        betweenness = sum(map(brandesChunk, chunks), np.zeros(numOfVertices))
+    else:
+        with Pool(processes=workers, initializer=initBetweennessWorker, initargs=(adjacency,)) as pool:
+            betweenness = sum(pool.imap_unordered(brandesChunk, chunks), np.zeros(numOfVertices))
+
+    betweenness *= scale
+    for key, value in zip(vertices, betweenness.tolist()):
         BC_results.append([key,value])
 
     return BC_results
 
+def initBetweennessWorker(adjacency):
+    global betweennessForward, betweennessBackward
+
+    betweennessForward = adjacency.T.tocsr() # Sums over the predecessors of each vertex
+    betweennessBackward = adjacency # Sums over the successors of each vertex
+
+    return
+
+# Dependencies of every vertex on the sources of a chunk (Brandes' algorithm), summed over the sources
+def brandesChunk(sources):
+    numOfVertices = betweennessForward.shape[0]
+    columns = np.arange(len(sources))
+
+    # Level sets of the BFS from each source (one column per source) and the number of shortest paths to each vertex
+    reached = np.zeros((numOfVertices, len(sources)), dtype=bool)
+    reached[sources, columns] = True
+    pathCounts = reached.astype(float)
+    levels = [reached.copy()]
+
+    while True:
+        paths = betweennessForward @ (pathCounts * levels[-1])
+        frontier = (paths > 0) & ~reached
+        if(not frontier.any()):
+            break
+
+        reached |= frontier
+        pathCounts[frontier] = paths[frontier]
+        levels.append(frontier)
+
+    # Back up the levels: a vertex depends on each successor w by pathCount/pathCount(w) * (1 + dependency(w))
+    dependencies = np.zeros((numOfVertices, len(sources)))
+    for level in range(len(levels) - 1, 0, -1):
+        successors = levels[level]
+        shares = np.divide(1 + dependencies, pathCounts, out=np.zeros_like(dependencies), where=successors)
+        dependencies += levels[level - 1] * pathCounts * (betweennessBackward @ shares)
+
+    dependencies[sources, columns] = 0
+
+    return dependencies.sum(axis=1)
+
 
 def calculatePerDegreeAvgNeighborConnectivity(G):
     ANC_results = []
@@ -85,17 +274,102 @@ def calculatePerDegreeAvgNeighborConnectivity(G):
     return ANC_results
 
 
-# Kirchhoff's matrix tree theorem is implemented to count the number of spanning trees
-def SpanningTreeCount(G):
-    treeCount = 0
+'''
+Kirchhoff's matrix tree theorem is implemented to count the number of spanning trees, the count is the
+determinant of the Laplacian with one row and column removed (the reduced Laplacian).
+
+The count grows exponentially with the size of the graph, so log10 of it is returned (-inf when the
+graph is disconnected and has no spanning tree). It is computed by one of:
+
+    exact = Exact integer determinant (fraction-free elimination), small graphs
+    lu = Log-determinant from a sparse LU factorisation of the reduced Laplacian, large graphs
+
+method = One of the above, None for exact up to EXACT_SPANNING_TREE_LIMIT vertices and lu above it
+'''
+def SpanningTreeCount(G, spectrum=None, method=None):
+    logTreeCount = -math.inf
+
+    if(spectrum is None):
+        spectrum = GraphSpectrum(G)
+    if(method is None):
+        method = "exact" if spectrum.numOfVertices <= EXACT_SPANNING_TREE_LIMIT else "lu"
+    if(method not in SPANNING_TREE_METHODS):
+        raise ValueError("Unknown spanning tree count method {0}, expected one of {1}".format(method, SPANNING_TREE_METHODS))
 
-    laplacianMatrix = nx.laplacian_matrix(G).toarray()
-    laplacianSubMatrix = np.delete(laplacianMatrix, 0, 0)
-    laplacianSubMatrix = np.delete(laplacianSubMatrix, 0, 1)
+    if(spectrum.numOfVertices == 0 or not nx.is_connected(G)):
+        return logTreeCount
 
-    treeCount = np.linalg.det(laplacianSubMatrix)
+    if(method == "exact"):
+        logTreeCount = math.log10(exactSpanningTreeCount(G, spectrum))
+    else:
+        logTreeCount = logDetReducedLaplacian(spectrum.laplacian) / math.log(10)
 
-    return treeCount
+    return logTreeCount
+
+
+# Exact number of spanning trees, as a Python integer (no overflow, O(n^3) integer operations)
+def exactSpanningTreeCount(G, spectrum=None):
+    if(spectrum is None):
+        spectrum = GraphSpectrum(G)
+
+    laplacianSubMatrix = spectrum.laplacian[1:, 1:].toarray()
+    rows = [[int(round(value)) for value in row] for row in laplacianSubMatrix]
+
+    return bareissDeterminant(rows)
+
+
+'''
+Determinant of an integer matrix by fraction-free (Bareiss) elimination, every intermediate value stays
+an integer (the divisions are exact) and is bounded by a minor of the matrix.
+
+rows = The matrix as a list of lists of ints, it is modified in place
+'''
+def bareissDeterminant(rows):
+    size = len(rows)
+    sign = 1
+    previousPivot = 1
+
+    for k in range(size - 1):
+        # Swap in a row with a non-zero pivot, none means the matrix is singular
+        if(rows[k][k] == 0):
+            swap = next((i for i in range(k + 1, size) if rows[i][k] != 0), None)
+            if(swap is None):
+                return 0
+            rows[k], rows[swap] = rows[swap], rows[k]
+            sign = -sign
+
+        pivotRow = rows[k]
+        pivot = pivotRow[k]
+
+        for i in range(k + 1, size):
+            row = rows[i]
+            factor = row[k]
+
+            if(factor == 0):
+                # Only the scaling by pivot/previousPivot applies
+                for j in range(k + 1, size):
+                    row[j] = row[j] * pivot // previousPivot
+            else:
+                for j in range(k + 1, size):
+                    row[j] = (row[j] * pivot - factor * pivotRow[j]) // previousPivot
+            row[k] = 0
+
+        previousPivot = pivot
+
+    determinant = sign * rows[-1][-1] if size else 1
+
+    return determinant
+
+
+# Natural log of the determinant of the reduced Laplacian (positive definite for a connected graph)
+def logDetReducedLaplacian(laplacian):
+    laplacianSubMatrix = sparse.csc_matrix(laplacian[1:, 1:])
+
+    # The matrix is symmetric, so a symmetric fill-reducing ordering on the diagonal keeps the factors sparse
+    factors = splu(laplacianSubMatrix, permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+    logDeterminant = float(np.sum(np.log(np.abs(factors.U.diagonal()))))
+
+    return logDeterminant
 
 
 # Checking if the graph is complete / fully meshed
@@ -146,27 +420,27 @@ def graphHeterogeneity(G):
 
 
 # Largest eigenvalue of the adjacency matrix
-def graphSpectralRadius(G):
-    adjacencyMatrix = nx.to_numpy_matrix(G,dtype=int)
-
-    eigVals = np.linalg.eigvals(adjacencyMatrix)
-    eigVals = set(eigVals)
+def graphSpectralRadius(G, spectrum=None):
+    if(spectrum is None):
+        spectrum = GraphSpectrum(G)
 
-    spectralRadius = sorted(eigVals)[-1]
+    spectralRadius = spectrum.spectralRadius()
 
     return spectralRadius
 
 
-def graphSymmetryRatio(G):
+# Distinct eigenvalues of the adjacency matrix over the diameter + 1 (diameter is computed if not given)
+def graphSymmetryRatio(G, spectrum=None, diameter=None):
     symmetryRatio = 0
 
-    adjacencyMatrix = nx.to_numpy_matrix(G,dtype=int)
-    graphDiameter = nx.diameter(G) + 1
+    if(spectrum is None):
+        spectrum = GraphSpectrum(G)
+    if(diameter is None):
+        diameter = Distances.DistanceSummary(G, spectrum.adjacency).diameter
 
-    eigVals = np.linalg.eigvals(adjacencyMatrix)
-    numOfEigVals = len(set(eigVals)) # We only consider distinct eigenvalues
+    numOfEigVals = spectrum.distinctEigenvalueCount() # We only consider distinct eigenvalues
 
-    symmetryRatio = numOfEigVals/graphDiameter
+    symmetryRatio = numOfEigVals/(diameter + 1)
 
     return symmetryRatio
 
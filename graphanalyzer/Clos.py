@@ -6,6 +6,7 @@ import networkx as nx
 from copy import deepcopy
 from collections import defaultdict
 import ClosAddressing
+import Distances
 
 '''
 In the context of vertices/interfaces/ports, there is an upper tier, "north", and a lower tier, "south"
@@ -139,7 +140,7 @@ def logGraphInfo(graph, k, t, topTier):
                 logging.warning("\t\t{}".format(s))
 
 
-def testBlocking(graph, topTier):
+def testBlocking(graph, topTier, distanceMatrix=None, cacheDirectory=None):
 
     '''
     Check if you're in the same macro-pod:
@@ -154,6 +155,11 @@ def testBlocking(graph, topTier):
     '''
 
     blockingGraph = deepcopy(graph)
+
+    # Paths are walked down the rows of a distance matrix when one is given or cached, otherwise a few
+    # server pairs are not worth computing all-pairs distances for
+    if(distanceMatrix is None and cacheDirectory):
+        distanceMatrix = Distances.getDistanceMatrix(blockingGraph, cacheDirectory)
     servers = [server for server in blockingGraph if COMPUTE_NAME in server]
 
     # https://www.anycodings.com/1questions/804952/random-pairs-without-repeats-in-python-numpy-or-itertools
@@ -187,7 +193,7 @@ def testBlocking(graph, topTier):
             print(tofNodes)
 
             for node in tofNodes:
-                path = nx.shortest_path(G=blockingGraph, source=node, target=destination)
+                path = distanceMatrix.shortestPath(blockingGraph, node, destination) if distanceMatrix is not None else nx.shortest_path(G=blockingGraph, source=node, target=destination)
                 print("{} --> {}".format(node, destination))
                 print(path)
                 print(len(path))
@@ -203,7 +209,7 @@ def testBlocking(graph, topTier):
             print(spineNodes)
 
             for node in spineNodes:
-                path = nx.shortest_path(G=blockingGraph, source=node, target=destination)
+                path = distanceMatrix.shortestPath(blockingGraph, node, destination) if distanceMatrix is not None else nx.shortest_path(G=blockingGraph, source=node, target=destination)
 
     '''
     for pair in result:
@@ -4,96 +4,207 @@
 DIJKSTRA'S ALGORITHM
 ===========================
 '''
-from networkx import get_node_attributes
 from timeit import default_timer as timer # Get elasped time of execution
 from os.path import join as getFile
 import logging
+import Tracer
+import Instrumentation
+from CSRGraph import getCSR
 
 #
 # Constants
 #
 LOG_FILE = "{}DA_Output.log"
 LOG_FILE_BATCH = "{}batch_test.csv"
+INFINITY = float('inf')
 
-def init(Graph, root, logFilePath, batch=False, testName=None):
+# Step models
+TEXTBOOK_STEPS = "textbook"
+ACTUAL_STEPS = "actual"
+STEP_MODELS = (TEXTBOOK_STEPS, ACTUAL_STEPS)
+
+'''
+Dijkstra's algorithm, as the shortest path tree baseline for the meshed tree algorithms
+
+Graphs are unweighted, so every distance is a whole number of hops and the priority queue is a bucket
+queue: one bucket of vertices per distance, emptied in order. A bucket is complete by the time it is
+reached, so it is sorted once and its vertices are visited in graph order, the same order the linear
+minimum search visited tied vertices in. The search keeps its state in arrays over the graph's CSR core,
+and every vertex gets its "dist" and "parent" when it is done.
+
+Graph = The graph the algorithm is run on
+root = The root of the tree
+stepModel = How steps are counted:
+    textbook = One step per visited vertex, neighbor check and unvisited-set check (as counted before)
+    actual = One step per operation performed: each bucket insertion, vertex taken from a bucket and neighbor check
+'''
+def init(Graph, root, logFilePath, batch=False, testName=None, stepModel=TEXTBOOK_STEPS):
     #setLoggingLevel(logFilePath, batch, testName)
+    Instrumentation.phase("init")
+
+    if(stepModel not in STEP_MODELS):
+        raise ValueError("Step model must be one of {0}".format(", ".join(STEP_MODELS)))
+
+    textbookSteps = stepModel == TEXTBOOK_STEPS
 
     Graph.graph["DA"] = 0 # count number of iterations needed
     Graph.graph["DA_recv"] = 0
     Graph.graph["step"] = 0
+
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "init")
     Graph.graph["DA_time"] = 0 # Elasped algorithm simulation execution time
 
     EDGE_COST = 1 # graphs are unweighted, all edges have a cost of 1
 
-    Graph.nodes[root]["dist"] = 0 # Assign the root the distance value 0 because you don't need to go anyway to get to it (you start there)
-    Graph.nodes[root]["parent"] = "NONE"
-
-    for node in Graph:
-        if node != root:
-            Graph.nodes[node]["dist"] = float('inf') # All other nodes in the graph are given the place-holder distance of infinity
-            Graph.nodes[node]["parent"] = "udef"
-
-    Q = get_node_attributes(Graph, "dist") # unvisited set
+    # The search runs on the graph's CSR core, vertex numbers are positions in the graph, and ties in distance are broken by them
+    core = getCSR(Graph)
+    state = SearchState(core, core.index[root], textbookSteps)
 
     # START TIMER
     startTime = timer()
+    Instrumentation.phase("convergence")
 
-    # while Q is not empty, meaning there are still more nodes that haven't been discovered/marked
-    while Q:
-        Graph.graph["DA"] += 1
+    buckets = state.buckets
+    distance = 0
+    while distance < len(buckets):
+        bucket = sorted(buckets[distance])
+        buckets[distance] = None
 
-        # get the node with the lowest distance value, which starts with the root
-        v = min(Q, key=Q.get)
-        Graph.graph["step"] += 1
+        for v in bucket:
+            state.visit(v, EDGE_COST)
 
-        logging.warning("---------\n({0}) Visted Node: {1} | Distance: {2}\n".format(Graph.graph["DA"], v, Q[v]))    
+        distance += 1
 
-        # Now that the node has been "visted", it is deleted from the unvisited set
-        del Q[v]
-
-        # For each neighbor of v, update the distance from the root if it is lower than the previous distance
-        for u in Graph.neighbors(v):
-            neighborInfo = "\t({0})[distance: {1} | parent: {2}]: ".format(u, Graph.nodes[u]["dist"], Graph.nodes[u]["parent"])
-            
-            Graph.graph["step"] += 1 # For each neighbor check
-
-            if u in Q:
-                alt = Graph.nodes[v]["dist"] + EDGE_COST # distance = distance of v + 1 (unweighted edge cost)
-
-                if alt < Graph.nodes[u]["dist"]:
-                    Graph.nodes[u]["dist"] = alt
-                    Graph.nodes[u]["parent"] = v # parent node is now v, as that it how it gets back to root
-                    Q[u] = alt
-                    neighborInfo += "({0})distance ---> {1} | parent ---> {2}\n".format(Graph.graph["step"], alt, v)
-
-                    Graph.graph["DA_recv"] += 1
-                
-                else:
-                    neighborInfo += "({0})no change, higher cost path\n".format(Graph.graph["step"])
-            else:
-                neighborInfo += "already visited\n"
-
-            Graph.graph["step"] += 1 # For each Q check
-            
-            logging.warning(neighborInfo)
+    # Vertices the root cannot reach are visited last (at infinite distance), in graph order
+    for v in range(len(core)):
+        if not state.visited[v]:
+            state.visit(v, EDGE_COST)
 
     # STOP TIMER
     endTime = timer()
 
+    # The resulting SPT goes back onto the graph, every vertex gets a "dist" and "parent"
+    for vertex, distance, parent in zip(core.vertices, state.dist, state.parent):
+        Graph.nodes[vertex]["dist"] = distance
+        Graph.nodes[vertex]["parent"] = parent
+
+    Graph.graph["DA"] += state.numOfVisited
+    Graph.graph["DA_recv"] += state.numOfUpdates
+    Graph.graph["step"] += state.step
+
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "init")
+
     # For batch testing
     logging.error("{0},{1},{2}".format(Graph.number_of_nodes(), Graph.number_of_edges(), Graph.graph["step"]*Graph.number_of_nodes()))
 
     # log the resulting SPT and its associated data (node distance + parent)
-    result = getNodeInfo(Graph)
-    logging.warning("\n=====RESULT=====\n" + result)
+    if(Tracer.textEnabled):
+        Tracer.text("\n=====RESULT=====\n" + getNodeInfo(Graph))
+        Tracer.text("\nTime to execute: {0}".format(endTime - startTime))
 
-    logging.warning("\nTime to execute: {0}".format(endTime - startTime))
     Graph.graph["DA_time"] = endTime - startTime
 
-    logging.warning("steps: {}".format(Graph.graph["step"]))
+    if(Tracer.textEnabled):
+        Tracer.text("steps: {}".format(Graph.graph["step"]))
 
     return
 
+'''
+State of the search, in arrays indexed by vertex number (see CSRGraph)
+
+dist = Distance of each vertex from the root (infinity until it is reached)
+parent = Label of each vertex's parent ("NONE" for the root, "udef" until it is reached)
+visited = 1 for the vertices that have been visited, every other vertex is in the unvisited set
+buckets = buckets[d] = vertex numbers at distance d, waiting to be visited
+step, numOfVisited, numOfUpdates = Counters, added to the graph's "step", "DA" and "DA_recv" at the end
+'''
+class SearchState:
+    __slots__ = ("core", "dist", "parent", "visited", "buckets", "textbookSteps", "step", "numOfVisited", "numOfUpdates")
+
+    def __init__(self, core, root, textbookSteps):
+        numOfVertices = len(core)
+
+        self.core = core
+        self.dist = [INFINITY] * numOfVertices # All other nodes in the graph are given the place-holder distance of infinity
+        self.parent = ["udef"] * numOfVertices
+        self.dist[root] = 0 # Assign the root the distance value 0 because you don't need to go anyway to get to it (you start there)
+        self.parent[root] = "NONE"
+        self.visited = bytearray(numOfVertices)
+        self.buckets = [[root]]
+        self.textbookSteps = textbookSteps
+        self.step = 0
+        self.numOfVisited = 0
+        self.numOfUpdates = 0
+
+    '''
+    Visit the closest unvisited vertex v, putting any neighbor it gives a shorter distance in the bucket for that distance
+    '''
+    def visit(self, v, edgeCost):
+        core = self.core
+        dist = self.dist
+        parent = self.parent
+        visited = self.visited
+        buckets = self.buckets
+        vertices = core.vertices
+        vertex = vertices[v]
+
+        self.numOfVisited += 1
+        self.step += 1
+
+        if(Tracer.textEnabled):
+            Tracer.text("---------\n({0}) Visted Node: {1} | Distance: {2}\n".format(self.numOfVisited, vertex, dist[v]))
+
+        # Now that the node has been "visted", it is removed from the unvisited set
+        visited[v] = 1
+
+        # For each neighbor of v, update the distance from the root if it is lower than the previous distance
+        for u in core.neighborIndices[v]:
+            if(Tracer.textEnabled):
+                neighborInfo = "\t({0})[distance: {1} | parent: {2}]: ".format(vertices[u], dist[u], parent[u])
+
+            self.step += 1 # For each neighbor check
+
+            if not visited[u]:
+                alt = dist[v] + edgeCost # distance = distance of v + 1 (unweighted edge cost)
+
+                if(Tracer.enabled):
+                    Tracer.deliver(self.step, vertex, vertices[u], alt)
+
+                if alt < dist[u]:
+                    # Distances only ever drop from infinity, the first update is final, so u is put in its bucket once
+                    dist[u] = alt
+                    parent[u] = vertex # parent node is now v, as that it how it gets back to root
+
+                    if(alt == len(buckets)):
+                        buckets.append([])
+                    buckets[alt].append(u)
+
+                    if(not self.textbookSteps):
+                        self.step += 1 # For the bucket insertion
+
+                    if(Tracer.enabled):
+                        Tracer.bundleUpdate(self.step, vertices[u], {"dist": alt, "parent": vertex})
+                        Tracer.enqueue(self.step, vertices[u], len(vertices) - self.numOfVisited)
+                    if(Tracer.textEnabled):
+                        neighborInfo += "({0})distance ---> {1} | parent ---> {2}\n".format(self.step, alt, vertex)
+
+                    self.numOfUpdates += 1
+
+                elif(Tracer.textEnabled):
+                    neighborInfo += "({0})no change, higher cost path\n".format(self.step)
+            elif(Tracer.textEnabled):
+                neighborInfo += "already visited\n"
+
+            if(self.textbookSteps):
+                self.step += 1 # For each Q check
+
+            if(Tracer.textEnabled):
+                Tracer.text(neighborInfo)
+
+        return
+
 
 def getNodeInfo(Graph):
     output = ""
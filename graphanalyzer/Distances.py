@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+'''
+===========================
+ALL-PAIRS DISTANCES
+===========================
+'''
+## Standard modules
+import hashlib # Graph fingerprints
+import os
+from multiprocessing import Pool, cpu_count
+from os.path import join as getFile
+
+## External modules
+import networkx as nx
+import numpy as np
+
+#
+# Constants
+#
+DISTANCE_CHUNK_SIZE = 256 # BFS sources per batch (a multiple of 64, the sources of a batch are the bits of a few words)
+DISTANCE_CHUNKS_PER_WORKER = 4 # Source batches are handed out in several chunks per worker so uneven batches balance out
+CACHE_FILE = "{}_distances.npy" # Distance matrix of a graph in the cache directory, by fingerprint
+FINGERPRINT_VERSION = b"distances-1" # Part of every fingerprint, changing it invalidates the cache
+
+# Adjacency matrix and distance storage type of this process (all-pairs BFS)
+distanceAdjacency = None
+distanceType = None
+
+'''
+Distance metrics of a connected graph from a single all-pairs BFS sweep
+
+The BFS runs from every vertex once, in batches of sources (spread over a process pool when there is more
+than one worker). The sources of a batch are searched together, bit-parallel: each vertex keeps one bit
+per source in a few 64-bit words, and a BFS level ORs the frontier words of every vertex's neighbors. Each
+batch is reduced to its eccentricities, distance sum and distance histogram before the next one.
+Distances are stored in the smallest unsigned type that holds the longest possible one, bounded by twice
+the eccentricity of the first vertex (uint8 for the diameters of nearly every topology), which is also
+the type of the full distance matrix when it is kept.
+
+G = The graph
+adjacency = Sparse adjacency matrix of G in list(G) vertex order (e.g. GraphSpectrum.adjacency), built if not given
+workers = Number of processes to spread the BFS sources over (None for every core)
+keepDistances = Keep the full distance matrix (n^2 entries of the distance type) as self.distances
+out = Array to write the distance matrix into instead (e.g. a memory-mapped file), implies keepDistances
+matrix = A DistanceMatrix already computed for G, its rows are reduced instead of running the BFS
+'''
+class DistanceSummary:
+    def __init__(self, G, adjacency=None, workers=1, keepDistances=False, out=None, matrix=None):
+        self.vertices = list(G) if matrix is None else matrix.vertices
+        self.numOfVertices = len(self.vertices)
+
+        if(self.numOfVertices == 0):
+            raise nx.NetworkXPointlessConcept("The distance metrics of the null graph are not defined")
+
+        if(matrix is not None):
+            self.distanceType = matrix.distances.dtype.type
+        elif(out is not None):
+            self.distanceType = out.dtype.type
+        else:
+            adjacency = adjacencyMatrix(G, self.vertices, adjacency)
+            self.distanceType = graphDistanceType(adjacency)
+        keepDistances = keepDistances or out is not None
+        sources = list(range(self.numOfVertices))
+
+        if(workers is None):
+            workers = cpu_count()
+        workers = max(1, min(workers, -(-self.numOfVertices // DISTANCE_CHUNK_SIZE)))
+        if(matrix is not None):
+            workers = 1 # The rows are only read back
+        chunkSize = DISTANCE_CHUNK_SIZE
+        if(workers > 1):
+            chunkSize = max(1, min(chunkSize, -(-self.numOfVertices // (workers * DISTANCE_CHUNKS_PER_WORKER))))
+        chunks = [(sources[i:i+chunkSize], keepDistances) for i in range(0, self.numOfVertices, chunkSize)]
+
+        if(matrix is not None):
+            results = (reduceRows(chunkSources, matrix.distances[chunkSources[0]:chunkSources[-1] + 1], False) for chunkSources, _ in chunks)
+        elif(workers == 1):
+            initDistanceWorker(adjacency, self.distanceType)
+            results = map(bfsChunk, chunks)
+        else:
+            pool = Pool(processes=workers, initializer=initDistanceWorker, initargs=(adjacency, self.distanceType))
+            results = pool.imap(bfsChunk, chunks)
+
+        self.eccentricities = np.empty(self.numOfVertices, dtype=self.distanceType)
+        self.histogram = np.zeros(self.numOfVertices, dtype=np.int64) # Ordered vertex pairs at each distance
+        self.distances = None
+        if(matrix is not None):
+            self.distances = matrix.distances
+        elif(out is not None):
+            self.distances = out
+        elif(keepDistances):
+            self.distances = np.empty((self.numOfVertices, self.numOfVertices), dtype=self.distanceType)
+        distanceSum = 0
+
+        try:
+            for (chunkSources, _), (eccentricities, chunkSum, histogram, distances) in zip(chunks, results):
+                rows = slice(chunkSources[0], chunkSources[-1] + 1)
+
+                self.eccentricities[rows] = eccentricities
+                self.histogram[:len(histogram)] += histogram
+                distanceSum += chunkSum
+                if(distances is not None):
+                    self.distances[rows] = distances
+        finally:
+            if(workers > 1):
+                pool.terminate()
+
+        self.diameter = int(self.eccentricities.max())
+        self.radius = int(self.eccentricities.min())
+        self.histogram = self.histogram[:self.diameter + 1]
+        numOfPairs = self.numOfVertices * (self.numOfVertices - 1)
+        self.averagePathLength = distanceSum / numOfPairs if numOfPairs else 0
+
+    def getEccentricities(self):
+        return dict(zip(self.vertices, self.eccentricities.tolist()))
+
+    def getDistance(self, u, v):
+        if(self.distances is None):
+            raise ValueError("The distance matrix was not kept, build the summary with keepDistances=True")
+
+        return int(self.distances[self.vertices.index(u), self.vertices.index(v)])
+
+
+'''
+All-pairs hop distances of a connected graph, rows and columns in list(G) vertex order
+
+The matrix is either held in memory or memory-mapped read-only from the cache (see getDistanceMatrix).
+A memory-mapped matrix is pickled as its file name, so handing it to worker processes maps the same
+file (and the same pages of the OS cache) instead of copying it.
+
+vertices = The vertices of the graph, in matrix order
+distances = The distance matrix (NumPy array or memmap, uint8/uint16/uint32)
+fingerprint = Fingerprint of the graph the matrix was computed for (see graphFingerprint)
+numOfEdges = Number of edges of that graph
+path = File the matrix is mapped from, None if it is in memory
+'''
+class DistanceMatrix:
+    def __init__(self, vertices, distances, fingerprint, numOfEdges, path=None):
+        self.vertices = vertices
+        self.index = {vertex: index for index, vertex in enumerate(vertices)}
+        self.distances = distances
+        self.fingerprint = fingerprint
+        self.numOfEdges = numOfEdges
+        self.path = path
+
+    def distance(self, u, v):
+        return int(self.distances[self.index[u], self.index[v]])
+
+    # Row of distances from a vertex to every vertex (matrix order)
+    def row(self, vertex):
+        return self.distances[self.index[vertex]]
+
+    # {vertex: distance} for the vertices at most cutoff hops from a vertex (like single_source_shortest_path_length)
+    def within(self, vertex, cutoff=None):
+        row = self.row(vertex)
+        if(cutoff is None):
+            return dict(zip(self.vertices, row.tolist()))
+
+        close = np.flatnonzero(row <= cutoff)
+        return {self.vertices[index]: distance for index, distance in zip(close.tolist(), row[close].tolist())}
+
+    '''
+    A shortest path from the source to the target, following neighbors one hop closer to the target
+
+    Costs the length of the path times the degrees along it, no search is run.
+    '''
+    def shortestPath(self, G, source, target):
+        distances = self.row(target)
+        path = [source]
+
+        while path[-1] != target:
+            current = distances[self.index[path[-1]]]
+            path.append(next(neighbor for neighbor in G.neighbors(path[-1]) if distances[self.index[neighbor]] == current - 1))
+
+        return path
+
+    # Whether the matrix was computed for this graph (the counts rule out most changed graphs before the fingerprint is taken)
+    def matches(self, G):
+        return G.number_of_nodes() == len(self.vertices) and G.number_of_edges() == self.numOfEdges and graphFingerprint(G) == self.fingerprint
+
+    def summary(self):
+        return DistanceSummary(None, matrix=self)
+
+    def __reduce__(self):
+        if(self.path is None):
+            return (DistanceMatrix, (self.vertices, self.distances, self.fingerprint, self.numOfEdges))
+
+        return (openDistanceMatrix, (self.vertices, self.path, self.fingerprint, self.numOfEdges))
+
+    def __len__(self):
+        return len(self.vertices)
+
+'''
+Distance matrix of a graph, read from the cache directory when it was computed before
+
+The matrix is cached as a .npy file named by the graph's fingerprint and memory-mapped read-only, so
+repeated runs (and the worker processes of a run) share one copy instead of each rebuilding it. A
+20k-vertex graph takes 400 MB of uint8 on disk and only the rows that are read are paged in. Without
+a cache directory the matrix is computed in memory.
+
+G = The graph (connected)
+cacheDirectory = Directory of the cache, created if needed (None to not cache)
+workers = Number of processes to spread the BFS over when the matrix has to be computed
+'''
+def getDistanceMatrix(G, cacheDirectory=None, workers=1):
+    vertices = list(G)
+    fingerprint = graphFingerprint(G)
+
+    if(cacheDirectory is None):
+        distances = DistanceSummary(G, workers=workers, keepDistances=True).distances
+        return DistanceMatrix(vertices, distances, fingerprint, G.number_of_edges())
+
+    os.makedirs(cacheDirectory, exist_ok=True)
+    path = getFile(cacheDirectory, CACHE_FILE.format(fingerprint))
+
+    if(not os.path.exists(path)):
+        # Written under a temporary name and renamed when complete, so a cut short run never leaves a partial matrix
+        temporaryPath = "{0}.{1}.tmp".format(path, os.getpid())
+        numOfVertices = len(vertices)
+        adjacency = adjacencyMatrix(G, vertices)
+        out = np.lib.format.open_memmap(temporaryPath, mode="w+", dtype=graphDistanceType(adjacency), shape=(numOfVertices, numOfVertices))
+
+        try:
+            DistanceSummary(G, adjacency, workers, out=out)
+            out.flush()
+            del out
+            os.replace(temporaryPath, path)
+        except BaseException:
+            del out
+            os.remove(temporaryPath)
+            raise
+
+    return openDistanceMatrix(vertices, path, fingerprint, G.number_of_edges())
+
+# Map a cached distance matrix read-only
+def openDistanceMatrix(vertices, path, fingerprint, numOfEdges):
+    return DistanceMatrix(vertices, np.load(path, mmap_mode="r"), fingerprint, numOfEdges, path)
+
+'''
+Fingerprint of a graph's structure, the same for the same vertices (in the same order) and edges
+
+A SHA-256 hash of the vertex labels and the edges as pairs of vertex positions. Attributes (weights,
+names) are left out, the distances are hop counts.
+'''
+def graphFingerprint(G):
+    vertices = list(G)
+    index = {vertex: position for position, vertex in enumerate(vertices)}
+
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    if(not G.is_directed()):
+        edges.sort(axis=1)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+
+    fingerprint = hashlib.sha256(FINGERPRINT_VERSION)
+    fingerprint.update(b"directed" if G.is_directed() else b"undirected")
+    fingerprint.update("\0".join(repr(vertex) for vertex in vertices).encode())
+    fingerprint.update(edges.tobytes())
+
+    return fingerprint.hexdigest()
+
+# Storage type for the distances of a connected graph, its diameter is at most twice the eccentricity of any vertex
+def graphDistanceType(adjacency):
+    initDistanceWorker(adjacency, np.uint64)
+    eccentricity = int(bfsChunk(([0], False))[0][0])
+
+    return distanceStorageType(2 * eccentricity)
+
+# Smallest unsigned type holding distances up to the longest one
+def distanceStorageType(longestDistance):
+    for distanceType in (np.uint8, np.uint16, np.uint32):
+        if(longestDistance <= np.iinfo(distanceType).max):
+            return distanceType
+
+    return np.uint64
+
+def adjacencyMatrix(G, vertices, adjacency=None):
+    if(adjacency is None):
+        adjacency = nx.to_scipy_sparse_array(G, nodelist=vertices, format="csr")
+
+    return adjacency
+
+def initDistanceWorker(adjacency, storageType):
+    global distanceAdjacency, distanceType
+
+    distanceAdjacency = adjacency
+    distanceType = storageType
+
+    return
+
+# BFS from each source of a chunk, reduced to (eccentricities, distance sum, histogram, distances or None)
+def bfsChunk(chunk):
+    sources, keepDistances = chunk
+    numOfVertices = distanceAdjacency.shape[0]
+    indptr, indices = distanceAdjacency.indptr, distanceAdjacency.indices
+    numOfWords = -(-len(sources) // 64)
+
+    # Bit i of a vertex's words is set once the BFS from the i-th source has reached it
+    sourceBits = np.arange(len(sources))
+    visited = np.zeros((numOfVertices, numOfWords), dtype="<u8")
+    visited[sources, sourceBits // 64] = np.left_shift(np.uint64(1), (sourceBits % 64).astype(np.uint64))
+    frontier = visited.copy()
+
+    # Vertices without neighbors have an empty segment, reduceat would hand back the segment start instead
+    isolated = np.diff(indptr) == 0
+    segmentStarts = np.minimum(indptr[:-1], max(len(indices) - 1, 0))
+
+    distances = np.zeros((numOfVertices, numOfWords * 64), dtype=distanceType)
+
+    while len(indices) and frontier.any():
+        # Every vertex not reached yet is at least one more level away (cheaper than writing each level's vertices)
+        distances += np.unpackbits((~visited).view(np.uint8), axis=1, bitorder="little")
+
+        reached = np.bitwise_or.reduceat(frontier[indices], segmentStarts, axis=0)
+        reached[isolated] = 0
+        frontier = reached & ~visited
+        visited |= frontier
+
+    if(not np.unpackbits(visited.view(np.uint8), axis=1, bitorder="little")[:, :len(sources)].all()):
+        raise nx.NetworkXError("Found infinite path length because the graph is not connected")
+
+    distances = np.ascontiguousarray(distances[:, :len(sources)].T) # One row per source
+
+    return reduceRows(sources, distances, keepDistances)
+
+# Eccentricities, distance sum and histogram of the distance rows of some sources (and the rows if they are kept)
+def reduceRows(sources, distances, keepDistances):
+    eccentricities = distances.max(axis=1)
+    histogram = np.bincount(distances.ravel())
+    histogram[0] -= len(sources) # The sources themselves
+
+    return eccentricities, int(distances.sum(dtype=np.int64)), histogram, distances if keepDistances else None
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+'''
+===========================
+BINARY EVENT LOG REPLAY
+===========================
+
+Reads the binary traces written with --trace binary (see Tracer.BinarySink) to rebuild the state
+of a run at any step, count the steps of each phase and find where two runs diverge.
+
+usage: python EventLog.py steps run.trace
+       python EventLog.py state run.trace step [--phase phaseNumber] [--vertex vertex]
+       python EventLog.py diff run1.trace run2.trace
+'''
+## Standard modules
+import argparse
+import json
+import struct
+import sys
+
+## External modules
+import numpy as np
+
+## Custom modules
+import Tracer
+
+#
+# Constants
+#
+# Records are read straight into a structured array, the layout matches Tracer.BINARY_RECORD
+RECORD_DTYPE = np.dtype([("event", "u1"), ("pad", "V3"), ("step", "<u4"), ("vertex", "<i4"), ("other", "<i4"), ("payload", "<i4")])
+PHASE_CODE = Tracer.BINARY_EVENT_CODES[Tracer.PHASE]
+PHASE_END_CODE = Tracer.BINARY_EVENT_CODES[Tracer.PHASE_END]
+BUNDLE_UPDATE_CODE = Tracer.BINARY_EVENT_CODES[Tracer.BUNDLE_UPDATE]
+ROLE_CHANGE_CODE = Tracer.BINARY_EVENT_CODES[Tracer.ROLE_CHANGE]
+UNNAMED_PHASE = "unnamed" # Events written before the first phase event
+
+'''
+A binary event log loaded into memory
+
+records = Structured array of the records, in the order they were written
+strings = The interned string table (vertex names and JSON payloads)
+phases = Name of each phase, in the order they started
+phaseOfRecord = Index in phases of the phase each record belongs to
+'''
+class EventLog:
+    def __init__(self, fileName):
+        with open(fileName, "rb") as file:
+            header = file.read(Tracer.BINARY_HEADER.size)
+            magic, version, recordSize, numOfRecords, stringTableOffset = Tracer.BINARY_HEADER.unpack(header)
+
+            if(magic != Tracer.BINARY_MAGIC or version != Tracer.BINARY_VERSION or recordSize != RECORD_DTYPE.itemsize):
+                raise ValueError("{0} is not a version {1} binary trace".format(fileName, Tracer.BINARY_VERSION))
+            if(stringTableOffset == 0):
+                raise ValueError("{0} was not closed, its string table is missing".format(fileName))
+
+            self.records = np.fromfile(file, dtype=RECORD_DTYPE, count=numOfRecords)
+
+            file.seek(stringTableOffset)
+            self.strings = readStrings(file)
+
+        # Each phase event starts a new phase, records before the first one belong to an unnamed phase
+        isPhase = self.records["event"] == PHASE_CODE
+        self.phases = [self.strings[index] for index in self.records["payload"][isPhase]]
+        self.phaseOfRecord = np.cumsum(isPhase) - 1
+
+        if(len(self.records) and not isPhase[0]):
+            self.phases.insert(0, json.dumps(UNNAMED_PHASE))
+            self.phaseOfRecord += 1
+
+        self.phases = [json.loads(name) for name in self.phases]
+        self.payloads = {} # string table index --> decoded payload, filled as payloads are needed
+
+    def __len__(self):
+        return len(self.records)
+
+    def getString(self, index):
+        return None if index == Tracer.NO_STRING else self.strings[index]
+
+    def getPayload(self, index):
+        if(index == Tracer.NO_STRING):
+            return None
+
+        if(index not in self.payloads):
+            self.payloads[index] = json.loads(self.strings[index])
+
+        return self.payloads[index]
+
+    # The record at the given position as a dictionary (the same fields as the JSONL trace)
+    def getRecord(self, position):
+        record = self.records[position]
+
+        return {"event": Tracer.EVENT_TYPES[record["event"]], "step": int(record["step"]), "vertex": self.getString(record["vertex"]), "other": self.getString(record["other"]), "payload": self.getPayload(record["payload"]), "phase": int(self.phaseOfRecord[position])}
+
+    '''
+    Steps and number of events of each phase
+
+    Returns a list of (phase name, steps, {event type: count}), where steps is the final step count
+    the algorithm recorded at the end of the phase. Traces without phase-end events (written before
+    they existed) fall back to the largest step of the phase's events, which misses the steps counted
+    after the last event.
+    '''
+    def phaseSteps(self):
+        results = []
+
+        for phase, name in enumerate(self.phases):
+            records = self.records[self.phaseOfRecord == phase]
+            counts = np.bincount(records["event"], minlength=len(Tracer.EVENT_TYPES))
+
+            ends = records["step"][records["event"] == PHASE_END_CODE]
+            if(len(ends)):
+                steps = int(ends[-1])
+            else:
+                steps = int(records["step"].max()) if len(records) else 0
+            results.append((name, steps, {event: int(counts[code]) for code, event in enumerate(Tracer.EVENT_TYPES) if counts[code]}))
+
+        return results
+
+    '''
+    Rebuild the state of every vertex from the bundle updates and role changes up to a step
+
+    step = The last step to include (None for the end of the phase)
+    phase = Index of the phase the step belongs to (None for the last phase)
+
+    Returns {vertex: {"bundle": last bundle update, "roles": {port: role}}}, the state carries over
+    from earlier phases as the algorithms do
+    '''
+    def stateAt(self, step=None, phase=None):
+        if(phase is None):
+            phase = len(self.phases) - 1
+
+        # Everything from earlier phases plus the records of this phase up to the step
+        included = self.phaseOfRecord < phase
+        if(step is None):
+            included |= self.phaseOfRecord == phase
+        else:
+            included |= (self.phaseOfRecord == phase) & (self.records["step"] <= step)
+
+        state = {}
+        for position in np.flatnonzero(included & np.isin(self.records["event"], (BUNDLE_UPDATE_CODE, ROLE_CHANGE_CODE))):
+            record = self.records[position]
+            vertexState = state.setdefault(self.strings[record["vertex"]], {"bundle": None, "roles": {}})
+
+            if(record["event"] == BUNDLE_UPDATE_CODE):
+                vertexState["bundle"] = self.getPayload(record["payload"])
+            else:
+                vertexState["roles"][self.strings[record["other"]]] = self.getPayload(record["payload"])
+
+        return state
+
+    # String table indices of this log translated to the indices of the same strings in another log (-2 if missing)
+    def translateStrings(self, other):
+        lookup = {string: index for index, string in enumerate(other.strings)}
+        translation = np.array([lookup.get(string, -2) for string in self.strings] + [Tracer.NO_STRING], dtype=np.int32)
+
+        return translation
+
+'''
+Read the string table at the current position of a binary trace
+'''
+def readStrings(file):
+    numOfStrings, = struct.unpack("<I", file.read(4))
+    strings = [None] * numOfStrings
+
+    for index in range(numOfStrings):
+        length, = struct.unpack("<I", file.read(4))
+        strings[index] = file.read(length).decode("utf-8")
+
+    return strings
+
+'''
+Compare two runs
+
+Returns a dictionary with:
+firstDifference = Position of the first record that differs (None if one log is a prefix of the other)
+phaseSteps = (phase name, steps of log 1, steps of log 2) for every phase whose step counts differ
+stateDifferences = {vertex: (final state in log 1, final state in log 2)} for vertices that ended differently
+'''
+def diff(log1, log2):
+    length = min(len(log1), len(log2))
+    records1 = log1.records[:length]
+    records2 = log2.records[:length]
+
+    # Strings are interned in the order they were first used, compare them through one table
+    translation = log1.translateStrings(log2)
+    differs = (records1["event"] != records2["event"]) | (records1["step"] != records2["step"])
+    for field in ("vertex", "other", "payload"):
+        differs |= translation[records1[field]] != records2[field]
+
+    positions = np.flatnonzero(differs)
+    if(len(positions)):
+        firstDifference = int(positions[0])
+    elif(len(log1) != len(log2)):
+        firstDifference = length
+    else:
+        firstDifference = None
+
+    steps1 = log1.phaseSteps()
+    steps2 = log2.phaseSteps()
+    phaseSteps = []
+    for phase in range(max(len(steps1), len(steps2))):
+        name, count1 = steps1[phase][:2] if phase < len(steps1) else (steps2[phase][0], None)
+        count2 = steps2[phase][1] if phase < len(steps2) else None
+
+        if(count1 != count2):
+            phaseSteps.append((name, count1, count2))
+
+    state1 = log1.stateAt()
+    state2 = log2.stateAt()
+    stateDifferences = {vertex: (state1.get(vertex), state2.get(vertex)) for vertex in state1.keys() | state2.keys() if state1.get(vertex) != state2.get(vertex)}
+
+    return {"firstDifference": firstDifference, "phaseSteps": phaseSteps, "stateDifferences": stateDifferences}
+
+'''
+Command line
+'''
+def parseArgs(arguments):
+    parser = argparse.ArgumentParser(description="Replay and compare binary algorithm traces (written with --trace binary).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    steps = commands.add_parser("steps", help="steps and event counts of each phase")
+    steps.add_argument("trace")
+
+    state = commands.add_parser("state", help="state of every vertex at a step")
+    state.add_argument("trace")
+    state.add_argument("step", type=int)
+    state.add_argument("--phase", type=int, metavar="phaseNumber", help="phase the step belongs to, counted from 0 (default: last)")
+    state.add_argument("--vertex", help="only show this vertex")
+
+    compare = commands.add_parser("diff", help="first diverging event, step count and final state differences of two runs")
+    compare.add_argument("trace1")
+    compare.add_argument("trace2")
+
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    args = parseArgs(arguments if arguments is not None else sys.argv[1:])
+
+    if(args.command == "steps"):
+        log = EventLog(args.trace)
+        for phase, (name, steps, counts) in enumerate(log.phaseSteps()):
+            print("Phase {0} ({1}): {2} steps, {3}".format(phase, name, steps, ", ".join("{0} {1}".format(count, event) for event, count in counts.items())))
+
+    elif(args.command == "state"):
+        log = EventLog(args.trace)
+        for vertex, vertexState in log.stateAt(args.step, args.phase).items():
+            if(args.vertex is None or vertex == args.vertex):
+                print("{0}: {1}".format(vertex, json.dumps(vertexState)))
+
+    else:
+        log1 = EventLog(args.trace1)
+        log2 = EventLog(args.trace2)
+        results = diff(log1, log2)
+
+        if(results["firstDifference"] is None):
+            print("Runs are identical ({0} events)".format(len(log1)))
+        else:
+            position = results["firstDifference"]
+            print("First difference at event {0}".format(position))
+            print("  1: {0}".format(log1.getRecord(position) if position < len(log1) else "end of log"))
+            print("  2: {0}".format(log2.getRecord(position) if position < len(log2) else "end of log"))
+
+        for name, steps1, steps2 in results["phaseSteps"]:
+            print("Phase {0}: {1} steps vs {2} steps".format(name, steps1, steps2))
+
+        for vertex, (state1, state2) in results["stateDifferences"].items():
+            print("{0}: {1} vs {2}".format(vertex, json.dumps(state1), json.dumps(state2)))
+
+    return
+
+if __name__ == "__main__":
+    main()
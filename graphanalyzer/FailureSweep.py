@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+'''
+===========================
+SINGLE LINK FAILURE SWEEP
+===========================
+'''
+## Standard modules
+import copy
+import csv
+import logging
+import os
+import sys
+from multiprocessing import Pool, cpu_count
+from os.path import join as getFile
+from timeit import default_timer as timer # Get elasped time of execution
+
+## Custom modules
+import MTA_RP # MTA Remedy Path algorithm
+import MTP_NPaths # MTA N-Path algorithm
+import RSTA # Rapid Spanning Tree algorithm
+import Tracer
+from Snapshot import Snapshot
+from networkx import NetworkXError
+
+#
+# Constants
+#
+SWEEP_FILE = "{}{}_sweep.csv"
+SWEEP_COLUMNS = ["vertex1", "vertex2", "recovery_steps", "num_stranded", "stranded_vertices", "is_tree", "wall_time", "error"]
+SWEEP_ALGORITHMS = ["mta", "npaths", "rsta"]
+CHUNKS_PER_WORKER = 4 # Edges are handed out in several chunks per worker so uneven failures balance out
+
+# Converged graph of this process and the snapshot every failure is rolled back to
+convergedGraph = None
+convergedSnapshot = None
+sweepSettings = None
+
+'''
+Converge the algorithm once, then test the failure of every edge from the converged state
+
+Graph = The graph the algorithm is run on
+root = The root of the tree
+algorithm = The algorithm to sweep (mta, npaths or rsta)
+remedyPaths = (N-Paths) If remedy paths are used instead of any paths
+m = (N-Paths) The number of backup paths
+logFilePath = Directory the results table is written to
+nameOfTest = Name prefixed to the results table
+workers = Number of processes to spread the edges over (None for every core)
+
+Returns the rows of the results table, one per edge, in the order the graph lists its edges
+'''
+def run(Graph, root, algorithm, remedyPaths, m, logFilePath, nameOfTest, workers=None):
+    if(algorithm not in SWEEP_ALGORITHMS):
+        raise NetworkXError("Sweep is only supported for {0}".format(", ".join(SWEEP_ALGORITHMS)))
+
+    settings = (root, algorithm, remedyPaths, m)
+    edges = list(Graph.edges)
+
+    if(workers is None):
+        workers = cpu_count()
+    workers = max(1, min(workers, len(edges)))
+
+    print("Sweeping {0} edge failures with {1} worker(s)".format(len(edges), workers))
+    start = timer()
+
+    if(workers == 1):
+        # The sweep runs in this process, its logging level, trace sinks and stdout are put back afterwards
+        disabledLevel = logging.root.manager.disable
+        sinks = Tracer.sinks
+        stdout = sys.stdout
+        try:
+            initWorker(Graph, settings)
+            rows = testEdges(edges)
+            convergedSnapshot.release()
+        finally:
+            if(sys.stdout is not stdout):
+                sys.stdout.close()
+            sys.stdout = stdout
+            logging.disable(disabledLevel)
+            Tracer.setSinks(sinks)
+    else:
+        # Each worker converges its own copy once, so no algorithm state has to be pickled across processes
+        chunkSize = -(-len(edges) // (workers * CHUNKS_PER_WORKER))
+        chunks = [edges[i:i+chunkSize] for i in range(0, len(edges), chunkSize)]
+
+        with Pool(processes=workers, initializer=initWorker, initargs=(Graph, settings)) as pool:
+            rows = [row for chunk in pool.map(testEdges, chunks) for row in chunk]
+
+    print("Sweep finished in {:0.2f} seconds".format(timer() - start))
+
+    writeResults(rows, getFile(logFilePath, SWEEP_FILE.format(nameOfTest + "_" if nameOfTest else "", algorithm)))
+
+    return rows
+
+'''
+Converge the algorithm on this process' copy of the graph (per-step logging and the algorithms' prints
+are turned off for the sweep)
+'''
+def initWorker(Graph, settings):
+    global convergedGraph, convergedSnapshot, sweepSettings
+
+    logging.disable(logging.CRITICAL)
+    Tracer.setSinks([])
+    sys.stdout = open(os.devnull, "w")
+
+    root, algorithm, remedyPaths, m = settings
+    convergedGraph = copy.deepcopy(Graph)
+    sweepSettings = settings
+
+    if(algorithm == "mta"):
+        MTA_RP.init(Graph=convergedGraph, root=root, logFilePath="", batch=True)
+    elif(algorithm == "npaths"):
+        MTP_NPaths.init(Graph=convergedGraph, root=root, logFilePath="", remedyPaths=remedyPaths, m=m, batch=True)
+    else:
+        RSTA.init(G=convergedGraph, r=root, logFilePath="", batch=True)
+
+    # RSTA changes its tree validator in place, the meshed tree algorithms work on a copy of theirs
+    convergedSnapshot = Snapshot(convergedGraph, convergedGraph.graph["treeValidator"])
+
+    return
+
+'''
+Test the failure of each given edge, rolling back to the converged state after each one
+'''
+def testEdges(edges):
+    return [testEdge(edge) for edge in edges]
+
+def testEdge(edge):
+    root, algorithm, remedyPaths, m = sweepSettings
+    vertex1, vertex2 = edge
+
+    Graph = convergedGraph
+    treeValidator = Graph.graph["treeValidator"]
+    row = {"vertex1": vertex1, "vertex2": vertex2, "recovery_steps": None, "num_stranded": None, "stranded_vertices": None, "is_tree": None, "wall_time": None, "error": ""}
+
+    start = timer()
+    try:
+        if(algorithm == "mta"):
+            recoveryTreeValidator = MTA_RP.failureLimitedRecovery(Graph, root, vertex1, vertex2, treeValidator)
+        elif(algorithm == "npaths"):
+            recoveryTreeValidator = MTP_NPaths.failureLimitedRecovery(Graph, root, vertex1, vertex2, treeValidator, remedyPaths, m + 1)
+        else:
+            recoveryTreeValidator = RSTA.failureReconvergence(Graph, root, vertex1, vertex2, treeValidator)
+    except Exception as error:
+        # Record any failure the algorithm cannot recover from instead of stopping the sweep (and losing the finished rows)
+        row["wall_time"] = timer() - start
+        row["error"] = "{0}: {1}".format(type(error).__name__, error)
+    else:
+        row["wall_time"] = timer() - start
+
+        strandedVertices = recoveryTreeValidator.getStrandedVertices()
+        row["recovery_steps"] = Graph.graph["step"]
+        row["num_stranded"] = len(strandedVertices)
+        row["stranded_vertices"] = " ".join(str(vertex) for vertex in strandedVertices)
+        row["is_tree"] = recoveryTreeValidator.isTree()
+
+    convergedSnapshot.restore()
+
+    return row
+
+'''
+Write the sweep results as a table with one column per measurement and one row per edge
+'''
+def writeResults(rows, fileName):
+    with open(fileName, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SWEEP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print("Sweep results written to {0}".format(fileName))
+
+    return
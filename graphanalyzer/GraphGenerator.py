@@ -1,17 +1,42 @@
 from random import seed
+import os
+import pickle
 import sys
 import Clos
+import GraphStore
 import networkx as nx
+from networkx.algorithms.connectivity import build_auxiliary_node_connectivity, local_node_connectivity
+from networkx.algorithms.flow import build_residual_network
 from os.path import join as getFile
 
+#
+# Constants
+#
+MIN_NODE_CONNECTIVITY = 2 # Generated graphs must stay connected after the failure of any single vertex
+DETERMINISTIC_GRAPHS = ["graphml", "leg", "foldedClos", "torus", "ring"] # Graph types that come out the same without a seed
+
 
 '''
 Generate a single graph to study
+
+storeDirectory = Directory of the graph store (see GraphStore), graphs that come out the same every time
+                 (seeded or deterministic, graphml files by content) are read from it instead of being
+                 generated again. None to always generate
 '''
-def generateGraph(graphType, graphConfig, seed=None, graphDirectory=None, logDirectory=None):
+def generateGraph(graphType, graphConfig, seed=None, graphDirectory=None, logDirectory=None, storeDirectory=None):
     maxAttempts = 25
     currentAttempt = 0
 
+    if(storeDirectory and (graphType in DETERMINISTIC_GRAPHS or seed is not None)):
+        content = None
+        if(graphType == "graphml"):
+            sourceFile = getFile(graphDirectory, graphConfig["fileName"])
+            content = GraphStore.fileDigest(sourceFile) if os.path.exists(sourceFile) else None
+
+        if(graphType != "graphml" or content):
+            key = GraphStore.graphKey(graphType, graphConfig, seed, content)
+            return GraphStore.getGraph(storeDirectory, graphType, key, lambda: generateGraph(graphType, graphConfig, seed, graphDirectory, logDirectory))
+
     if(graphType == "graphml"):
         return fromGraphml(getFile(graphDirectory, graphConfig["fileName"]))
     elif(graphType == "leg"):
@@ -58,6 +83,16 @@ def fromGraphml(sourceFile):
 
     return G
 
+'''
+Pickled NetworkX graph (networkx 3 removed read_gpickle, the files are plain pickles)
+sourceFile = the gpickle file, only load files you trust
+'''
+def fromGpickle(sourceFile):
+    with open(sourceFile, "rb") as file:
+        G = pickle.load(file)
+
+    return G
+
 '''
 Graphml Graph (export)
 graph = the graph to export to graphml
@@ -89,9 +124,10 @@ def generateSmallWorldGraph(n, k, p, tries=5, inputSeed=None):
 Harary Graph
 k = Node-connectivity of graph
 n = Number of verticies
+(the construction is deterministic, the seed is not used)
 '''
 def generateHararyGraph(k, n, inputSeed=None):
-    return nx.hkn_harary_graph(k, n, seed=inputSeed)
+    return nx.hkn_harary_graph(k, n)
 
 '''
 K-Regular Graph
@@ -218,10 +254,44 @@ def generateRingLegs(extra=True):
     return graph
 
 '''
-Graph is checked to be valid based on our constraints
+Graph is checked to be valid based on our constraints (node connectivity of at least k)
+
+The cheapest test that decides the constraint is used, and each stops at the first evidence against it:
+    - the minimum degree bounds the node connectivity (O(n))
+    - k = 1 is connectivity and k = 2 biconnectivity, a single DFS for articulation points (O(n+m))
+    - k > 2 checks the pairs Esfahanian-Hakimi needs (around a vertex of minimum degree) one at a time,
+      each max-flow cut off at k paths, and rejects at the first pair with fewer than k disjoint paths
 '''
-def isValidGraph(G):
-    if(nx.is_connected(G) and nx.node_connectivity(G) >= 2):
-        return True 
-    else:
-        return False
\ No newline at end of file
+def isValidGraph(G, k=MIN_NODE_CONNECTIVITY):
+    numOfVertices = G.number_of_nodes()
+
+    if(k <= 0):
+        return True
+    if(numOfVertices <= k or min(degree for _, degree in G.degree()) < k):
+        return False # Only a complete graph on more than k vertices has node connectivity k
+    if(k == 1):
+        return nx.is_connected(G)
+    if(not nx.is_biconnected(G)):
+        return False
+    if(k == 2):
+        return True
+
+    return hasNodeConnectivity(G, k)
+
+# Whether every pair of vertices has at least k vertex-disjoint paths (G biconnected, minimum degree at least k)
+def hasNodeConnectivity(G, k):
+    auxiliary = build_auxiliary_node_connectivity(G)
+    residual = build_residual_network(auxiliary, "capacity")
+
+    def enoughPaths(source, target):
+        return local_node_connectivity(G, source, target, auxiliary=auxiliary, residual=residual, cutoff=k) >= k
+
+    # Every vertex cut either misses a vertex of minimum degree (separating it from a non-neighbor)
+    # or contains it (separating two of its neighbors)
+    vertex = min(G, key=G.degree)
+    neighbors = list(G[vertex])
+
+    if(not all(enoughPaths(vertex, target) for target in G if target != vertex and target not in G[vertex])):
+        return False
+
+    return all(enoughPaths(neighbors[i], neighbors[j]) for i in range(len(neighbors) - 1) for j in range(i + 1, len(neighbors)) if neighbors[j] not in G[neighbors[i]])
\ No newline at end of file
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+'''
+===========================
+GRAPH STORE
+===========================
+'''
+## Standard modules
+import gc # Paused while a large graph's dictionaries are built
+import hashlib # Store keys
+import json # Labels, attribute kinds and graph attributes of a stored graph
+import os
+from os.path import join as getFile
+
+## External modules
+import networkx as nx
+import numpy as np
+
+#
+# Constants
+#
+STORE_VERSION = 1 # Part of every key, changing it invalidates the store
+STORE_FILE = "{0}_{1}.npz" # Graph in the store directory, by generator and key
+KEY_LENGTH = 32 # Hex digits of the key used in file names
+SCALAR_KINDS = {bool: "bool", int: "int", float: "float", str: "str"} # Attribute values kept as typed NumPy columns
+
+'''
+Content-addressed store of generated graphs in a compact binary format
+
+A graph is saved as a NumPy .npz archive:
+    indptr, indices = int32 CSR adjacency, each vertex's neighbors in the graph's own adjacency order
+    edges = Edge number of each CSR entry (both directions of an edge share one number and attribute dictionary)
+    labels = Vertex labels when they are all integers (otherwise they are in the JSON header)
+    node_<i>, node_<i>_mask = Column of the i-th vertex attribute, and which vertices have it (edge_<i> alike)
+    header = JSON with the vertex labels, attribute names and kinds, and the graph attributes
+
+Loading restores the vertex order, the neighbor order of every vertex (which the algorithms' tie-breaks
+depend on) and every attribute, so a stored graph runs exactly like the one that was generated.
+Graphs are stored under a key hashing the generator, its parameters, the seed and the NetworkX version,
+see graphKey.
+'''
+
+'''
+Key of a generated graph: a SHA-256 hash of the generator, its parameters, the seed and the library version
+
+generator = The graph type (as given to GraphGenerator.generateGraph)
+parameters = The generator's options (a JSON-serializable dictionary)
+seed = The seed of the generator
+content = Digest of the generator's input file (graphml), None for generated graphs
+'''
+def graphKey(generator, parameters, seed=None, content=None):
+    identity = {"generator": generator, "parameters": parameters, "seed": seed, "content": content, "networkx": nx.__version__, "store": STORE_VERSION}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()[:KEY_LENGTH]
+
+# Path of a graph in the store
+def storePath(storeDirectory, generator, key):
+    return getFile(storeDirectory, STORE_FILE.format(generator, key))
+
+# Digest of a file's content (for graphs read from files, so an edited file gets a new key)
+def fileDigest(filePath):
+    digest = hashlib.sha256()
+    with open(filePath, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+'''
+Stored graph with the given key, generated (and stored) first if it is not in the store yet
+
+storeDirectory = Directory of the store, created if needed
+generator = The graph type
+key = Key of the graph (see graphKey)
+generate = Function without arguments that generates the graph
+'''
+def getGraph(storeDirectory, generator, key, generate):
+    path = storePath(storeDirectory, generator, key)
+
+    if(os.path.exists(path)):
+        return load(path)
+
+    graph = generate()
+    os.makedirs(storeDirectory, exist_ok=True)
+
+    try:
+        save(graph, path)
+    except (TypeError, ValueError, nx.NetworkXNotImplemented) as error:
+        print("graph {0} was not stored: {1}".format(path, error))
+
+    return graph
+
+'''
+Save a graph to a .npz archive (undirected simple graphs)
+
+The archive is written under a temporary name and renamed when complete, so an interrupted run never
+leaves a partial graph in the store.
+'''
+def save(graph, path):
+    if(graph.is_directed() or graph.is_multigraph()):
+        raise nx.NetworkXNotImplemented("Only undirected simple graphs can be stored")
+
+    vertices = list(graph)
+    index = {vertex: position for position, vertex in enumerate(vertices)}
+    adjacency = graph._adj
+
+    # CSR in the graph's adjacency order, edges numbered in the order graph.edges() lists them
+    indptr = np.zeros(len(vertices) + 1, dtype=np.int64)
+    np.cumsum([len(adjacency[vertex]) for vertex in vertices], out=indptr[1:])
+    indices = np.fromiter((index[neighbor] for vertex in vertices for neighbor in adjacency[vertex]), dtype=np.int32, count=int(indptr[-1]))
+
+    edgeData = [data for _, _, data in graph.edges(data=True)]
+    edgeNumbers = {id(data): number for number, data in enumerate(edgeData)}
+    edges = np.fromiter((edgeNumbers[id(data)] for vertex in vertices for data in adjacency[vertex].values()), dtype=np.int32, count=int(indptr[-1]))
+
+    arrays = {"indptr": indptr.astype(np.int32), "indices": indices, "edges": edges}
+    header = {"version": STORE_VERSION, "graph": graph.graph, "node": [], "edge": []}
+
+    if(all(type(vertex) is int for vertex in vertices)):
+        arrays["labels"] = np.array(vertices, dtype=np.int64)
+    else:
+        header["labels"] = [encodeLabel(vertex) for vertex in vertices]
+
+    for prefix, rows in (("node", [data for _, data in graph.nodes(data=True)]), ("edge", edgeData)):
+        for number, (name, kind, column, mask) in enumerate(attributeColumns(rows)):
+            header[prefix].append([name, kind])
+            arrays["{0}_{1}".format(prefix, number)] = column
+            if(mask is not None):
+                arrays["{0}_{1}_mask".format(prefix, number)] = mask
+
+    arrays["header"] = np.array(json.dumps(header))
+
+    temporaryPath = "{0}.{1}.tmp.npz".format(path, os.getpid())
+    np.savez(temporaryPath, **arrays)
+    os.replace(temporaryPath, path)
+
+    return
+
+# Load a graph saved with save
+def load(path):
+    # Millions of new dictionaries would set off the cyclic garbage collector over and over (they hold no cycles)
+    collecting = gc.isenabled()
+    gc.disable()
+
+    try:
+        graph = loadGraph(path)
+    finally:
+        if(collecting):
+            gc.enable()
+
+    return graph
+
+def loadGraph(path):
+    with np.load(path, allow_pickle=False) as archive:
+        header = json.loads(archive["header"].item())
+        indptr = archive["indptr"]
+        indices = archive["indices"]
+        edges = archive["edges"]
+        vertices = archive["labels"].tolist() if "labels" in archive else [decodeLabel(vertex) for vertex in header["labels"]]
+
+        nodeData = attributeRows(archive, "node", header["node"], len(vertices))
+        edgeData = attributeRows(archive, "edge", header["edge"], int(edges.max()) + 1 if len(edges) else 0)
+
+    # The vertex and adjacency dictionaries are filled directly, which keeps every vertex's neighbor order
+    # and skips the per-vertex checks of add_nodes_from/add_edges_from
+    neighbors = list(map(vertices.__getitem__, indices.tolist()))
+    data = list(map(edgeData.__getitem__, edges.tolist()))
+    bounds = indptr.tolist()
+
+    graph = nx.Graph()
+    graph.graph.update(header["graph"])
+    graph._node.update(zip(vertices, nodeData))
+    graph._adj.update((vertex, dict(zip(neighbors[start:end], data[start:end]))) for vertex, start, end in zip(vertices, bounds, bounds[1:]))
+
+    return graph
+
+'''
+Adjacency of a stored graph without building the NetworkX graph (milliseconds even for millions of edges)
+
+Returns (vertices, indptr, indices), the int32 CSR adjacency in the stored neighbor order
+'''
+def loadArrays(path):
+    with np.load(path, allow_pickle=False) as archive:
+        indptr = archive["indptr"]
+        indices = archive["indices"]
+        vertices = archive["labels"].tolist() if "labels" in archive else [decodeLabel(vertex) for vertex in json.loads(archive["header"].item())["labels"]]
+
+    return vertices, indptr, indices
+
+'''
+Columns of the attributes of a list of attribute dictionaries (vertices or edges)
+
+Returns [(name, kind, column, mask)], with a typed NumPy column for bool/int/float/str attributes and a
+column of JSON strings for any other kind (e.g. lists). mask marks the rows that have the attribute, None
+when all of them do.
+'''
+def attributeColumns(rows):
+    columns = []
+    names = list(dict.fromkeys(name for row in rows for name in row))
+
+    for name in names:
+        present = [name in row for row in rows]
+        values = [row[name] for row in rows if name in row]
+        kinds = set(SCALAR_KINDS.get(type(value)) for value in values)
+        kind = kinds.pop() if len(kinds) == 1 and None not in kinds else "json"
+
+        if(kind == "json"):
+            column = np.array([json.dumps(value) for value in values])
+        elif(kind == "str"):
+            column = np.array(values, dtype=str)
+        else:
+            column = np.array(values, dtype={"bool": bool, "int": np.int64, "float": np.float64}[kind])
+
+        columns.append((name, kind, column, None if all(present) else np.array(present)))
+
+    return columns
+
+# Attribute dictionaries of the rows of a stored attribute table (inverse of attributeColumns)
+def attributeRows(archive, prefix, attributes, numOfRows):
+    rows = [{} for _ in range(numOfRows)]
+
+    for number, (name, kind) in enumerate(attributes):
+        values = archive["{0}_{1}".format(prefix, number)].tolist()
+        if(kind == "json"):
+            values = [json.loads(value) for value in values]
+
+        maskName = "{0}_{1}_mask".format(prefix, number)
+        positions = np.flatnonzero(archive[maskName]).tolist() if maskName in archive else range(numOfRows)
+
+        for position, value in zip(positions, values):
+            rows[position][name] = value
+
+    return rows
+
+# Vertex labels that JSON cannot tell apart (tuples become lists) are tagged
+def encodeLabel(vertex):
+    if(isinstance(vertex, tuple)):
+        return {"tuple": [encodeLabel(part) for part in vertex]}
+
+    return vertex
+
+def decodeLabel(vertex):
+    if(isinstance(vertex, dict)):
+        return tuple(decodeLabel(part) for part in vertex["tuple"])
+
+    return vertex
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+'''
+===========================
+INDEXED PRIORITY QUEUE
+===========================
+'''
+
+'''
+Binary min-heap of items (e.g. ports) ordered by a key (e.g. the vector heard on the port).
+
+Each item is in the heap at most once and its position is kept in a dictionary, so an item's key can
+be changed (up or down) and an item can be removed in O(log n) without leaving stale entries behind.
+The heap never holds more entries than there are items, and nothing is locked.
+'''
+class IndexedPriorityQueue:
+    __slots__ = ("heap", "positions")
+
+    def __init__(self):
+        self.heap = [] # [key, item] entries, smallest key first
+        self.positions = {} # item --> index of its entry in the heap
+
+    # Add an item, or change the key of an item already in the queue
+    def put(self, item, key):
+        position = self.positions.get(item)
+
+        if(position is None):
+            self.heap.append([key, item])
+            self.positions[item] = len(self.heap) - 1
+            self.siftUp(len(self.heap) - 1)
+        else:
+            oldKey = self.heap[position][0]
+            self.heap[position][0] = key
+
+            if(key < oldKey):
+                self.siftUp(position)
+            else:
+                self.siftDown(position)
+
+        return
+
+    # Remove an item, returns False if it was not in the queue
+    def remove(self, item):
+        position = self.positions.pop(item, None)
+        if(position is None):
+            return False
+
+        last = self.heap.pop()
+        if(position < len(self.heap)):
+            # Fill the hole with the last entry and move it to where it belongs
+            self.heap[position] = last
+            self.positions[last[1]] = position
+            self.siftDown(position)
+            self.siftUp(position)
+
+        return True
+
+    # Remove and return the (item, key) with the smallest key, None if the queue is empty
+    def pop(self):
+        if(not self.heap):
+            return None
+
+        key, item = self.heap[0]
+        self.remove(item)
+
+        return item, key
+
+    # The (item, key) with the smallest key without removing it, None if the queue is empty
+    def peek(self):
+        if(not self.heap):
+            return None
+
+        key, item = self.heap[0]
+        return item, key
+
+    def getKey(self, item):
+        return self.heap[self.positions[item]][0]
+
+    def siftUp(self, position):
+        heap = self.heap
+        entry = heap[position]
+
+        while position > 0:
+            parent = (position - 1) >> 1
+            if(not entry[0] < heap[parent][0]):
+                break
+
+            heap[position] = heap[parent]
+            self.positions[heap[position][1]] = position
+            position = parent
+
+        heap[position] = entry
+        self.positions[entry[1]] = position
+        return
+
+    def siftDown(self, position):
+        heap = self.heap
+        size = len(heap)
+        entry = heap[position]
+
+        while True:
+            child = 2*position + 1
+            if(child >= size):
+                break
+            if(child + 1 < size and heap[child + 1][0] < heap[child][0]):
+                child += 1
+            if(not heap[child][0] < entry[0]):
+                break
+
+            heap[position] = heap[child]
+            self.positions[heap[position][1]] = position
+            position = child
+
+        heap[position] = entry
+        self.positions[entry[1]] = position
+        return
+
+    def empty(self):
+        return not self.heap
+
+    def copy(self):
+        queue = IndexedPriorityQueue()
+        queue.heap = [list(entry) for entry in self.heap]
+        queue.positions = dict(self.positions)
+        return queue
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __len__(self):
+        return len(self.heap)
+
+    # Items and keys in heap order (not sorted)
+    def __iter__(self):
+        return ((item, key) for key, item in self.heap)
+
+    def __repr__(self):
+        return "IndexedPriorityQueue({0})".format(sorted((key, item) for key, item in self.heap))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+'''
+===========================
+PER-PHASE COST INSTRUMENTATION
+===========================
+'''
+import cProfile
+import json
+import time
+import tracemalloc
+
+#
+# Constants
+#
+FIRST_PHASE = "run" # Everything measured before the algorithm marks its first phase
+PROFILE_FILE = "{}_{}_{}.prof" # prefix, phase number, phase name
+
+'''
+Measurement state, algorithms mark where their phases start and nothing is measured while it is off:
+
+    Instrumentation.phase("convergence")
+
+Phases used by the algorithms:
+    init = Building the per-vertex structures
+    convergence = Message passing until the tree converges
+    analysis = Statistics computed from the converged tree (e.g. network survival)
+    failure = Removing the failed edge and purging the paths/ports that used it
+    recovery = Message passing (or forced updates) after the failure
+    search = Path searches that do not pass messages (Yen's algorithm)
+
+enabled = A run is being measured
+record = The measurements of the current run
+'''
+enabled = False
+record = None
+
+# The phase being measured
+currentPhase = None
+phaseStart = None # (wall time, CPU time)
+profiler = None
+profilePrefix = None
+measuredGraph = None
+startedTracing = False # If start turned tracemalloc on (and stop has to turn it off again)
+
+'''
+Start measuring a run
+
+Graph = The graph the algorithm is run on (its step counter is recorded with each phase)
+algorithm = Name of the algorithm, stored in the record
+memory = If the peak memory allocated in each phase is measured (tracemalloc slows the run down)
+profileFilePrefix = If given, each phase is profiled with cProfile and dumped to <prefix>_<number>_<phase>.prof
+'''
+def start(Graph, algorithm, memory=True, profileFilePrefix=None):
+    global enabled, record, measuredGraph, profilePrefix, startedTracing
+
+    measuredGraph = Graph
+    record = {"algorithm": algorithm, "vertices": Graph.number_of_nodes(), "edges": Graph.number_of_edges(), "memory": memory, "phases": []}
+    profilePrefix = profileFilePrefix
+    enabled = True
+
+    # Tracing someone else started (e.g. a memory profiler around the whole run) is left running
+    startedTracing = memory and not tracemalloc.is_tracing()
+    if(startedTracing):
+        tracemalloc.start()
+
+    startPhase(FIRST_PHASE)
+
+    return
+
+'''
+End the current phase and start the next one (no-op while nothing is measured)
+'''
+def phase(name):
+    if(not enabled):
+        return
+
+    endPhase()
+    startPhase(name)
+
+    return
+
+'''
+Stop measuring, returns the record of the run:
+
+{"algorithm", "vertices", "edges", "memory", "phases": [{"phase", "wall_time", "cpu_time", "peak_memory", "steps", "profile"}, ...]}
+
+wall_time and cpu_time are in seconds, peak_memory in bytes (None when memory is not measured), steps is
+the algorithm's step counter at the end of the phase and profile the cProfile dump of the phase (if any)
+'''
+def stop():
+    global enabled, record, measuredGraph, startedTracing
+
+    if(not enabled):
+        return None
+
+    endPhase()
+
+    if(startedTracing):
+        tracemalloc.stop()
+        startedTracing = False
+
+    finished = record
+    enabled = False
+    record = None
+    measuredGraph = None
+
+    return finished
+
+def startPhase(name):
+    global currentPhase, phaseStart, profiler
+
+    currentPhase = name
+
+    if(record["memory"]):
+        tracemalloc.reset_peak()
+
+    if(profilePrefix):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    phaseStart = (time.perf_counter(), time.process_time())
+
+    return
+
+def endPhase():
+    global profiler
+
+    wallTime = time.perf_counter() - phaseStart[0]
+    cpuTime = time.process_time() - phaseStart[1]
+
+    peakMemory = tracemalloc.get_traced_memory()[1] if record["memory"] else None
+    profileFile = None
+
+    if(profiler):
+        profiler.disable()
+        profileFile = PROFILE_FILE.format(profilePrefix, len(record["phases"]), currentPhase)
+        profiler.dump_stats(profileFile)
+        profiler = None
+
+    record["phases"].append({"phase": currentPhase, "wall_time": wallTime, "cpu_time": cpuTime, "peak_memory": peakMemory, "steps": measuredGraph.graph.get("step"), "profile": profileFile})
+
+    return
+
+'''
+Write a record as one line of JSON (records of batch runs are appended to the same file)
+'''
+def write(runRecord, fileName, append=False):
+    with open(fileName, "a" if append else "w") as file:
+        file.write(json.dumps(runRecord))
+        file.write("\n")
+
+    return
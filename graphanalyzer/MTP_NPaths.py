@@ -4,14 +4,21 @@
 MESHED TREE ALGORITHM - N PATHS
 ===========================
 '''
-from heapq import merge # Merge function implemented for path bundle merging
+from itertools import islice
 from timeit import default_timer as timer # Get elasped time of execution
 from os.path import join as getFile
 from TreeAnalyzer import TreeValidator
+from MessagePassing import SendingQueue
+from CSRGraph import getCSR, cachedCSR
+from PathBundle import EdgeIndex, Path, formatBundle, formatEdges, formatPath, mergeBundles, setPathBundle, setVertexIndices
 from networkx import single_source_shortest_path_length, write_graphml
+import MessagePassing
+import Snapshot
 import MTA_RP
 import copy
 import logging
+import Tracer
+import Instrumentation
 import networkx as nx
 import uuid; # for output testing
 
@@ -32,20 +39,27 @@ root = The root of the tree
 def createMeshedTreeDatatStructures(Graph, root):
     IDCount = 0
     Graph.graph['ID_to_vertex'] = {} # Define a graph-wide dictionary to translate IDs back to vertices
+    Graph.graph['index_to_ID'] = [] # IDs are only used to write paths out to the log, paths store vertex indices
+
+    # Paths are built from integer vertex indices
+    setVertexIndices(Graph)
 
     for node in sorted(Graph.nodes):
         # Add a mapping in both directions, node --> ID (vertex-level) and ID --> node (graph-level)
         Graph.nodes[node]['ID'] = chr(65 + IDCount)
         Graph.graph['ID_to_vertex'][chr(65 + IDCount)] = node
+        Graph.graph['index_to_ID'].append(chr(65 + IDCount))
     
-        if(node == root):
-            logging.warning("Root node is {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
-        else:
-            logging.warning("Non-Root node {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
+        if(Tracer.textEnabled):
+            if(node == root):
+                Tracer.text("Root node is {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
+            else:
+                Tracer.text("Non-Root node {0}, ID = {1}\n".format(node, Graph.nodes[node]['ID']))
 
         IDCount += 1
 
-    logging.warning("---------\n\n")
+    if(Tracer.textEnabled):
+        Tracer.text("---------\n\n")
 
     return
 
@@ -62,6 +76,7 @@ removal = If an edge is to be removed after the init convergence, to study how t
 def init(Graph, root, logFilePath, remedyPaths=False, m=2, batch=False, removal=None, testName=None):
     # Determine amount of information added to log file
     #setLoggingLevel(logFilePath, batch, testName)
+    Instrumentation.phase("init")
 
     # Every vertex is given a single-character ID (starting with 'A')
     createMeshedTreeDatatStructures(Graph, root) 
@@ -72,40 +87,59 @@ def init(Graph, root, logFilePath, remedyPaths=False, m=2, batch=False, removal=
     # step counter
     Graph.graph["step"] = 0
 
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "init")
+
+    # Edge --> bundle slots index used to find the paths an edge failure breaks
+    Graph.graph['edgeIndex'] = EdgeIndex()
+
     # Give each vertex an empty path bundle structure to start
     for vertex in Graph:
         if vertex != root:
             Graph.nodes[vertex]['pathBundle'] = [] # The bundle structure is a list
-            logging.warning("{0} path bundle = {1}\n\n".format(vertex, Graph.nodes[vertex]['pathBundle']))
+            if(Tracer.textEnabled):
+                Tracer.text("{0} path bundle = {1}\n\n".format(vertex, formatBundle(Graph, Graph.nodes[vertex]['pathBundle'])))
         else:
             # The root will add itself as the only path it will receive
-            Graph.nodes[root]['pathBundle'] = [Graph.nodes[root]['ID']]
-            logging.warning("{0} path bundle = {1}\n\n".format(vertex, Graph.nodes[vertex]['pathBundle']))
+            Graph.nodes[root]['pathBundle'] = [Path(Graph.nodes[root]['index'])]
+            if(Tracer.textEnabled):
+                Tracer.text("{0} path bundle = {1}\n\n".format(vertex, formatBundle(Graph, Graph.nodes[vertex]['pathBundle'])))
 
     # Queue to determine who should be sending their bundle at a given discrete event
-    sendingQueue = [] # The queue structure is a list
+    sendingQueue = SendingQueue()
 
     # The maximum number of paths is the number of remedy paths (m) + the one primary path
     maxPaths = m + 1
 
-    send(Graph, root, root, sendingQueue, remedyPaths, maxPaths, treeValidator)
+    Instrumentation.phase("convergence")
+    # Check the graph's core once, the sends read it with cachedCSR
+    getCSR(Graph)
+    MessagePassing.run(lambda v: send(Graph, v, root, sendingQueue, remedyPaths, maxPaths, treeValidator), sendingQueue, sender=root, sendLast=False)
+    Instrumentation.phase("analysis")
 
     # Log the resulting path bundles, tree, and statistics if necessary
-    logging.warning("-----------\nINIT RESULTS:\n")
-    for vertex in sorted(Graph.nodes):
-        logging.warning("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], Graph.nodes[vertex]['pathBundle'], treeValidator.relationshipStatus(vertex)))
+    if(Tracer.textEnabled):
+        Tracer.text("-----------\nINIT RESULTS:\n")
+        for vertex in sorted(Graph.nodes):
+            Tracer.text("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], formatBundle(Graph, Graph.nodes[vertex]['pathBundle']), treeValidator.relationshipStatus(vertex)))
 
     # Confirm that what is created is a tree
-    logging.warning("Results is a tree: {0}".format(treeValidator.isTree()))
+    if(Tracer.textEnabled):
+        Tracer.text("Results is a tree: {0}".format(treeValidator.isTree()))
     Graph.graph["tree"] = treeValidator.getGraph()
+    Graph.graph["treeValidator"] = treeValidator
 
     # Network survival statistics
     Vm, probOfSurvival = calculateNetworkSurvival(Graph, root, m)
-    logging.warning("|Vm| = {0}".format(len(Vm)))
-    logging.warning("Probability of network survival >= {:0.2f}%".format(probOfSurvival*100))
+    if(Tracer.textEnabled):
+        Tracer.text("|Vm| = {0}".format(len(Vm)))
+        Tracer.text("Probability of network survival >= {:0.2f}%".format(probOfSurvival*100))
 
     # Step stuff
-    logging.warning("steps: {}".format(Graph.graph["step"]))
+    if(Tracer.textEnabled):
+        Tracer.text("steps: {}".format(Graph.graph["step"]))
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "init")
 
     # If an edge is to be removed and the resulting tree studied
     if(removal):
@@ -114,12 +148,14 @@ def init(Graph, root, logFilePath, remedyPaths=False, m=2, batch=False, removal=
         recoveryTreeValidator = failureRecovery(Graph, root, removal[0], removal[1])
 
         # Log the resulting path bundles, tree, and statistics if necessary
-        logging.warning("-----------\nRECOVERY RESULTS:\n")
-        for vertex in sorted(Graph.nodes):
-            logging.warning("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], Graph.nodes[vertex]['pathBundle'], recoveryTreeValidator.relationshipStatus(vertex)))
+        if(Tracer.textEnabled):
+            Tracer.text("-----------\nRECOVERY RESULTS:\n")
+            for vertex in sorted(Graph.nodes):
+                Tracer.text("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], formatBundle(Graph, Graph.nodes[vertex]['pathBundle']), recoveryTreeValidator.relationshipStatus(vertex)))
     
         # Confirm that what is created is a tree
-        logging.warning("Results is a tree: {0}".format(recoveryTreeValidator.isTree()))
+        if(Tracer.textEnabled):
+            Tracer.text("Results is a tree: {0}".format(recoveryTreeValidator.isTree()))
 
         failureReconvergence(Graph, root, recoveryTreeValidator, remedyPaths, maxPaths)
         '''
@@ -136,63 +172,83 @@ def init(Graph, root, logFilePath, remedyPaths=False, m=2, batch=False, removal=
     return Vm
 
 def send(Graph, v, root, sendingQueue, remedyPaths, maxPaths, treeValidator: TreeValidator, setDestination=None):
-    logging.warning("-----------\nCURRENT QUEUE {0}".format(sendingQueue))
-    logging.warning("SENDING NODE: {0}\nPATH BUNDLE = {1}\n".format(v, Graph.nodes[v]['pathBundle']))
+    if(Tracer.textEnabled):
+        Tracer.text("-----------\nCURRENT QUEUE {0}".format(sendingQueue))
+        Tracer.text("SENDING NODE: {0}\nPATH BUNDLE = {1}\n".format(v, formatBundle(Graph, Graph.nodes[v]['pathBundle'])))
 
     # For each neighbor x of v
-    for x in Graph.neighbors(v):
+    for x in cachedCSR(Graph).neighbors(v):
         # If only one node is being targeted, skip all other neighbors
         if(setDestination and setDestination != x):
             continue
 
-        logging.warning("NEIGHBOR: {0} ({1})".format(x, Graph.nodes[x]['ID']))
-        logging.warning("\tCurrent path bundle: {0}".format(Graph.nodes[x]['pathBundle']))
+        if(Tracer.textEnabled):
+            Tracer.text("NEIGHBOR: {0} ({1})".format(x, Graph.nodes[x]['ID']))
+            Tracer.text("\tCurrent path bundle: {0}".format(formatBundle(Graph, Graph.nodes[x]['pathBundle'])))
 
-        # Append the ID of x to each of v's paths in its sent bundle if the path is not already in x's path bundle
-        validPaths = [path + Graph.nodes[x]['ID'] for path in Graph.nodes[v]['pathBundle'] if Graph.nodes[x]['ID'] not in path and path + Graph.nodes[x]['ID'] not in Graph.nodes[x]['pathBundle']]
+        # Append the index of x to each of v's paths in its sent bundle if the path does not already go through x
+        xIndex = Graph.nodes[x]['index']
+        receivedPaths = [path.extend(xIndex) for path in Graph.nodes[v]['pathBundle'] if xIndex not in path]
         Graph.graph["step"] += 1
 
+        if(Tracer.enabled):
+            Tracer.deliver(Graph.graph["step"], v, x, receivedPaths)
+
+        # Merge the received paths with x's path bundle, skipping the paths x already has. Any paths only need
+        # the best maxPaths + 1 to know if the bundle overflowed, remedy paths need the whole great bundle
+        if(remedyPaths):
+            greatBundle, numOfNewPaths = mergeBundles(Graph.nodes[x]['pathBundle'], receivedPaths)
+        else:
+            greatBundle, numOfNewPaths = mergeBundles(Graph.nodes[x]['pathBundle'], receivedPaths, maxPaths+1)
+
         # If there are paths left that survived the previous filter
-        if(validPaths):
-            logging.warning("\tNew path(s): {0}".format(validPaths))
+        if(numOfNewPaths):
+            if(Tracer.textEnabled):
+                newPaths = [path for path in receivedPaths if path not in Graph.nodes[x]['pathBundle']]
+                Tracer.text("\tNew path(s): {0}".format(formatBundle(Graph, newPaths)))
 
-            Graph.nodes[x]['oldPathBundle'] = copy.deepcopy(Graph.nodes[x]['pathBundle'])
+            # Bundles are replaced rather than modified, so the old one can be compared against later
+            oldPathBundle = Graph.nodes[x]['pathBundle']
+            fullBundle = None
 
             # Determine the algorithm to use to add paths to the path bundle
             if(remedyPaths):
-                addRemedyPaths(Graph, x, validPaths)
+                addRemedyPaths(Graph, x, greatBundle)
             else:
-                addAdditionalPaths(Graph, x, validPaths)
+                # Only the text log needs the whole great bundle, it lists every path the bundle drops
+                if(Tracer.textEnabled):
+                    fullBundle = mergeBundles(oldPathBundle, receivedPaths)[0]
+                addAdditionalPaths(Graph, x, greatBundle, fullBundle)
 
             # If the maximum number of paths has been exceeded, remove the extras
             if(len(Graph.nodes[x]['pathBundle']) > maxPaths):
                 # Remove extra paths (keep only up to maxPaths)
-                logging.warning("\tRemoved paths: {0}".format(Graph.nodes[x]['pathBundle'][maxPaths:]))
-                del Graph.nodes[x]['pathBundle'][maxPaths:]
+                if(Tracer.textEnabled):
+                    Tracer.text("\tRemoved paths: {0}".format(formatBundle(Graph, (fullBundle or Graph.nodes[x]['pathBundle'])[maxPaths:])))
+                setPathBundle(Graph, x, Graph.nodes[x]['pathBundle'][:maxPaths])
                 Graph.graph["step"] += 1
-                logging.warning("\tUpdated path bundle: {0}".format(Graph.nodes[x]['pathBundle']))
+                if(Tracer.textEnabled):
+                    Tracer.text("\tUpdated path bundle: {0}".format(formatBundle(Graph, Graph.nodes[x]['pathBundle'])))
             
             # If the maximum number of paths is hit exactly, just note the resulting bundle
             elif(len(Graph.nodes[x]['pathBundle']) == maxPaths):
-                logging.warning("\tUpdated path bundle: {0}".format(Graph.nodes[x]['pathBundle']))
+                if(Tracer.textEnabled):
+                    Tracer.text("\tUpdated path bundle: {0}".format(formatBundle(Graph, Graph.nodes[x]['pathBundle'])))
 
             # If x is now a child of v, note that updated relationship
-            if(Graph.nodes[x]['pathBundle'][0][-2] == Graph.nodes[v]['ID']):
+            if(Graph.nodes[x]['pathBundle'][0].parent() == Graph.nodes[v]['index']):
                 treeValidator.addParent(v, x) # v is linked to x as a parent, x is linked to v as a child
             
-            if Graph.nodes[x]['oldPathBundle'] != Graph.nodes[x]['pathBundle']:
+            if oldPathBundle != Graph.nodes[x]['pathBundle']:
                 # Add x to the sending queue if not already in the queue (watch this for algorithm errors)
-                if x not in sendingQueue:
-                    sendingQueue.append(x)
-                    logging.warning("\tNode appended to sending queue.")
-
-        else:
-            logging.warning("\tNo new paths, no changes.")
+                if sendingQueue.append(x):
+                    if(Tracer.enabled):
+                        Tracer.enqueue(Graph.graph["step"], x, len(sendingQueue))
+                    if(Tracer.textEnabled):
+                        Tracer.text("\tNode appended to sending queue.")
 
-    # Remove v from the sending queue now that we are done with each neighbor
-    s = sendingQueue.pop(TOP_NODE)
-    if sendingQueue and not setDestination:
-        send(Graph, s, root, sendingQueue, remedyPaths, maxPaths, treeValidator)
+        elif(Tracer.textEnabled):
+            Tracer.text("\tNo new paths, no changes.")
 
     return
 
@@ -202,40 +258,48 @@ EDGE FAILURE FUNCTIONS
 ========================
 '''
 def failureLimitedRecovery(Graph, root, brokenVertex1, brokenVertex2, treeValidator: TreeValidator, remedyPaths, maxPaths):
+    Instrumentation.phase("failure")
+
     # Set up recovery steps by clearing the init step count
     Graph.graph["step"] = 0
     localSteps = 0
 
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "recovery")
+
     # Create a validation object to determine if the result is a tree
     newTreeValidator = copy.deepcopy(treeValidator)
 
     # Check lineage
     if(treeValidator.isParent(brokenVertex1, brokenVertex2)):
-        failedEdge = Graph.nodes[brokenVertex2]['ID'] + Graph.nodes[brokenVertex1]['ID']
+        failedEdge = (Graph.nodes[brokenVertex2]['index'], Graph.nodes[brokenVertex1]['index'])
         child = brokenVertex1
     elif(treeValidator.isParent(brokenVertex2, brokenVertex1)):
-        failedEdge = Graph.nodes[brokenVertex1]['ID'] + Graph.nodes[brokenVertex2]['ID']
+        failedEdge = (Graph.nodes[brokenVertex1]['index'], Graph.nodes[brokenVertex2]['index'])
         child = brokenVertex2
     else:
         localSteps += 1
-        logging.warning(f"\n=====RECOVERY RESULTS=====\n")
-        logging.warning("Tree not broken, no updates to primary paths.") 
-        return
+        if(Tracer.textEnabled):
+            Tracer.text(f"\n=====RECOVERY RESULTS=====\n")
+            Tracer.text("Tree not broken, no updates to primary paths.") 
+        if(Tracer.enabled):
+            Tracer.phaseEnd(Graph.graph["step"], "recovery")
+        return treeValidator
 
     # Remove the edge from the graph
     if(Graph.has_edge(brokenVertex1, brokenVertex2)):
-        Graph.remove_edge(brokenVertex1, brokenVertex2)
+        Snapshot.removeEdge(Graph, brokenVertex1, brokenVertex2)
     else:
-        Graph.remove_edge(brokenVertex2, brokenVertex1)
+        Snapshot.removeEdge(Graph, brokenVertex2, brokenVertex1)
 
-    # Remove the local root path from the child's bundle
-    Graph.nodes[child]['pathBundle'].pop(0)
-    localSteps += 1
+    # Remove the local root path from the child's bundle (the purge counts on the graph's step counter so its events carry their step)
+    setPathBundle(Graph, child, Graph.nodes[child]['pathBundle'][1:])
+    Graph.graph["step"] += 1
 
     # If there are still paths in the child's bundle
     if Graph.nodes[child]['pathBundle']:
-        parentID = Graph.nodes[child]['pathBundle'][0][-2]
-        newTreeValidator.addParent(Graph.graph['ID_to_vertex'][parentID], child)
+        parentIndex = Graph.nodes[child]['pathBundle'][0].parent()
+        newTreeValidator.addParent(Graph.graph['index_to_vertex'][parentIndex], child)
 
     # Purge the broken branch
     Q = [child]
@@ -244,69 +308,81 @@ def failureLimitedRecovery(Graph, root, brokenVertex1, brokenVertex2, treeValida
         for child in treeValidator.getChildren(vertex):
             currentBundleLen = len(Graph.nodes[child]['pathBundle'])
             # Remove all paths that refer to the broken path and continue to traverse down the broken branch
-            Graph.nodes[child]['pathBundle'] = [path for path in Graph.nodes[child]['pathBundle'] if failedEdge not in path]
+            setPathBundle(Graph, child, removePaths(Graph, child, (failedEdge,)))
             Q.append(child)
             
             bundleSizeDifference = currentBundleLen - len(Graph.nodes[child]['pathBundle'])
             if(bundleSizeDifference < 2):
-                localSteps += 1
+                Graph.graph["step"] += 1
             else:
-                localSteps += bundleSizeDifference
+                Graph.graph["step"] += bundleSizeDifference
 
             # If there are still paths in the bundle
             if Graph.nodes[child]['pathBundle']:
-                parentID = Graph.nodes[child]['pathBundle'][0][-2]
-                newTreeValidator.addParent(Graph.graph['ID_to_vertex'][parentID], child)
+                parentIndex = Graph.nodes[child]['pathBundle'][0].parent()
+                newTreeValidator.addParent(Graph.graph['index_to_vertex'][parentIndex], child)
             # If there are no longer paths in the bundle
             else:
                 newTreeValidator.removeParent(child)
     
-    Graph.graph["step"] = localSteps
+    localSteps = Graph.graph["step"]
     MTA_RP.logMTAInfo(Graph, newTreeValidator, "RECOVERY RESULTS")
 
     # Fix stranded vertices by forcing them onto a new branch
+    Instrumentation.phase("recovery")
+    core = getCSR(Graph)
     for vertex in newTreeValidator.getStrandedVertices():
         print(f"{vertex} has been stranded")
-        for neighbor in Graph.neighbors(vertex):
+        for neighbor in core.neighbors(vertex):
             print(f"gathering update from {neighbor}")
-            send(Graph, neighbor, root, [neighbor], remedyPaths, maxPaths, newTreeValidator, setDestination=vertex)
+            send(Graph, neighbor, root, SendingQueue([neighbor]), remedyPaths, maxPaths, newTreeValidator, setDestination=vertex)
             localSteps += 1
 
+    # Each gathered update is one recovery step (the steps counted inside send are not)
     Graph.graph["step"] = localSteps
     MTA_RP.logMTAInfo(Graph, newTreeValidator, "UPDATED RECOVERY RESULTS")
 
-    return
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "recovery")
+
+    return newTreeValidator
 
 def failureRecovery(Graph, root, brokenVertex1, brokenVertex2):
-    # Determine the failed path ID (and its reverse, you won't know if the user put in the correct order)
-    failedIDs = Graph.nodes[brokenVertex1]['ID'] + Graph.nodes[brokenVertex2]['ID']
-    failedEdge = (failedIDs, failedIDs[::-1])
+    Instrumentation.phase("failure")
+
+    # Determine the failed edge (and its reverse, you won't know if the user put in the correct order)
+    failedIndices = (Graph.nodes[brokenVertex1]['index'], Graph.nodes[brokenVertex2]['index'])
+    failedEdge = (failedIndices, failedIndices[::-1])
     print(failedEdge)
 
     # Set up recovery steps by clearing the init step count
     Graph.graph["step"] = 0
 
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "recovery")
+
     # Remove the edge from the graph
     if(Graph.has_edge(brokenVertex1, brokenVertex2)):
-        Graph.remove_edge(brokenVertex1, brokenVertex2)
+        Snapshot.removeEdge(Graph, brokenVertex1, brokenVertex2)
     else:
-        Graph.remove_edge(brokenVertex2, brokenVertex1)
+        Snapshot.removeEdge(Graph, brokenVertex2, brokenVertex1)
 
     # Create a validation object to determine if the result is a tree
     treeValidator = TreeValidator(Graph.nodes, root)
 
     # Propogate the failure of the edge
+    core = getCSR(Graph)
     Q = [brokenVertex1, brokenVertex2]
     while Q:
         v = Q.pop(0)
-        for x in Graph.neighbors(v):
+        for x in core.neighbors(v):
             # Add step for propogation
             Graph.graph["step"] += 1
 
             # Check if a path needs to be removed and do so
             bundleSize = len(Graph.nodes[x]['pathBundle'])
             Graph.graph["step"] += bundleSize
-            Graph.nodes[x]['pathBundle'] = removePaths(Graph, x, failedEdge)
+            setPathBundle(Graph, x, removePaths(Graph, x, failedEdge))
 
             # A path was removed
             if(bundleSize > len(Graph.nodes[x]['pathBundle'])):
@@ -314,34 +390,41 @@ def failureRecovery(Graph, root, brokenVertex1, brokenVertex2):
 
             # If the vertex still has paths in its bundle, determine its new parent and mark that relationship
             if(Graph.nodes[x]['pathBundle'] and x != root):
-                parentID = Graph.nodes[x]['pathBundle'][0][-2]
-                treeValidator.addParent(Graph.graph['ID_to_vertex'][parentID], x)
+                parentIndex = Graph.nodes[x]['pathBundle'][0].parent()
+                treeValidator.addParent(Graph.graph['index_to_vertex'][parentIndex], x)
+
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "recovery")
 
     return treeValidator
 
 def failureReconvergence(Graph, root, treeValidator: TreeValidator, remedyPaths, maxPaths):
     # The ol' send queue, it needs to be the neighbors of the fallen brothers
-    sendingQueue = []
+    sendingQueue = SendingQueue()
+    core = getCSR(Graph)
 
     for vertex in treeValidator.getStrandedVertices():
-        for neighbor in Graph.neighbors(vertex):
+        for neighbor in core.neighbors(vertex):
             sendingQueue.append(neighbor)
 
     if(not sendingQueue):
-        logging.warning("-----------\nRECONVERGENCE RESULTS:\n")
-        logging.warning("No stranded vertices, no change to bundles.")
+        if(Tracer.textEnabled):
+            Tracer.text("-----------\nRECONVERGENCE RESULTS:\n")
+            Tracer.text("No stranded vertices, no change to bundles.")
         
         return
 
     else:
-        s = sendingQueue.pop(0)
-        send(Graph, s, root, sendingQueue, remedyPaths, maxPaths, treeValidator)
+        Instrumentation.phase("recovery")
+        MessagePassing.run(lambda v: send(Graph, v, root, sendingQueue, remedyPaths, maxPaths, treeValidator), sendingQueue, sendLast=False)
 
-    logging.warning("-----------\nRECONVERGENCE RESULTS:\n")
-    for vertex in sorted(Graph.nodes):
-        logging.warning("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], Graph.nodes[vertex]['pathBundle'], treeValidator.relationshipStatus(vertex)))
+    if(Tracer.textEnabled):
+        Tracer.text("-----------\nRECONVERGENCE RESULTS:\n")
+        for vertex in sorted(Graph.nodes):
+            Tracer.text("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], formatBundle(Graph, Graph.nodes[vertex]['pathBundle']), treeValidator.relationshipStatus(vertex)))
 
-    logging.warning("Results is a tree: {0}".format(treeValidator.isTree()))
+    if(Tracer.textEnabled):
+        Tracer.text("Results is a tree: {0}".format(treeValidator.isTree()))
 
     return
 
@@ -356,8 +439,8 @@ Vm = Subset of vertex set V which should withstand an edge removal
 batch = If batch testing (multiple tests one after the other rapidly) is being performed
 '''
 def edgeRemoval(Graph, root, vertexWithRemovedEdge1, vertexWithRemovedEdge2, Vm, batch=False):
-    removedEdge = Graph.nodes[vertexWithRemovedEdge1]['ID'] + Graph.nodes[vertexWithRemovedEdge2]['ID']
-    removedEdgeFlipped = Graph.nodes[vertexWithRemovedEdge2]['ID'] + Graph.nodes[vertexWithRemovedEdge1]['ID']
+    removedEdge = (Graph.nodes[vertexWithRemovedEdge1]['index'], Graph.nodes[vertexWithRemovedEdge2]['index'])
+    removedEdgeFlipped = removedEdge[::-1]
 
     # Counters to quantify the amount of loss to bundles
     removedPathCount = 0
@@ -366,23 +449,26 @@ def edgeRemoval(Graph, root, vertexWithRemovedEdge1, vertexWithRemovedEdge2, Vm,
     # Create a validation object to determine if the result is a tree
     treeValidator = TreeValidator(Graph.nodes, root)
 
+    # Only the vertices with a path over the removed edge can lose paths
+    affectedVertices = Graph.graph['edgeIndex'].getEntries(*removedEdge)
+
     # Parse each vertices path bundle and remove the paths that utilize the now-removed edge
     for vertex in Graph:
         # Ignore the root, it cannot lose any paths
         if(vertex != root):
             totalNumberOfPaths += len(Graph.nodes[vertex]['pathBundle']) # Grab number of paths before any removals
 
-            # Determine the set of paths in a path bundle that utilize the removed edge 
-            res = set(filter(lambda x: removedEdge in x or removedEdgeFlipped in x, Graph.nodes[vertex]['pathBundle']))
-            removedPathCount += len(res) # The size of the set is added to total lost path count
+            if(vertex in affectedVertices):
+                bundleSize = len(Graph.nodes[vertex]['pathBundle'])
 
-            # The path bundle of that vertex is updated to remove the now-obsolete path(s)
-            Graph.nodes[vertex]['pathBundle'] = [e for e in Graph.nodes[vertex]['pathBundle'] if e not in res]
+                # The path bundle of that vertex is updated to remove the now-obsolete path(s)
+                setPathBundle(Graph, vertex, removePaths(Graph, vertex, (removedEdge, removedEdgeFlipped)))
+                removedPathCount += bundleSize - len(Graph.nodes[vertex]['pathBundle']) # Add to total lost path count
 
             # If the vertex still has paths in its bundle, determine its new parent and mark that relationship
             if(Graph.nodes[vertex]['pathBundle']):
-                parentID = Graph.nodes[vertex]['pathBundle'][0][-2]
-                treeValidator.addParent(Graph.graph['ID_to_vertex'][parentID], vertex)
+                parentIndex = Graph.nodes[vertex]['pathBundle'][0].parent()
+                treeValidator.addParent(Graph.graph['index_to_vertex'][parentIndex], vertex)
 
     # Statistics for pathless vertices (stranded vertex) and if they were in subset Vm
     isStrandedVerticesInVm = False
@@ -397,14 +483,16 @@ def edgeRemoval(Graph, root, vertexWithRemovedEdge1, vertexWithRemovedEdge2, Vm,
         write_graphml(BadGraph, LOG_FILE_ERROR.format(stamp))
 
     # Log results of the removal
-    logging.warning("-----------\nUPDATED RESULTS:\nremoved edge: {0}/{1}\n".format(removedEdge, removedEdgeFlipped))
-    for vertex in sorted(Graph.nodes):
-        logging.warning("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], Graph.nodes[vertex]['pathBundle'], treeValidator.relationshipStatus(vertex)))
+    if(Tracer.textEnabled):
+        Tracer.text("-----------\nUPDATED RESULTS:\nremoved edge: {0}/{1}\n".format(Graph.nodes[vertexWithRemovedEdge1]['ID'] + Graph.nodes[vertexWithRemovedEdge2]['ID'], Graph.nodes[vertexWithRemovedEdge2]['ID'] + Graph.nodes[vertexWithRemovedEdge1]['ID']))
+        for vertex in sorted(Graph.nodes):
+            Tracer.text("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, Graph.nodes[vertex]['ID'], formatBundle(Graph, Graph.nodes[vertex]['pathBundle']), treeValidator.relationshipStatus(vertex)))
 
-    logging.warning("total paths before removal: {0}\ntotal paths lost: {1}\npercent of paths lost: {2:.2f}%".format(totalNumberOfPaths, removedPathCount, (removedPathCount/totalNumberOfPaths)*100))
-    logging.warning("Result is a tree: {0}".format(treeValidator.isTree()))
-    logging.warning("Stranded vertices: {0}".format(strandedVertices))
-    logging.warning("Stranded vertices in Vm: {0}".format(isStrandedVerticesInVm))
+    if(Tracer.textEnabled):
+        Tracer.text("total paths before removal: {0}\ntotal paths lost: {1}\npercent of paths lost: {2:.2f}%".format(totalNumberOfPaths, removedPathCount, (removedPathCount/totalNumberOfPaths)*100))
+        Tracer.text("Result is a tree: {0}".format(treeValidator.isTree()))
+        Tracer.text("Stranded vertices: {0}".format(strandedVertices))
+        Tracer.text("Stranded vertices in Vm: {0}".format(isStrandedVerticesInVm))
 
     # If batch testing is being used, return the derived stats for the batch log output with init results
     if(batch):
@@ -417,12 +505,14 @@ Backup path algorithm
 
 Graph = The graph the algorithm is run on
 vertex = The vertex whose path bundle is being modified
-validPaths = Paths which are a canidate to be added to the vertex path bundle
+greatBundle = The path bundle merged with the new paths (see PathBundle.mergeBundles)
+fullBundle = The whole great bundle when greatBundle was cut short, for the text log
 '''
-def addAdditionalPaths(Graph, vertex, validPaths):
-    # Add these paths to x's path bundle
-    Graph.nodes[vertex]['pathBundle'] = mergePathBundles(copy.deepcopy(Graph.nodes[vertex]['pathBundle']), validPaths, Graph)
-    logging.warning("\tUpdated path bundle: {0}".format(Graph.nodes[vertex]['pathBundle']))
+def addAdditionalPaths(Graph, vertex, greatBundle, fullBundle=None):
+    # The merged bundle is x's new path bundle
+    setPathBundle(Graph, vertex, greatBundle)
+    if(Tracer.textEnabled):
+        Tracer.text("\tUpdated path bundle: {0}".format(formatBundle(Graph, fullBundle or greatBundle)))
     Graph.graph["step"] += 1
 
     return
@@ -432,52 +522,57 @@ Remedy path algorithm
 
 Graph = The graph the algorithm is run on
 vertex = The vertex whose path bundle is being modified
-validPaths = Paths which are a canidate to be added to the vertex path bundle
+greatBundle = The great bundle B(v), the path bundle merged with the new paths (see PathBundle.mergeBundles)
 '''
-def addRemedyPaths(Graph, vertex, validPaths):
-    # Form a great bundle B(v) by merging the path bundle with the paths from the calling vertex
-    # Watch out with the doubling up of x in the lambda, did this change anything?
-    greatBundle = list(merge(Graph.nodes[vertex]['pathBundle'], validPaths, key=lambda x: (len(x), x)))
-    logging.warning("\tGreat bundle post-merge: {0}\n".format(greatBundle))
-
-    # Remove the preferred path and create a new path bundle with it.
-    P = copy.deepcopy(greatBundle[0])
-    del greatBundle[0]
+def addRemedyPaths(Graph, vertex, greatBundle):
+    if(Tracer.textEnabled):
+        Tracer.text("\tGreat bundle post-merge: {0}\n".format(formatBundle(Graph, greatBundle)))
+
+    # Take the preferred path and create a new path bundle with it.
+    P = greatBundle[0]
     Graph.nodes[vertex]['newPathBundle'] = [P] # the new path bundle with the preferred path
 
-    logging.warning("\tNew path bundle created: {0}\n".format(Graph.nodes[vertex]['newPathBundle']))
+    if(Tracer.textEnabled):
+        Tracer.text("\tNew path bundle created: {0}\n".format(formatBundle(Graph, Graph.nodes[vertex]['newPathBundle'])))
     
     # NOTE: WATCH OUT FOR SHALLOW COPYING HERE AND BELOW
     # Define a deletion set (deletions that will break the path)
     S = getPathEdgeSet(P)
-    logging.warning("\tDeletion set ( S = E(P) ): {0}\n".format(S))
+    if(Tracer.textEnabled):
+        Tracer.text("\tDeletion set ( S = E(P) ): {0}\n".format(formatEdges(Graph, S)))
 
     # Process as many of the remaining paths in the great bundle as possible
-    while(greatBundle and S):
-         # First path remaining in the great bundle, remove it from great bundle
-        Q = copy.deepcopy(greatBundle[0])
-        del greatBundle[0]
-        logging.warning("\tFirst path remaining in great bundle: {0}\n".format(Q))
+    for Q in islice(greatBundle, 1, None):
+        if(not S):
+            break
+
+        # First path remaining in the great bundle
+        if(Tracer.textEnabled):
+            Tracer.text("\tFirst path remaining in great bundle: {0}\n".format(formatPath(Graph, Q)))
 
         # T contains the edges in P that Q will remedy
         remedySet = getPathEdgeSet(Q)
         T = [edge for edge in S if edge not in remedySet]
-        logging.warning("\tRemedy Set ( T = s - E(Q) ): {0}\n".format(T))
+        if(Tracer.textEnabled):
+            Tracer.text("\tRemedy Set ( T = s - E(Q) ): {0}\n".format(formatEdges(Graph, T)))
 
         if(T):
             Graph.nodes[vertex]['newPathBundle'].append(Q)
 
-            logging.warning("\tAdding new path: {0}\n".format(Q))
+            if(Tracer.textEnabled):
+                Tracer.text("\tAdding new path: {0}\n".format(formatPath(Graph, Q)))
 
             # S now contains the remaining edges still in need of a remedy
             S = [edge for edge in S if edge not in T]
-            logging.warning("\tUpdated S for remaining edges in need of a remedy: {0}\n".format(S))
+            if(Tracer.textEnabled):
+                Tracer.text("\tUpdated S for remaining edges in need of a remedy: {0}\n".format(formatEdges(Graph, S)))
 
     # If the new path bundle is different from the previous one, then the vertex must announce the new path bundle to neighbors
     if Graph.nodes[vertex]['newPathBundle'] != Graph.nodes[vertex]['pathBundle']:
-        Graph.nodes[vertex]['pathBundle'] = Graph.nodes[vertex]['newPathBundle'] # WATCH FOR SHALLOW COPIES
+        setPathBundle(Graph, vertex, Graph.nodes[vertex]['newPathBundle']) # WATCH FOR SHALLOW COPIES
 
-        logging.warning("\tOfficial new path bundle for node: {0}\n".format(Graph.nodes[vertex]['pathBundle']))
+        if(Tracer.textEnabled):
+            Tracer.text("\tOfficial new path bundle for node: {0}\n".format(formatBundle(Graph, Graph.nodes[vertex]['pathBundle'])))
         
         # Make sure the send queue is updated approp
         '''if(x not in sendQueue):
@@ -485,51 +580,43 @@ def addRemedyPaths(Graph, vertex, validPaths):
 
     return
 
+'''
+Path bundle of a vertex without the paths that traverse any of the failed (directed) edges
+
+The edge index points straight at the bundle slots that use each edge in either direction, so
+only those paths are checked for the direction that failed.
+'''
 def removePaths(Graph, vertex, failedEdge):
-    return [path for path in Graph.nodes[vertex]['pathBundle'] if not any(map(path.__contains__, failedEdge))]
+    bundle = Graph.nodes[vertex]['pathBundle']
+    failedSlots = set()
+
+    for edge in failedEdge:
+        failedSlots.update(slot for slot in Graph.graph['edgeIndex'].getSlots(*edge, vertex) if bundle[slot].hasEdge(*edge))
+
+    if(not failedSlots):
+        return bundle
+
+    return [path for slot, path in enumerate(bundle) if slot not in failedSlots]
 
 def getPathEdgeSet(path):
     edgeSet = []
 
     if path:
-        if len(path) <= 2:
-            edgeSet = [path]
-
+        if len(path) < 2:
+            edgeSet = [path.vertices] # A lone root has no edges, it is its own deletion set
         else:
-            vertexSet = list(path)
-
-            for currentEdge in range(1,len(vertexSet)):
-                edgeSet.append(vertexSet[currentEdge-1] + vertexSet[currentEdge])
+            edgeSet = path.edges()
 
     return edgeSet
 
-def mergePathBundles(pathBundle1, pathBundle2, Graph):
-    greatBundle = []
-    
-    if not pathBundle1 and not pathBundle2:
-        return greatBundle
-
-    elif pathBundle1 and not pathBundle2:
-        return greatBundle + pathBundle1
-
-    elif not pathBundle1 and pathBundle2:
-        return greatBundle + pathBundle2
-
-    elif pathBundle1 and pathBundle2:
-       if (len(pathBundle1[0]) < len(pathBundle2[0])) or (len(pathBundle1[0]) == len(pathBundle2[0]) and pathBundle1[0] < pathBundle2[0]):
-          greatBundle.append(pathBundle1[0])
-          greatBundle = greatBundle +  mergePathBundles(pathBundle1[1:], pathBundle2, Graph)
-
-       else:
-          greatBundle.append(pathBundle2[0])
-          greatBundle = greatBundle +  mergePathBundles(pathBundle1, pathBundle2[1:], Graph)
-
-    return greatBundle
-
-
 def calculateNetworkSurvival(G, root, m):
     # Maximum number of remedy paths in a bundle, meaning it does not include the primary path
-    Vm = single_source_shortest_path_length(G, root, cutoff=m)
+    # (read from the all-pairs distance matrix when one for this graph is attached, see Distances.getDistanceMatrix)
+    distanceMatrix = G.graph.get("distanceMatrix")
+    if(distanceMatrix is not None and distanceMatrix.matches(G)):
+        Vm = distanceMatrix.within(root, m)
+    else:
+        Vm = single_source_shortest_path_length(G, root, cutoff=m)
 
     # 1 - (|V|-|Vm|)/|E|
     probNetworkSurival = 1 - ((G.number_of_nodes() - len(Vm))/G.number_of_edges())
@@ -5,9 +5,12 @@ import copy
 MESHED TREE ALGORITHM - BFS N-PATHS
 ===========================
 '''
-import logging
+import Tracer
+import Instrumentation
 import MTP_NPaths
 from TreeAnalyzer import TreeValidator
+from PathBundle import EdgeIndex, Path, formatBundle, mergeBundles, setPathBundle
+from CSRGraph import getCSR
 from networkx import single_source_shortest_path_length, is_k_regular
 
 #
@@ -16,20 +19,36 @@ from networkx import single_source_shortest_path_length, is_k_regular
 TOP_NODE = 0
 
 def init(Graph, root, m=2, removal=None):
+    Instrumentation.phase("init")
+
     # Create a validation object to make sure the result is a tree
     treeValidator = TreeValidator(Graph.nodes, root) 
 
+    # step counter
+    Graph.graph["step"] = 0
+
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "init")
+
+    # Edge --> bundle slots index used to find the paths an edge failure breaks
+    Graph.graph['edgeIndex'] = EdgeIndex()
+
+    # The search walks the graph's CSR core, with the visited marks in an array by vertex number
+    core = getCSR(Graph)
+    visited = bytearray(len(core))
+    visited[core.index[root]] = 1
+
     # Give each vertex an empty path bundle structure to start
     for vertex in Graph:
         if vertex != root:
             Graph.nodes[vertex]['pathBundle'] = [] # The bundle structure is a list
-            Graph.nodes[vertex]['visited'] = False
-            logging.warning("{0} path bundle = {1}\n\n".format(vertex, Graph.nodes[vertex]['pathBundle']))
+            if(Tracer.textEnabled):
+                Tracer.text("{0} path bundle = {1}\n\n".format(vertex, formatBundle(Graph, Graph.nodes[vertex]['pathBundle'])))
         else:
             # The root will add itself as the only path it will receive
-            Graph.nodes[root]['pathBundle'] = [Graph.nodes[root]['ID']]
-            Graph.nodes[vertex]['visited'] = True
-            logging.warning("{0} path bundle = {1}\n\n".format(vertex, Graph.nodes[vertex]['pathBundle']))
+            Graph.nodes[root]['pathBundle'] = [Path(Graph.nodes[root]['index'])]
+            if(Tracer.textEnabled):
+                Tracer.text("{0} path bundle = {1}\n\n".format(vertex, formatBundle(Graph, Graph.nodes[vertex]['pathBundle'])))
 
     # Determines if there are still nodes to send
     stillActive = True
@@ -44,74 +63,105 @@ def init(Graph, root, m=2, removal=None):
     currentDepthVertices = [root]
     nextDepthVertices = []
 
+    Instrumentation.phase("convergence")
     while currentDepthVertices:
         for v in currentDepthVertices:
             queueCounter += 1
-            logging.warning("-----------\nQUEUE ITERATION: {0}\nCURRENT QUEUE {1}\n".format(queueCounter, currentDepthVertices))
-            logging.warning("SENDING NODE: {0}\nPATH BUNDLE = {1}\n".format(v, Graph.nodes[v]['pathBundle']))
+            if(Tracer.textEnabled):
+                Tracer.text("-----------\nQUEUE ITERATION: {0}\nCURRENT QUEUE {1}\n".format(queueCounter, currentDepthVertices))
+                Tracer.text("SENDING NODE: {0}\nPATH BUNDLE = {1}\n".format(v, formatBundle(Graph, Graph.nodes[v]['pathBundle'])))
             
-            for neighbor in Graph.neighbors(v):
-                logging.warning("NEIGHBOR: {0} ({1})".format(neighbor, Graph.nodes[neighbor]['ID']))
-                logging.warning("\tCurrent path bundle: {0}".format(Graph.nodes[neighbor]['pathBundle']))
+            for neighbor in core.neighbors(v):
+                if(Tracer.textEnabled):
+                    Tracer.text("NEIGHBOR: {0} ({1})".format(neighbor, Graph.nodes[neighbor]['ID']))
+                    Tracer.text("\tCurrent path bundle: {0}".format(formatBundle(Graph, Graph.nodes[neighbor]['pathBundle'])))
 
                 # Per BFS logic, mark the neighbor as visited if it has not already, add to queue
-                if(not Graph.nodes[neighbor]['visited']):
-                    Graph.nodes[neighbor]['visited'] = True
+                neighborNumber = core.index[neighbor]
+                if(not visited[neighborNumber]):
+                    visited[neighborNumber] = 1
                     nextDepthVertices.append(neighbor)
-                    logging.warning("\tVisited status: Marked as visited")
-                else:
-                    logging.warning("\tVisited status: Already visited")
-
-                # Append the ID of x to each of v's paths in its sent bundle if the path is not already in x's path bundle
-                validPaths = [
-                                path + Graph.nodes[neighbor]['ID'] 
-                                for path in Graph.nodes[v]['pathBundle'] 
-                                if Graph.nodes[neighbor]['ID'] not in path 
-                                and path + Graph.nodes[neighbor]['ID'] not in Graph.nodes[neighbor]['pathBundle']
-                            ]
+                    if(Tracer.enabled):
+                        Tracer.enqueue(Graph.graph["step"], neighbor, len(nextDepthVertices))
+                    if(Tracer.textEnabled):
+                        Tracer.text("\tVisited status: Marked as visited")
+                elif(Tracer.textEnabled):
+                    Tracer.text("\tVisited status: Already visited")
+
+                # Append the index of x to each of v's paths in its sent bundle if the path does not already go through x
+                neighborIndex = Graph.nodes[neighbor]['index']
+                receivedPaths = [
+                                    path.extend(neighborIndex) 
+                                    for path in Graph.nodes[v]['pathBundle'] 
+                                    if neighborIndex not in path 
+                                ]
+
+                if(Tracer.enabled):
+                    Tracer.deliver(Graph.graph["step"], v, neighbor, receivedPaths)
+
+                # Merge only as far as needed to know if the bundle overflows, skipping paths it already has
+                greatBundle, numOfNewPaths = mergeBundles(Graph.nodes[neighbor]['pathBundle'], receivedPaths, maxPaths+1)
 
                 # If there are paths left that survived the previous filter
-                if(validPaths):
-                    logging.warning("\tNew path(s): {0}".format(validPaths))
-                    MTP_NPaths.addAdditionalPaths(Graph, neighbor, validPaths)
+                if(numOfNewPaths):
+                    # Only the text log needs the whole great bundle, it lists every path the bundle drops
+                    fullBundle = None
+                    if(Tracer.textEnabled):
+                        newPaths = [path for path in receivedPaths if path not in Graph.nodes[neighbor]['pathBundle']]
+                        Tracer.text("\tNew path(s): {0}".format(formatBundle(Graph, newPaths)))
+                        fullBundle = mergeBundles(Graph.nodes[neighbor]['pathBundle'], receivedPaths)[0]
+                    MTP_NPaths.addAdditionalPaths(Graph, neighbor, greatBundle, fullBundle)
                     
                     # If the maximum number of paths has been exceeded, remove the extras
                     if(len(Graph.nodes[neighbor]['pathBundle']) > maxPaths):
-                        logging.warning("\tRemoved paths: {0}".format(Graph.nodes[neighbor]['pathBundle'][maxPaths:]))
-                        del Graph.nodes[neighbor]['pathBundle'][maxPaths:]
-                        logging.warning("\tUpdated path bundle: {0}".format(Graph.nodes[neighbor]['pathBundle']))
+                        if(Tracer.textEnabled):
+                            Tracer.text("\tRemoved paths: {0}".format(formatBundle(Graph, (fullBundle or Graph.nodes[neighbor]['pathBundle'])[maxPaths:])))
+                        setPathBundle(Graph, neighbor, Graph.nodes[neighbor]['pathBundle'][:maxPaths])
+                        if(Tracer.textEnabled):
+                            Tracer.text("\tUpdated path bundle: {0}".format(formatBundle(Graph, Graph.nodes[neighbor]['pathBundle'])))
 
                     # If the maximum number of paths is hit exactly, note that the bundle is full
                     elif(len(Graph.nodes[neighbor]['pathBundle']) == maxPaths):
-                        logging.warning("\tUpdated path bundle: {0}".format(Graph.nodes[neighbor]['pathBundle']))
+                        if(Tracer.textEnabled):
+                            Tracer.text("\tUpdated path bundle: {0}".format(formatBundle(Graph, Graph.nodes[neighbor]['pathBundle'])))
 
                     # If x is now a child of v, note that updated relationship
-                    if(Graph.nodes[neighbor]['pathBundle'][0][-2] == Graph.nodes[v]['ID']):
+                    if(Graph.nodes[neighbor]['pathBundle'][0].parent() == Graph.nodes[v]['index']):
                         # v is linked to neighbor as a parent, neighbor is linked to v as a child
                         treeValidator.addParent(v, neighbor)
-                else:
-                    logging.warning("\tNo new paths, no changes.")
+                elif(Tracer.textEnabled):
+                    Tracer.text("\tNo new paths, no changes.")
 
         if(not reversed):
             currentDepthVertices.reverse()
             reversed = True
-            logging.warning("\n++++++ REVERSE ++++++\n")
+            if(Tracer.textEnabled):
+                Tracer.text("\n++++++ REVERSE ++++++\n")
 
         else:
             currentDepthVertices = copy.deepcopy(nextDepthVertices)
             nextDepthVertices.clear()
             reversed = False
 
+    # The visited marks go back onto the graph
+    for vertex, mark in zip(core.vertices, visited):
+        Graph.nodes[vertex]['visited'] = bool(mark)
+
     # Log the results of the process
     logResults(Graph, treeValidator)
 
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "init")
+
     return
 
 def logResults(graph, treeValidator):
     # Log the resulting path bundles, tree, and statistics if necessary
-    logging.warning("-----------\nFINAL RESULTS:\n")
-    for vertex in sorted(graph.nodes):
-        logging.warning("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, graph.nodes[vertex]['ID'], graph.nodes[vertex]['pathBundle'], treeValidator.relationshipStatus(vertex)))
+    if(Tracer.textEnabled):
+        Tracer.text("-----------\nFINAL RESULTS:\n")
+        for vertex in sorted(graph.nodes):
+            Tracer.text("\t{0} ({1})\npath bundle = {2}\n{3}\n".format(vertex, graph.nodes[vertex]['ID'], formatBundle(graph, graph.nodes[vertex]['pathBundle']), treeValidator.relationshipStatus(vertex)))
 
     # Confirm that what is created is a tree
-    logging.warning("Results is a tree: {0}".format(treeValidator.isTree()))
\ No newline at end of file
+    if(Tracer.textEnabled):
+        Tracer.text("Results is a tree: {0}".format(treeValidator.isTree()))
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+===========================
+MESSAGE PASSING ENGINE
+===========================
+'''
+from collections import deque
+
+'''
+FIFO queue of vertices waiting to send an update to their neighbors.
+
+Vertices are only queued once at a time, so membership is tracked in a set alongside
+the deque to keep both enqueue and "already queued" checks constant-time.
+'''
+class SendingQueue:
+    __slots__ = ("queue", "members")
+
+    def __init__(self, vertices=()):
+        self.queue = deque()
+        self.members = set()
+
+        for vertex in vertices:
+            self.append(vertex)
+
+    def append(self, vertex):
+        # Returns True if the vertex was added, False if it was already waiting to send
+        if(vertex in self.members):
+            return False
+
+        self.queue.append(vertex)
+        self.members.add(vertex)
+        return True
+
+    def popleft(self):
+        vertex = self.queue.popleft()
+        self.members.discard(vertex)
+        return vertex
+
+    def clear(self):
+        self.queue.clear()
+        self.members.clear()
+        return
+
+    def __contains__(self, vertex):
+        return vertex in self.members
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __bool__(self):
+        return bool(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def __repr__(self):
+        # Same format as the list-based queues, so existing log output is unchanged
+        return repr(list(self.queue))
+
+'''
+Simulate the distributed algorithm serially by draining the sending queue iteratively
+
+send = function called with the vertex that is currently sending, enqueues any neighbor that changed
+sendingQueue = the SendingQueue shared with the send function
+sender = the first vertex to send (if None, the head of the queue is used)
+sendLast = if the final vertex left in the queue is sent. The meshed tree algorithms stop once only
+           one vertex remains, which is kept so their step counts stay comparable with earlier results
+'''
+def run(send, sendingQueue, sender=None, sendLast=True):
+    if(sender is None):
+        if(not sendingQueue):
+            return
+
+        sender = sendingQueue.popleft()
+
+    while True:
+        send(sender)
+
+        if(not sendingQueue):
+            return
+
+        sender = sendingQueue.popleft()
+
+        if(not sendingQueue and not sendLast):
+            return
@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+'''
+===========================
+MESHED TREE PATHS AND PATH BUNDLES
+===========================
+'''
+from functools import total_ordering
+import Snapshot
+import Tracer
+
+#
+# Constants
+#
+SIGNATURE_BITS = 63 # Size of the per-path vertex signature used to short-circuit loop checks
+
+'''
+A path from the root to a vertex, stored as integer vertex indices.
+
+Each path is a node pointing at the path it was extended from (its prefix), so extending a
+path by one hop allocates a single fixed-size object and every path in every bundle shares
+its prefix with the path it was received from. A bitset signature of the vertices on the
+path answers most "is this vertex already on the path" checks without walking it.
+
+Paths are ordered the same way the string form was: shorter paths first, then by the
+vertex indices in order from the root.
+'''
+@total_ordering
+class Path:
+    __slots__ = ("prefix", "vertex", "length", "mask")
+
+    def __init__(self, vertex, prefix=None):
+        self.prefix = prefix
+        self.vertex = vertex
+
+        if(prefix is None):
+            self.length = 1
+            self.mask = 1 << (vertex % SIGNATURE_BITS)
+        else:
+            self.length = prefix.length + 1
+            self.mask = prefix.mask | (1 << (vertex % SIGNATURE_BITS))
+
+    # Path to the given vertex through this path (the equivalent of path + ID)
+    def extend(self, vertex):
+        return Path(vertex, self)
+
+    # The vertex before the last one on the path, the parent of the vertex that owns it
+    def parent(self):
+        if(self.prefix is None):
+            return None
+
+        return self.prefix.vertex
+
+    # Vertex indices from the root to the end of the path
+    @property
+    def vertices(self):
+        vertices = [None] * self.length
+        node = self
+
+        for position in range(self.length-1, -1, -1):
+            vertices[position] = node.vertex
+            node = node.prefix
+
+        return tuple(vertices)
+
+    # Directed edges (u, v) of the path, from the root outward
+    def edges(self):
+        vertices = self.vertices
+        return list(zip(vertices, vertices[1:]))
+
+    # If the directed edge u -> v is traversed by the path
+    def hasEdge(self, u, v):
+        if(not (self.mask >> (u % SIGNATURE_BITS)) & 1 or not (self.mask >> (v % SIGNATURE_BITS)) & 1):
+            return False
+
+        node = self
+        while node.prefix is not None:
+            if(node.vertex == v and node.prefix.vertex == u):
+                return True
+            node = node.prefix
+
+        return False
+
+    # String form of the path built from single-character IDs (used for logging)
+    def toString(self, labels):
+        return "".join(labels[vertex] for vertex in self.vertices)
+
+    def __contains__(self, vertex):
+        if(not (self.mask >> (vertex % SIGNATURE_BITS)) & 1):
+            return False
+
+        node = self
+        while node is not None:
+            if(node.vertex == vertex):
+                return True
+            node = node.prefix
+
+        return False
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(self.vertices)
+
+    def __eq__(self, other):
+        if(not isinstance(other, Path)):
+            return NotImplemented
+
+        if(self.length != other.length or self.mask != other.mask):
+            return False
+
+        # Walk back until both paths share the same prefix object, everything before that is identical
+        a, b = self, other
+        while a is not b:
+            if(a.vertex != b.vertex):
+                return False
+            a, b = a.prefix, b.prefix
+
+        return True
+
+    def __lt__(self, other):
+        if(self.length != other.length):
+            return self.length < other.length
+
+        # The first difference from the root decides the order, so keep the one closest to the root
+        isLess = False
+        a, b = self, other
+        while a is not b:
+            if(a.vertex != b.vertex):
+                isLess = a.vertex < b.vertex
+            a, b = a.prefix, b.prefix
+
+        return isLess
+
+    def __hash__(self):
+        return hash(self.vertices)
+
+    # Paths are immutable, so copies can share the same object
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "Path{0}".format(self.vertices)
+
+'''
+Inverted index from each undirected edge to the bundle entries whose paths traverse it.
+
+Entries are (vertex, bundle slot) pairs, kept per edge as a dictionary of vertex --> bitmask of
+slots. Bundles are re-indexed whenever they are replaced (see setPathBundle), which only touches
+the slots that changed, so an edge failure can go straight to the paths it breaks.
+'''
+class EdgeIndex:
+    __slots__ = ("edges",)
+
+    def __init__(self):
+        self.edges = {}
+
+    @staticmethod
+    def edgeKey(u, v):
+        return (u, v) if u < v else (v, u)
+
+    def addPath(self, vertex, slot, path):
+        slotBit = 1 << slot
+
+        for u, v in path.edges():
+            entries = self.edges.setdefault(self.edgeKey(u, v), {})
+            entries[vertex] = entries.get(vertex, 0) | slotBit
+
+        return
+
+    def removePath(self, vertex, slot, path):
+        slotBit = 1 << slot
+
+        for u, v in path.edges():
+            key = self.edgeKey(u, v)
+            entries = self.edges[key]
+            slotMask = entries[vertex] & ~slotBit
+
+            if(slotMask):
+                entries[vertex] = slotMask
+            else:
+                del entries[vertex]
+                if(not entries):
+                    del self.edges[key]
+
+        return
+
+    # Re-index the slots of a bundle that hold a different path than before
+    def updateBundle(self, vertex, oldBundle, newBundle):
+        for slot in range(max(len(oldBundle), len(newBundle))):
+            oldPath = oldBundle[slot] if slot < len(oldBundle) else None
+            newPath = newBundle[slot] if slot < len(newBundle) else None
+
+            if(oldPath is newPath):
+                continue
+            if(oldPath is not None):
+                self.removePath(vertex, slot, oldPath)
+            if(newPath is not None):
+                self.addPath(vertex, slot, newPath)
+
+        return
+
+    # Vertices with paths over edge (u, v), mapped to the bundle slots those paths are in
+    def getEntries(self, u, v):
+        return {vertex: getSlots(slotMask) for vertex, slotMask in self.edges.get(self.edgeKey(u, v), {}).items()}
+
+    # Bundle slots of a vertex holding paths over edge (u, v)
+    def getSlots(self, u, v, vertex):
+        return getSlots(self.edges.get(self.edgeKey(u, v), {}).get(vertex, 0))
+
+def getSlots(slotMask):
+    slots = []
+    slot = 0
+
+    while slotMask:
+        if(slotMask & 1):
+            slots.append(slot)
+        slotMask >>= 1
+        slot += 1
+
+    return slots
+
+'''
+Replace the path bundle of a vertex, keeping the graph's edge index up to date
+
+Graph = The graph the algorithm is run on
+vertex = The vertex whose path bundle is being replaced
+bundle = The new path bundle
+'''
+def setPathBundle(Graph, vertex, bundle):
+    Snapshot.save(Graph, vertex, 'pathBundle')
+    Graph.graph['edgeIndex'].updateBundle(vertex, Graph.nodes[vertex]['pathBundle'], bundle)
+    Graph.nodes[vertex]['pathBundle'] = bundle
+
+    if(Tracer.enabled):
+        Tracer.bundleUpdate(Graph.graph["step"], vertex, bundle)
+
+    return
+
+'''
+Give every vertex an integer index (in sorted vertex order) that paths are built from
+
+Graph = The graph the algorithm is run on
+'''
+def setVertexIndices(Graph):
+    Graph.graph['index_to_vertex'] = sorted(Graph.nodes)
+
+    for index, vertex in enumerate(Graph.graph['index_to_vertex']):
+        Graph.nodes[vertex]['index'] = index
+
+    return
+
+'''
+Merge paths received from a neighbor into a path bundle (both sorted best path first)
+
+Paths the bundle already holds are skipped as the two are walked, and the merge stops as soon
+as maxPaths paths have been produced, so nothing is allocated beyond the resulting bundle.
+
+bundle = The current path bundle of the receiving vertex
+receivedPaths = The paths sent by the neighbor, already extended to the receiving vertex
+maxPaths = The maximum number of paths to produce (None to merge everything)
+
+Returns the merged bundle and the number of received paths that were new to the bundle. If the
+merge stopped early, paths beyond maxPaths were not looked at and are not counted.
+'''
+def mergeBundles(bundle, receivedPaths, maxPaths=None):
+    greatBundle = []
+    numOfNewPaths = 0
+
+    i = 0
+    j = 0
+    bundleSize = len(bundle)
+    receivedSize = len(receivedPaths)
+
+    while (i < bundleSize or j < receivedSize) and len(greatBundle) != maxPaths:
+        if(j == receivedSize):
+            path = bundle[i]
+            i += 1
+        elif(i == bundleSize):
+            path = receivedPaths[j]
+            j += 1
+            numOfNewPaths += 1
+        else:
+            current = bundle[i]
+            received = receivedPaths[j]
+
+            if(received < current):
+                path = received
+                j += 1
+                numOfNewPaths += 1
+            elif(current < received):
+                path = current
+                i += 1
+            else:
+                # The bundle already has this path
+                path = current
+                i += 1
+                j += 1
+
+        greatBundle.append(path)
+
+    return greatBundle, numOfNewPaths
+
+'''
+String form of a path or path bundle, based on the single-character vertex IDs
+'''
+def formatPath(Graph, path):
+    return path.toString(Graph.graph['index_to_ID'])
+
+def formatBundle(Graph, bundle):
+    return [path.toString(Graph.graph['index_to_ID']) for path in bundle]
+
+def formatEdges(Graph, edges):
+    return ["".join(Graph.graph['index_to_ID'][vertex] for vertex in edge) for edge in edges]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+'''
+===========================
+ARRAY-BACKED PORT STATE
+===========================
+'''
+import numpy as np
+
+#
+# Constants
+#
+INFINITY = float('inf')
+
+'''
+Per-port state of a spanning tree algorithm (RSTA, STA), kept in NumPy columns instead of a Python
+object per port.
+
+Every vertex has one port per neighbor. Ports are numbered by (vertex index, neighbor index), with
+vertex indices given in sorted vertex order, so the ports of a vertex are a contiguous range and the
+port on an edge is found by binary search over a single key column. Each port holds:
+
+    rpc = Root path cost of the vector heard/held on the port (whole hop counts, or infinity)
+    bid = Bridge ID of the vector (RSTA keeps the index of the vertex whose VID it is)
+    role = The port role, stored as its position in the algorithm's list of roles
+
+The ports are fixed when the table is built. Removing an edge from the graph afterwards leaves its
+ports in the table (the algorithms mark them as broken).
+
+Graph = The graph the algorithm is run on
+roles = The role names the algorithm uses, the first one is the starting role of every port
+'''
+class PortTable:
+    __slots__ = ("vertices", "index", "indptr", "neighbors", "keys", "adjacencyPorts", "rpc", "bid", "role", "roles", "roleCodes")
+
+    def __init__(self, Graph, roles):
+        self.vertices = sorted(Graph.nodes)
+        self.index = {vertex: index for index, vertex in enumerate(self.vertices)}
+        self.roles = tuple(roles)
+        self.roleCodes = {role: code for code, role in enumerate(self.roles)}
+
+        numOfVertices = len(self.vertices)
+        adjacency = [[self.index[neighbor] for neighbor in Graph.neighbors(vertex)] for vertex in self.vertices]
+        degrees = np.fromiter((len(neighbors) for neighbors in adjacency), dtype=np.int64, count=numOfVertices)
+
+        self.indptr = np.zeros(numOfVertices + 1, dtype=np.int64)
+        np.cumsum(degrees, out=self.indptr[1:])
+        numOfPorts = int(self.indptr[-1])
+
+        owners = np.repeat(np.arange(numOfVertices, dtype=np.int64), degrees)
+        neighbors = np.fromiter((neighbor for row in adjacency for neighbor in row), dtype=np.int64, count=numOfPorts)
+
+        # Number the ports by (vertex, neighbor), and remember the neighbor order of each vertex for the dictionary view
+        order = np.lexsort((neighbors, owners))
+        self.neighbors = neighbors[order].astype(np.int32)
+        self.keys = owners[order] * numOfVertices + neighbors[order]
+        self.adjacencyPorts = np.empty(numOfPorts, dtype=np.int32)
+        self.adjacencyPorts[order] = np.arange(numOfPorts, dtype=np.int32)
+
+        self.rpc = np.full(numOfPorts, INFINITY, dtype=np.float64)
+        self.bid = np.zeros(numOfPorts, dtype=np.int32)
+        self.role = np.zeros(numOfPorts, dtype=np.uint8)
+
+    # The port of vertex u on the edge to vertex v (KeyError if there is no such port)
+    def port(self, u, v):
+        key = self.index[u] * len(self.vertices) + self.index[v]
+        port = int(self.keys.searchsorted(key))
+
+        if(port == len(self.keys) or self.keys[port] != key):
+            raise KeyError((u, v))
+
+        return port
+
+    # Ports of a vertex, in the order the graph listed its neighbors when the table was built
+    def ports(self, vertex):
+        index = self.index[vertex]
+        return self.adjacencyPorts[self.indptr[index]:self.indptr[index+1]].tolist()
+
+    # The vertex on the other end of a port
+    def neighbor(self, port):
+        return self.vertices[self.neighbors.item(port)]
+
+    def getRPC(self, port):
+        rpc = self.rpc.item(port)
+        return rpc if rpc == INFINITY else int(rpc)
+
+    def getBID(self, port):
+        return self.bid.item(port)
+
+    def getRole(self, port):
+        return self.roles[self.role.item(port)]
+
+    def setVector(self, port, rpc, bid):
+        self.rpc[port] = rpc
+        self.bid[port] = bid
+        return
+
+    def setRole(self, port, role):
+        self.role[port] = self.roleCodes[role]
+        return
+
+    # Copy of the state of a vertex's ports (e.g. for a snapshot)
+    def getRows(self, vertex):
+        index = self.index[vertex]
+        rows = slice(self.indptr[index], self.indptr[index+1])
+
+        return (self.rpc[rows].copy(), self.bid[rows].copy(), self.role[rows].copy())
+
+    # Put back the state of a vertex's ports from getRows
+    def setRows(self, vertex, state):
+        index = self.index[vertex]
+        rows = slice(self.indptr[index], self.indptr[index+1])
+
+        self.rpc[rows], self.bid[rows], self.role[rows] = state
+        return
+
+    '''
+    Dictionary view of a vertex's ports, {(vertex, neighbor): [vector, role]} (for logging)
+
+    vector = Function building the algorithm's vector from a root path cost and bridge ID
+    '''
+    def view(self, vertex, vector):
+        return {(vertex, self.neighbor(port)): [vector(self.getRPC(port), self.getBID(port)), self.getRole(port)] for port in self.ports(vertex)}
+
+    def __len__(self):
+        return len(self.keys)
@@ -1,13 +1,19 @@
 import logging
+import Tracer
+import Instrumentation
 
-from collections import namedtuple, Counter
-from queue import PriorityQueue
+from collections import namedtuple
 from operator import itemgetter
-from copy import deepcopy
 from timeit import default_timer as timer # Get elasped time of execution
 from os.path import join as getFile
 from TreeAnalyzer import TreeValidator
+from MessagePassing import SendingQueue
+from IndexedPriorityQueue import IndexedPriorityQueue
+from PortTable import PortTable
+from CSRGraph import getCSR, cachedCSR
 from networkx import NetworkXError
+import MessagePassing
+import Snapshot
 
 #
 # Constants
@@ -19,12 +25,46 @@ LOG_FILE_BATCH = "{}batch_test.csv"
 # Vector that is exchanged between vertices to determine tree structure
 RSTAVector = namedtuple("RSTA_Vector", "RPC VID")
 
+UNKNOWN_ROLE = "U"
 DESIGNATED_ROLE = "D"
 ROOT_ROLE = "R"
 ALTERNATE_ROLE = "A"
+BROKEN_ROLE = "B"
+RSTA_ROLES = (UNKNOWN_ROLE, DESIGNATED_ROLE, ROOT_ROLE, ALTERNATE_ROLE, BROKEN_ROLE) # Order of the role codes in the port table
 
-# Sending Queue
-Q = []
+# Per-vertex state the algorithm changes (recorded by an active snapshot before each change), the
+# ports (RT) of every vertex are kept in the simulation's port table
+RSTA_STATE = ("VV", "PV", "RT", "AVPQ")
+
+'''
+State of a single RSTA run: the graph it runs on (which keeps the per-vertex vectors and alternate
+queues), the root, the port table, the step counter, the sending queue and the tree validator. Each run
+(init or a failure reconvergence) gets its own, so runs never share a queue or a step counter and
+several can run in the same process.
+
+The step count and the port table are only put on the graph (Graph.graph["step"] and
+Graph.graph["portTable"]) when the run reports its results, see report.
+'''
+class Simulation:
+    __slots__ = ("G", "root", "portTable", "step", "queue", "treeValidator")
+
+    def __init__(self, G, root, portTable, treeValidator):
+        self.G = G
+        self.root = root
+        self.portTable = portTable
+        self.step = 0 # Steps of this run
+        self.queue = SendingQueue() # Vertices waiting to send their vector
+        self.treeValidator = treeValidator
+
+    def run(self, sender=None):
+        MessagePassing.run(lambda s: send(self, s), self.queue, sender=sender)
+        return
+
+    # Copy the step count and the port table onto the graph, for the results and later failure experiments
+    def report(self):
+        self.G.graph["step"] = self.step
+        self.G.graph["portTable"] = self.portTable
+        return
 
 ### OUTPUT / FORMATTING FUNCTIONS ###
 def setVIDs(Graph, root):
@@ -36,13 +76,15 @@ def setVIDs(Graph, root):
         Graph.graph['VID_to_vertex'][chr(65 + IDCount)] = node
 
         if(node == root):
-            logging.warning("Root node is {0}, VID = {1}\n".format(node, Graph.nodes[node]['VID']))
-        else:
-            logging.warning("Non-Root node {0}, VID = {1}\n".format(node, Graph.nodes[node]['VID']))
+            if(Tracer.textEnabled):
+                Tracer.text("Root node is {0}, VID = {1}\n".format(node, Graph.nodes[node]['VID']))
+        elif(Tracer.textEnabled):
+            Tracer.text("Non-Root node {0}, VID = {1}\n".format(node, Graph.nodes[node]['VID']))
 
         IDCount += 1
 
-    logging.warning("---------\n\n")
+    if(Tracer.textEnabled):
+        Tracer.text("---------\n\n")
 
     return
 
@@ -60,27 +102,31 @@ def prettyEdgeRolesOutput(G, v):
     return output
 
 def logRSTAInfo(Graph, treeValidator, title):
-    logging.warning(f"\n====={title}=====\n")
+    if(Tracer.textEnabled):
+        Tracer.text(f"\n====={title}=====\n")
 
-    for v in sorted(Graph.nodes):
-        logging.warning("{nodeName} ({VID}) - RPC: {RPC}".format(nodeName=v, VID=Graph.nodes[v]['VID'], RPC=Graph.nodes[v]['VV'].RPC))
+    if(Tracer.textEnabled):
+        for v in sorted(Graph.nodes):
+            Tracer.text("{nodeName} ({VID}) - RPC: {RPC}".format(nodeName=v, VID=Graph.nodes[v]['VID'], RPC=Graph.nodes[v]['VV'].RPC))
 
-        for edge in Graph.edges([v]):
-            RPC = Graph.nodes[v]["RT"][(edge)][0].RPC
-            VID = Graph.nodes[v]["RT"][(edge)][0].VID
-            role = Graph.nodes[v]["RT"][(edge)][1]
-            logging.warning(f"{edge}: RPC: {RPC} | VID: {VID} | Role: {role}")
+            ports = getPorts(Graph, v)
+            for edge in Graph.edges([v]):
+                RPC = ports[edge][0].RPC
+                VID = ports[edge][0].VID
+                role = ports[edge][1]
+                Tracer.text(f"{edge}: RPC: {RPC} | VID: {VID} | Role: {role}")
 
-        logging.warning(treeValidator.relationshipStatus(v))
-        logging.warning("")
+            Tracer.text(treeValidator.relationshipStatus(v))
+            Tracer.text("")
 
-    logging.warning("steps: {}".format(Graph.graph["step"]))
-    logging.warning("Result is a tree: {0}".format(treeValidator.isTree()))
+    if(Tracer.textEnabled):
+        Tracer.text("steps: {}".format(Graph.graph["step"]))
+        Tracer.text("Result is a tree: {0}".format(treeValidator.isTree()))
 
     return
 
 '''
-Data:   RSTA Vector in the form {RPC, VID}, sending queue Q, 
+Data:   RSTA Vector in the form {RPC, VID}, sending queue Q (per Simulation), 
         array of priority queues for each vertex alt, parent struture
         parent to link nodes with their upstream parent
 
@@ -90,14 +136,21 @@ Output: Parent structure, which will create a shortest path tree
 '''
 def init(G, r, logFilePath, batch=False, testName=None, removal=None):
     #setLoggingLevel(logFilePath, batch, testName)
+    Instrumentation.phase("init")
     setVIDs(G, r)
-    G.graph["step"] = 0
 
     # Create a validation object to make sure the result is a tree
     treeValidator = TreeValidator(G.nodes, r) 
 
+    # Check the graph's core once, the sends read it with cachedCSR
+    getCSR(G)
 
-    Q.append(r)
+    table = PortTable(G, RSTA_ROLES)
+    simulation = Simulation(G, r, table, treeValidator)
+    simulation.queue.append(r)
+
+    if(Tracer.enabled):
+        Tracer.phase(simulation.step, "init")
 
     for v in G:
         if(v == r):
@@ -105,24 +158,33 @@ def init(G, r, logFilePath, batch=False, testName=None, removal=None):
         else:
             G.nodes[v]['VV'] = RSTAVector(float('inf'), G.nodes[v]['VID'])
         
-        G.nodes[v]["RT"] = {}
-        G.nodes[v]["AVPQ"] = PriorityQueue() # PQ to keep track of AV order
-        G.nodes[v]["Delete"] = Counter() # Counter to allow for lazy deletions from PQ
+        G.nodes[v]["AVPQ"] = IndexedPriorityQueue() # Alternate ports, ordered by the vector heard on them
         G.nodes[v]['PV'] = None
 
-        for localEdge in G.edges([v]):
+        for port in table.ports(v):
             if(v == r):
-                 G.nodes[r]["RT"][localEdge] = [RSTAVector(0, G.nodes[r]['VID']), "D"]
+                table.setVector(port, 0, table.index[r])
+                table.setRole(port, DESIGNATED_ROLE)
             else:
-                G.nodes[v]["RT"][localEdge] = [RSTAVector(float('inf'), G.nodes[v]['VID']), "U"]
+                table.setVector(port, float('inf'), table.index[v])
+                table.setRole(port, UNKNOWN_ROLE)
+
+            if(Tracer.enabled):
+                Tracer.roleChange(simulation.step, v, table.neighbor(port), table.getRole(port))
 
-    s = Q.pop(TOP_NODE)
-    send(G, r, s, treeValidator)
+    Instrumentation.phase("convergence")
+    simulation.run()
+    simulation.report()
     logRSTAInfo(G, treeValidator, "INIT RESULTS")
 
+    if(Tracer.enabled):
+        Tracer.phaseEnd(simulation.step, "init")
+
     if(not treeValidator.isTree()):
         raise NetworkXError("RSTA graph did not converge.")
 
+    G.graph["treeValidator"] = treeValidator
+
     # For batch testing
     logging.error("{0},{1},{2}".format(G.number_of_nodes(), G.number_of_edges(), G.graph["step"]))
 
@@ -145,233 +207,310 @@ def failureReconvergence(G, r, brokenVertex1, brokenVertex2, treeValidator):
     1. Y is inferior (R), X is superior (D) [X_D--------R_Y]
     2. Y is inferior (A), X is superior (D) [X_D--------A_Y]
     '''
-    # Grab the information from the appropriate nodes based on the broken edge
+    Instrumentation.phase("failure")
+
+    Snapshot.save(G, brokenVertex1, *RSTA_STATE)
+    Snapshot.save(G, brokenVertex2, *RSTA_STATE)
+    getCSR(G)
+
+    # The reconvergence continues from the converged ports, with its own step count
+    simulation = Simulation(G, r, G.graph["portTable"], treeValidator)
+
+    # Grab the ports of the broken edge
+    table = simulation.portTable
     affectedVertices = {
-                        brokenVertex1: G.nodes[brokenVertex1]["RT"][(brokenVertex1, brokenVertex2)],
-                        brokenVertex2: G.nodes[brokenVertex2]["RT"][(brokenVertex2, brokenVertex1)]
+                        brokenVertex1: table.port(brokenVertex1, brokenVertex2),
+                        brokenVertex2: table.port(brokenVertex2, brokenVertex1)
                         }
 
     startingVertex = None
-    G.graph["step"] = 0 # Restart count
 
-    for vertex in affectedVertices:
+    if(Tracer.enabled):
+        Tracer.phase(simulation.step, "reconvergence")
+
+    for vertex, port in affectedVertices.items():
         # The root port is broken, move to an alternate port if possible
-        if(affectedVertices[vertex][1] == ROOT_ROLE):
+        if(table.getRole(port) == ROOT_ROLE):
             startingVertex = vertex
-            getNewRootPort(G, vertex, treeValidator)
+            getNewRootPort(simulation, vertex)
 
-        elif(affectedVertices[vertex][1] == ALTERNATE_ROLE):
-            G.nodes[vertex]["Delete"][affectedVertices[vertex][0]] += 1
+        elif(table.getRole(port) == ALTERNATE_ROLE):
+            G.nodes[vertex]["AVPQ"].remove(port)
 
-        affectedVertices[vertex][1] = "B"
-        G.graph["step"] += 1
+        setRole(simulation, vertex, port, BROKEN_ROLE)
+        simulation.step += 1
 
-    logging.warning("")
+    if(Tracer.textEnabled):
+        Tracer.text("")
 
     # Remove the edge from the graph
     if(G.has_edge(brokenVertex1, brokenVertex2)):
-        G.remove_edge(brokenVertex1, brokenVertex2)
+        Snapshot.removeEdge(G, brokenVertex1, brokenVertex2)
     else:
-        G.remove_edge(brokenVertex2, brokenVertex1)
+        Snapshot.removeEdge(G, brokenVertex2, brokenVertex1)
 
     # Start sending and reconverging, if necessary
+    Instrumentation.phase("recovery")
     if(startingVertex):
-        send(G, r, startingVertex, treeValidator)
+        simulation.run(sender=startingVertex)
+        simulation.report()
         logRSTAInfo(G, treeValidator, "RECONVERGENCE RESULTS")
     else:
-        logging.warning(f"\n=====RECONVERGENCE RESULTS=====\n")
-        logging.warning("Alternate/Designated port broken, no change.")
+        simulation.report()
+        if(Tracer.textEnabled):
+            Tracer.text(f"\n=====RECONVERGENCE RESULTS=====\n")
+            Tracer.text("Alternate/Designated port broken, no change.")
 
-    return
+    if(Tracer.enabled):
+        Tracer.phaseEnd(simulation.step, "reconvergence")
+
+    return treeValidator
 
-def send(G, root, sender, treeValidator):
-    logging.warning(f"\n-------------------{sender} sending [{G.nodes[sender]['VV']}]-------------------")
+def send(simulation, sender):
+    G = simulation.G
+    root = simulation.root
+    treeValidator = simulation.treeValidator
+    Q = simulation.queue
+    table = simulation.portTable
 
-    for receiver in G.neighbors(sender):
-        logging.warning(f"\n+++++++++++{receiver} receiving [{G.nodes[receiver]['VV']}]+++++++++++")
-        G.graph["step"] += 1 # For each neighbor that has received an RSTA Vector
+    if(Tracer.textEnabled):
+        Tracer.text(f"\n-------------------{sender} sending [{G.nodes[sender]['VV']}]-------------------")
+
+    for receiver in cachedCSR(G).neighbors(sender):
+        if(Tracer.textEnabled):
+            Tracer.text(f"\n+++++++++++{receiver} receiving [{G.nodes[receiver]['VV']}]+++++++++++")
+        simulation.step += 1 # For each neighbor that has received an RSTA Vector
 
         # If the receiver is the root, skip, as the root won't have any changes
         if(receiver == root):
-            logging.warning("I am root, ignore.")
+            if(Tracer.textEnabled):
+                Tracer.text("I am root, ignore.")
             continue
 
-        # Make a copy of the receivers current parent vector, note that it hasn't been updated yet (may not be updated)
+        Snapshot.save(G, receiver, *RSTA_STATE)
+
+        # Note the receivers current parent port and what the port held, they haven't been updated yet (may not be updated)
         updated = False
-        receiverOldPV = deepcopy(G.nodes[receiver]['PV']) # PV = Parent Vector
-        receivedOldTV = deepcopy(G.nodes[receiver]['RT'][(receiver, sender)]) # TV = Table Vector
+        port = table.port(receiver, sender)
+        receiverOldPV = G.nodes[receiver]['PV'] # PV = Parent Vector
+        receivedOldTV = (getPortVector(simulation, port), table.getRole(port)) # TV = Table Vector
 
         # "Receive" the vector on the neighbor and update the weight +1 for the edge it traveled over
         receivedVector = RSTAVector(G.nodes[sender]['VV'].RPC + 1, G.nodes[sender]['VV'].VID)
+
+        if(Tracer.enabled):
+            Tracer.deliver(simulation.step, sender, receiver, receivedVector)
         
         # Update table with what you've received [VV from sender is noted]
-        G.nodes[receiver]["RT"][(receiver, sender)][0] = receivedVector
+        setPortVector(simulation, port, receivedVector)
 
         # If the device has already seen this before, don't do anything
         if(receivedVector == receivedOldTV[0]):
-            logging.warning("VV hasn't been updated, ignore.")
+            if(Tracer.textEnabled):
+                Tracer.text("VV hasn't been updated, ignore.")
             continue
         
         # If there is a situation where there is no parent
         elif(receiverOldPV is None):
-            logging.warning("No current root, sender is the new root by default.")
+            if(Tracer.textEnabled):
+                Tracer.text("No current root, sender is the new root by default.")
             treeValidator.addParent(sender, receiver)
-            G.graph["step"] += 1 # For each neighbor that has received the updated information
+            simulation.step += 1 # For each neighbor that has received the updated information
 
             # Update parent and vertex vectors
             G.nodes[receiver]['PV'] = (receiver, sender)
             G.nodes[receiver]['VV'] = RSTAVector(receivedVector.RPC, G.nodes[receiver]['VID'])
 
-            # If this was previously an alternate port, it needs to be removed from the priority queue lazily
-            if(G.nodes[receiver]["RT"][(receiver, sender)][1] == ALTERNATE_ROLE):
-                G.nodes[receiver]["Delete"][receivedOldTV[0]] += 1
-                logging.warning("Interface was set to alternate prior, mark for removal.")
+            # If this was previously an alternate port, it is removed from the priority queue right away
+            if(table.getRole(port) == ALTERNATE_ROLE):
+                G.nodes[receiver]["AVPQ"].remove(port)
+                if(Tracer.textEnabled):
+                    Tracer.text("Interface was set to alternate prior, removed from AVPQ.")
 
             # Update table vector
-            G.nodes[receiver]["RT"][(receiver, sender)][1] = ROOT_ROLE
+            setRole(simulation, receiver, port, ROOT_ROLE)
 
-            logging.warning(f"PV ---> {G.nodes[receiver]['PV']}")
-            logging.warning(f"VV ---> {G.nodes[receiver]['VV']}")
-            logging.warning(f"{receiver, sender} Role ---> {ROOT_ROLE}")
+            if(Tracer.textEnabled):
+                Tracer.text(f"PV ---> {G.nodes[receiver]['PV']}")
+                Tracer.text(f"VV ---> {G.nodes[receiver]['VV']}")
+                Tracer.text(f"{receiver, sender} Role ---> {ROOT_ROLE}")
 
         # If the received vector is the best vector heard from all neighbors
-        elif(receivedVector < G.nodes[receiver]["RT"][receiverOldPV][0]):
-            logging.warning("Sender beats current PV, new root.")
+        elif(receivedVector < getPortVector(simulation, table.port(*receiverOldPV))):
+            if(Tracer.textEnabled):
+                Tracer.text("Sender beats current PV, new root.")
             treeValidator.addParent(sender, receiver)
-            G.graph["step"] += 1 # For each neighbor that has received the updated information
+            simulation.step += 1 # For each neighbor that has received the updated information
 
             # Update parent and vertex vectors
             G.nodes[receiver]['PV'] = (receiver, sender)
             G.nodes[receiver]['VV'] = RSTAVector(receivedVector.RPC, G.nodes[receiver]['VID'])
 
-            # If this was previously an alternate port, it needs to be removed from the priority queue lazily
-            if(G.nodes[receiver]["RT"][(receiver, sender)][1] == ALTERNATE_ROLE):
-                G.nodes[receiver]["Delete"][receivedOldTV[0]] += 1
-                logging.warning("Interface was set to alternate prior, mark for removal.")
+            # If this was previously an alternate port, it is removed from the priority queue right away
+            if(table.getRole(port) == ALTERNATE_ROLE):
+                G.nodes[receiver]["AVPQ"].remove(port)
+                if(Tracer.textEnabled):
+                    Tracer.text("Interface was set to alternate prior, removed from AVPQ.")
 
             # Update table vector
-            G.nodes[receiver]["RT"][(receiver, sender)][1] = ROOT_ROLE
+            setRole(simulation, receiver, port, ROOT_ROLE)
 
-            logging.warning(f"PV ---> {G.nodes[receiver]['PV']}")
-            logging.warning(f"VV ---> {G.nodes[receiver]['VV']}")
-            logging.warning(f"{(receiver, sender)} Role ---> {ROOT_ROLE}")
+            if(Tracer.textEnabled):
+                Tracer.text(f"PV ---> {G.nodes[receiver]['PV']}")
+                Tracer.text(f"VV ---> {G.nodes[receiver]['VV']}")
+                Tracer.text(f"{(receiver, sender)} Role ---> {ROOT_ROLE}")
 
             # The old root port needs to be updated to an alternate port, if applicable
-            G.nodes[receiver]["RT"][receiverOldPV][1] = ALTERNATE_ROLE
-            G.nodes[receiver]["AVPQ"].put(G.nodes[receiver]["RT"][receiverOldPV][0])
+            oldRootPort = table.port(*receiverOldPV)
+            setRole(simulation, receiver, oldRootPort, ALTERNATE_ROLE)
+            G.nodes[receiver]["AVPQ"].put(oldRootPort, getPortVector(simulation, oldRootPort))
 
-            logging.warning(f"{receiverOldPV} Role ---> {ALTERNATE_ROLE}")
-            logging.warning(f"{receiverOldPV} put into AVPQ")
-            G.graph["step"] += 1
+            if(Tracer.textEnabled):
+                Tracer.text(f"{receiverOldPV} Role ---> {ALTERNATE_ROLE}")
+                Tracer.text(f"{receiverOldPV} put into AVPQ")
+            simulation.step += 1
 
         # If the receiver has the better vector on the link
         elif(G.nodes[receiver]['VV'] < G.nodes[sender]['VV']):
-            logging.warning("Sender has an inferior VV.")
-            G.graph["step"] += 1 # For each neighbor that has received the updated information
-
-            # If this was previously an alternate port, it needs to be removed from the priority queue lazily
-            if(G.nodes[receiver]["RT"][(receiver, sender)][1] == ALTERNATE_ROLE):
-                G.nodes[receiver]["Delete"][receivedOldTV[0]] += 1
-                logging.warning("Interface was set to alternate prior, mark for removal.")
+            if(Tracer.textEnabled):
+                Tracer.text("Sender has an inferior VV.")
+            simulation.step += 1 # For each neighbor that has received the updated information
+
+            # If this was previously an alternate port, it is removed from the priority queue right away
+            if(table.getRole(port) == ALTERNATE_ROLE):
+                G.nodes[receiver]["AVPQ"].remove(port)
+                if(Tracer.textEnabled):
+                    Tracer.text("Interface was set to alternate prior, removed from AVPQ.")
             # If this was previously a root port, a new root port must be found or reset
-            elif(G.nodes[receiver]["RT"][(receiver, sender)][1] == ROOT_ROLE):
-                getNewRootPort(G, receiver, treeValidator)    
+            elif(table.getRole(port) == ROOT_ROLE):
+                getNewRootPort(simulation, receiver)    
 
             # Update table vector
-            G.nodes[receiver]["RT"][(receiver, sender)][1] = DESIGNATED_ROLE 
+            setRole(simulation, receiver, port, DESIGNATED_ROLE)
 
-            logging.warning(f"{(receiver, sender)} Role ---> {DESIGNATED_ROLE}")               
+            if(Tracer.textEnabled):
+                Tracer.text(f"{(receiver, sender)} Role ---> {DESIGNATED_ROLE}")               
 
         # If it is the alternate port on the link
         else:
-            logging.warning("Sender has the superior VV.")
-            G.graph["step"] += 1 # For each neighbor that has received the updated information
-
-            # If the link was already alternate, but now has an updated value, remove the old entry from the PQ
-            if((receivedOldTV[1] == ALTERNATE_ROLE) and (receivedOldTV[0] != G.nodes[receiver]["RT"][(receiver, sender)][0])):
-                G.nodes[receiver]["Delete"][receivedOldTV[0]] += 1
-                logging.warning("Interface was set to alternate prior, mark old vector for removal.")
-                G.nodes[receiver]["AVPQ"].put(receivedVector)
-                logging.warning(f"{receivedVector} put into AVPQ")  
+            if(Tracer.textEnabled):
+                Tracer.text("Sender has the superior VV.")
+            simulation.step += 1 # For each neighbor that has received the updated information
+
+            # If the link was already alternate, but now has an updated value, its entry in the PQ is replaced
+            if((receivedOldTV[1] == ALTERNATE_ROLE) and (receivedOldTV[0] != receivedVector)):
+                if(Tracer.textEnabled):
+                    Tracer.text("Interface was set to alternate prior, old vector replaced in AVPQ.")
+                G.nodes[receiver]["AVPQ"].put(port, receivedVector) # Replaces the old vector
+                if(Tracer.textEnabled):
+                    Tracer.text(f"{receivedVector} put into AVPQ")  
 
             # If the link was root, that means an updated value is inferior.
             elif(receivedOldTV[1] == ROOT_ROLE):
-                G.nodes[receiver]["Delete"][receivedOldTV[0]] += 1
-                logging.warning("Interface was set to root prior, mark old vector for removal.")
-                G.nodes[receiver]["AVPQ"].put(receivedVector)
-                logging.warning(f"{receivedVector} put into AVPQ")
-                G.nodes[receiver]["RT"][(receiver, sender)][1] = ALTERNATE_ROLE
-                logging.warning(f"{(receiver, sender)} Role ---> {ALTERNATE_ROLE}") 
-                getNewRootPort(G, receiver, treeValidator)
+                if(Tracer.textEnabled):
+                    Tracer.text("Interface was set to root prior, mark old vector for removal.")
+                G.nodes[receiver]["AVPQ"].put(port, receivedVector)
+                if(Tracer.textEnabled):
+                    Tracer.text(f"{receivedVector} put into AVPQ")
+                setRole(simulation, receiver, port, ALTERNATE_ROLE)
+                if(Tracer.textEnabled):
+                    Tracer.text(f"{(receiver, sender)} Role ---> {ALTERNATE_ROLE}") 
+                getNewRootPort(simulation, receiver)
             
             else:
-                G.nodes[receiver]["RT"][(receiver, sender)][1] = ALTERNATE_ROLE
-                logging.warning(f"{(receiver, sender)} Role ---> {ALTERNATE_ROLE}")   
-                G.nodes[receiver]["AVPQ"].put(receivedVector)
-                logging.warning(f"{receivedVector} put into AVPQ")      
+                setRole(simulation, receiver, port, ALTERNATE_ROLE)
+                if(Tracer.textEnabled):
+                    Tracer.text(f"{(receiver, sender)} Role ---> {ALTERNATE_ROLE}")   
+                G.nodes[receiver]["AVPQ"].put(port, receivedVector)
+                if(Tracer.textEnabled):
+                    Tracer.text(f"{receivedVector} put into AVPQ")      
 
-            G.graph["step"] += 1
+            simulation.step += 1
 
         # Note the change that needs to be propagated
         updated = True
 
         if(updated):
-            if(receiver not in Q):
-                Q.append(receiver)
-                logging.warning("Added to the send queue.")
-            else:
-                logging.warning("Already in the send queue.")
-            logging.warning(Q)
-
-    if(Q):
-        s = Q.pop(TOP_NODE)
-        send(G, root, s, treeValidator)
+            if(Q.append(receiver)):
+                if(Tracer.enabled):
+                    Tracer.enqueue(simulation.step, receiver, len(Q))
+                if(Tracer.textEnabled):
+                    Tracer.text("Added to the send queue.")
+            elif(Tracer.textEnabled):
+                Tracer.text("Already in the send queue.")
+            if(Tracer.textEnabled):
+                Tracer.text(Q)
 
     return
 
 
 ### RSTA ADDITIONAL FUNCTIONS ###
-def resetTable(G, vertex):
-    for localEdge in G.edges([vertex]):
-        G.nodes[vertex]["RT"][localEdge] = [RSTAVector(float('inf'), G.nodes[vertex]['VID']), "U"]    
+'''
+The port table keeps a vector as its RPC and the index of the vertex its VID belongs to (VIDs are
+given out in the same sorted vertex order as the table's indices)
+'''
+def getPortVector(simulation, port):
+    table = simulation.portTable
+    return RSTAVector(table.getRPC(port), simulation.G.nodes[table.vertices[table.getBID(port)]]['VID'])
+
+def setPortVector(simulation, port, vector):
+    table = simulation.portTable
+    table.setVector(port, vector.RPC, table.index[simulation.G.graph['VID_to_vertex'][vector.VID]])
+    return
+
+# Ports of a vertex as {(vertex, neighbor): [RSTA vector, role]} (for logging the reported results)
+def getPorts(G, vertex):
+    table = G.graph["portTable"]
+    return table.view(vertex, lambda RPC, BID: RSTAVector(RPC, G.nodes[table.vertices[BID]]['VID']))
+
+def setRole(simulation, vertex, port, role):
+    table = simulation.portTable
+    table.setRole(port, role)
+
+    if(Tracer.enabled):
+        Tracer.roleChange(simulation.step, vertex, table.neighbor(port), role)
 
     return
 
-def getNewRootPort(G, vertex, treeValidator):
-    newRoot = getAlternatePort(G.nodes[vertex]["AVPQ"], G.nodes[vertex]["Delete"])
+def resetTable(simulation, vertex):
+    table = simulation.portTable
+
+    for neighbor in cachedCSR(simulation.G).neighbors(vertex):
+        port = table.port(vertex, neighbor)
+        table.setVector(port, float('inf'), table.index[vertex])
+        table.setRole(port, UNKNOWN_ROLE)
+
+        if(Tracer.enabled):
+            Tracer.roleChange(simulation.step, vertex, neighbor, UNKNOWN_ROLE)
+
+    return
+
+def getNewRootPort(simulation, vertex):
+    G = simulation.G
+    Snapshot.save(G, vertex, *RSTA_STATE)
+    table = simulation.portTable
+
+    # The best alternate port becomes the root port
+    newRoot = G.nodes[vertex]["AVPQ"].pop()
 
     if(not newRoot):
         G.nodes[vertex]['VV'] = RSTAVector(float('inf'), G.nodes[vertex]['VID'])
         G.nodes[vertex]['PV'] = None
-        resetTable(G, vertex)
+        resetTable(simulation, vertex)
         
-        logging.warning(f"\n------------\n{vertex} - Root port lost, no Alternate to fall back on.\n------------\n")
+        if(Tracer.textEnabled):
+            Tracer.text(f"\n------------\n{vertex} - Root port lost, no Alternate to fall back on.\n------------\n")
 
     else:
-        rootPort = (vertex, G.graph['VID_to_vertex'][newRoot[1]])
-        treeValidator.addParent(G.graph['VID_to_vertex'][newRoot[1]], vertex)
+        port = newRoot[0]
+        rootPort = (vertex, table.neighbor(port))
+        simulation.treeValidator.addParent(rootPort[1], vertex)
 
         G.nodes[vertex]['PV'] = rootPort
-        G.nodes[vertex]["RT"][rootPort][1] = ROOT_ROLE
-        G.nodes[vertex]['VV'] = RSTAVector(G.nodes[vertex]["RT"][rootPort][0].RPC, G.nodes[vertex]['VID'])
+        setRole(simulation, vertex, port, ROOT_ROLE)
+        G.nodes[vertex]['VV'] = RSTAVector(table.getRPC(port), G.nodes[vertex]['VID'])
 
-        logging.warning(f"\n------------\n{vertex} - Root port lost, new root port is {rootPort}.\n------------\n")
+        if(Tracer.textEnabled):
+            Tracer.text(f"\n------------\n{vertex} - Root port lost, new root port is {rootPort}.\n------------\n")
 
     return
-
-def getAlternatePort(PQ, deleteDict):
-    # If there are no alternate ports, return as such
-    if(PQ.empty()):
-        return None
-    
-    # Find the best non-deleted alternate
-    while not PQ.empty():
-        alternate = PQ.get()
-
-        if(deleteDict[alternate] > 0):
-            deleteDict[alternate] -= 1
-        else:
-            return alternate
-
-    # If all alternate ports were marked for deletion, there are none and return as such
-    return None
\ No newline at end of file
@@ -23,12 +23,22 @@ Outline:
 
     - The set of all spanning tree priority vectors is totally ordered, a lower-valued priority vector component is superior, and earlier components in the vector are superior.
 ==========================='''
+## Standard modules
+import logging
 from collections import namedtuple
+
+## External modules
+from networkx import NetworkXError
 from tabulate import tabulate
-from timeit import default_timer as timer # Get elasped time of execution
 
-# Location/name of the log file
-LOG_FILE = "RSTA_Output.txt"
+## Custom modules
+import Instrumentation
+import MessagePassing
+import Tracer
+from MessagePassing import SendingQueue
+from PortTable import PortTable
+from CSRGraph import getCSR, cachedCSR
+from TreeAnalyzer import TreeValidator
 
 # Port Role [state]. Setup: [ NODE [port]]------link------[[port] NODE ]
 DESIGNATED_ROLE = "Designated [FWD]" # Superior port on link, forwards traffic, always one on each link
@@ -36,6 +46,7 @@ ROOT_ROLE       = "Root [FWD]"       # Best port on node, forwards traffic
 ALT_ROLE        = "Alternate [BLK]"  # Inferior port on link, blocks traffic
 STARTING_ROLE   = "Undefined [N/A]"  # Starting role, role undefined at startup
 SYNC_ROLE       = "Sync [N/A]"       # When a new root port is chosen, all other ports are put into sync
+STA_ROLES = (STARTING_ROLE, DESIGNATED_ROLE, ROOT_ROLE, ALT_ROLE, SYNC_ROLE) # Order of the role codes in the port table
 
 '''
 Origional Rapid STA priority vector                                                 Modified priority vector
@@ -47,11 +58,32 @@ DesignatedBridgeID = Bridge Identifier, of the transmitting Bridge.
 RSTAVector = namedtuple("RSTA_Vector", "RootPathCost DesignatedBridgeID")
 
 '''
-Each port on each RSTA node is give a structure with its given RSTA port vector
-and the state of that port as a result of exchanging vectors with that link's neighbor. 
+Each port on each RSTA node is given its RSTA port vector and the state of that port as a result
+of exchanging vectors with that link's neighbor, kept in Graph.graph["portTable"] (see PortTable).
 The set of all states on all ports of all nodes in the graph will result in a shortest path tree.
 '''
-portInfo   = namedtuple("Port_Information", "portVector state")
+def getPortVector(table, port):
+    return RSTAVector(table.getRPC(port), table.getBID(port))
+
+def setPortInfo(Graph, vertex, port, portVector, state):
+    table = Graph.graph["portTable"]
+    table.setVector(port, portVector.RootPathCost, portVector.DesignatedBridgeID)
+    setRole(Graph, vertex, port, state)
+
+    return
+
+def setRole(Graph, vertex, port, state):
+    table = Graph.graph["portTable"]
+    table.setRole(port, state)
+
+    if(Tracer.enabled):
+        Tracer.roleChange(Graph.graph["step"], vertex, table.neighbor(port), state)
+
+    return
+
+# Port name format, for logging: localNode_NeighborNode
+def getPortName(node, neighboringNode):
+    return "{0}_{1}".format(node, neighboringNode)
 
 # Gives each node the required data structures, including a vector and state for each port
 def createSTADataStructures(Graph, root):
@@ -65,6 +97,8 @@ def createSTADataStructures(Graph, root):
     startingRPCNonRoot = 999999 # This is not present in the algorithm, it's my own addition
     startingRPCRoot    = 0
 
+    Graph.graph["portTable"] = table = PortTable(Graph, STA_ROLES)
+
     # For each node in the graph, give them an appropriate BID
     for node in Graph:
         if(node != root):
@@ -72,142 +106,171 @@ def createSTADataStructures(Graph, root):
             bridgeID += 1
         else:
             Graph.nodes[node]["BID"] = rootBridgeID
-        
+
         # Log name-BID info for log file
         logNodeInfo = [node,  Graph.nodes[node]["BID"]]
         logOutput.append(logNodeInfo)
 
-        # For each port on each node, add starting port vector based on defined starting defaults
-        for neighboringNode in Graph.neighbors(node):
-            portName = node + "_" + neighboringNode # port name format: localNode_NeighborNode
+        # Starting port vector based on defined starting defaults
+        if(node != root):
+            startingPortVector = RSTAVector(startingRPCNonRoot, Graph.nodes[node]["BID"])
+            startingRole = STARTING_ROLE
+        else:
+            # RSTA root node has the best vector in the graph and all ports are designated
+            startingPortVector = RSTAVector(startingRPCRoot, Graph.nodes[node]["BID"])
+            startingRole = DESIGNATED_ROLE
 
-            if(node != root):
-                startingPortVector = RSTAVector(startingRPCNonRoot, Graph.nodes[node]["BID"])
-                Graph.nodes[node][portName] = portInfo(startingPortVector, STARTING_ROLE)
-            else:
-                # RSTA root node has the best vector in the graph and all ports are designated
-                startingPortVector = RSTAVector(startingRPCRoot, Graph.nodes[node]["BID"])
-                Graph.nodes[node][portName] = portInfo(startingPortVector, DESIGNATED_ROLE)
+        # For each port on each node, add the starting port vector
+        for port in table.ports(node):
+            setPortInfo(Graph, node, port, startingPortVector, startingRole)
 
         # Add starting message vector (vector sent to neighbors), which is the same as the starting port vectors
         Graph.nodes[node]["msgVector"] = startingPortVector
 
         # Add starting root vector (vector of upstream node), which is the same as the starting port vectors
         Graph.nodes[node]["rootVector"] = startingPortVector
-    
+
     return logOutput
 
-# The logic and simulation of the Rapid Spanning Tree Algorithm
-def RSTA(Graph, root):
-    Graph.graph["RSTA"] = 0 # count number of iterations needed
-    Graph.graph["RSTA_recv"] = 0 # count number of times a node receives important information
-    Graph.graph["RSTA_step"] = 0 # count the number of times a node processes ingress information
-    Graph.graph["RSTA_time"] = 0 # Elasped algorithm simulation execution time
+'''
+The logic and simulation of the Rapid Spanning Tree Algorithm
 
-    logFile = open(LOG_FILE, "w")
+Input:  Graph, root node
+
+Output: Port roles of every vertex, the root ports form a shortest path tree. Counters kept on the graph:
+    step = Number of times a node processes ingress information (two vector comparisons per received vector)
+    RSTA = Number of times a node sends its message vector
+    RSTA_recv = Number of times a node receives important information
+'''
+def init(Graph, root, logFilePath, batch=False, testName=None):
+    Instrumentation.phase("init")
+    Graph.graph["step"] = 0
+    Graph.graph["RSTA"] = 0
+    Graph.graph["RSTA_recv"] = 0
+
+    if(Tracer.enabled):
+        Tracer.phase(Graph.graph["step"], "init")
 
     # Define starting/default Bridge ID and port, message, and root vectors for each node
     nodeBIDInfo = createSTADataStructures(Graph, root)
-    logRSTAEvent("{Header}\n{Results}\n\n".format(Header="Node Bridge IDs", Results=tabulate(nodeBIDInfo, headers=["Node", "BID"], numalign="right", floatfmt=".4f")), logFile)
+    if(Tracer.textEnabled):
+        Tracer.text("{Header}\n{Results}\n\n".format(Header="Node Bridge IDs", Results=tabulate(nodeBIDInfo, headers=["Node", "BID"], numalign="right", floatfmt=".4f")))
 
-    # Startup values
-    topNode = 0
-    sendingQueue = [root] # The top node in the queue will "transmit" its message vector to its neighbors
+    # Root ports are recorded as parent links, to make sure the result is a tree
+    treeValidator = TreeValidator(Graph.nodes, root)
 
-    # START TIMER
-    startTime = timer()
+    # The top node in the queue will "transmit" its message vector to its neighbors
+    sendingQueue = SendingQueue([root])
 
     # Begin transmission/simulaiton
-    while sendingQueue:
-        Graph.graph["RSTA"] += 1
-
-        # Get sender/transmitter information
-        sender = sendingQueue[topNode] # sender is the top node in the sending queue
-        sender_MsgVector = Graph.nodes[sender]["msgVector"]
+    Instrumentation.phase("convergence")
+    # Check the graph's core once, the sends read it with cachedCSR
+    getCSR(Graph)
+    MessagePassing.run(lambda sender: send(Graph, sender, sendingQueue, treeValidator), sendingQueue)
 
-        logRSTAEvent("---------\n({0}) Current sender: {1} | Msg vector: {2}\n".format(Graph.graph["RSTA"], sender, sender_MsgVector), logFile)
+    # Simulation results
+    if(Tracer.textEnabled):
+        Tracer.text("\n=====RESULT=====\n" + getPortInfo(Graph))
+        Tracer.text("\nSender count: {0}\nNeeded Updated Count: {1}".format(Graph.graph["RSTA"], Graph.graph["RSTA_recv"]))
+        Tracer.text("steps: {}".format(Graph.graph["step"]))
+        Tracer.text("Result is a tree: {0}".format(treeValidator.isTree()))
 
-        # For each neighbor of the sender
-        for receiver in Graph.neighbors(sender):
-            # Get receiver information
-            recvPort = receiver + "_" + sender # port received on
-            receiver_PortInfo = Graph.nodes[receiver][recvPort]
-            receiver_PortVector = Graph.nodes[receiver][recvPort].portVector
-            receiver_RootVector = Graph.nodes[receiver]["rootVector"]
-            receiver_MsgVector = Graph.nodes[receiver]["msgVector"]
+    if(Tracer.enabled):
+        Tracer.phaseEnd(Graph.graph["step"], "init")
 
-            receiverInfo = "{0} - {1}: ".format(receiver, recvPort)
+    if(not treeValidator.isTree()):
+        raise NetworkXError("STA graph did not converge.")
 
-            # If the sent message vector is SUPERIOR to the receiver port vector
-            if(senderVectorIsSuperior(sender_MsgVector, receiver_PortVector)):
-                Graph.graph["RSTA_recv"] += 1
-                Graph.graph["RSTA_step"] += 2 # Two comparisons have to be made regardless at this step, vs portVector and vs rootVector
-
-                # If the sent message vector is also superior to the receiver root vector
-                if(senderVectorIsSuperior(sender_MsgVector, receiver_RootVector)):
-                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["RSTA_step"]-1) + " " + str(Graph.graph["RSTA_step"]), receiver_PortInfo.state, ROOT_ROLE)
-                    # Make the receiving port a root + fwding port, change all other ports to sync
-                    syncVectors(Graph, sender_MsgVector, receiver, recvPort)
-                    addToSendingQueue(sendingQueue, receiver)
-                
-                # If the root vector on the receiver is still superior
-                else:
-                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["RSTA_step"]-1) + " " + str(Graph.graph["RSTA_step"]), receiver_PortInfo.state, ALT_ROLE)
-                    # Make the receiving port an alternate + blocking port
-                    updatedPortVector = RSTAVector(sender_MsgVector.RootPathCost+1, 
-                                        sender_MsgVector.DesignatedBridgeID) # RPC + 1 for received link cost
-                    Graph.nodes[receiver][recvPort] = portInfo(updatedPortVector, ALT_ROLE)
-                    addToSendingQueue(sendingQueue, receiver)
-
-            # If the sent message vector is IDENTICAL to the receiver port vector, ignore it
-            elif(senderVectorIsIdentical(sender_MsgVector, receiver_PortVector)):
-                Graph.graph["RSTA_step"] += 2 
-                receiverInfo += "({0})No change, identical vectors\n".format(str(Graph.graph["RSTA_step"]-1) + " " + str(Graph.graph["RSTA_step"]))
-            
-            # If the sent message vector is INFERIOR to the receiver port vector
-            elif(not senderVectorIsSuperior(sender_MsgVector, receiver_PortVector)):
-                Graph.graph["RSTA_step"] += 2 
-
-                # If the receiver port role is already designated, ignore it
-                if(receiver_PortInfo.state == DESIGNATED_ROLE):
-                    receiverInfo += "({0})No change, already designated\n".format(str(Graph.graph["RSTA_step"]-1) + " " + str(Graph.graph["RSTA_step"]))
-
-                # Otherwise, move the port to the designated + fwding role
-                else:
-                    Graph.graph["RSTA_recv"] += 1
-                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["RSTA_step"]-1) + " " + str(Graph.graph["RSTA_step"]), receiver_PortInfo.state, DESIGNATED_ROLE)
-                    Graph.nodes[receiver][recvPort] = portInfo(receiver_PortVector, DESIGNATED_ROLE)
-                    addToSendingQueue(sendingQueue, receiver)
-
-            # Catch-all for vector comparision issues
-            else:
-                receiverInfo += "Vector parsing error\n"
+    Graph.graph["treeValidator"] = treeValidator
 
-            logRSTAEvent(receiverInfo, logFile)
+    # For batch testing
+    logging.error("{0},{1},{2}".format(Graph.number_of_nodes(), Graph.number_of_edges(), Graph.graph["step"]))
 
-        # Sender is finished, pop it off the sending queue
-        sendingQueue.pop(topNode)
-
-    # STOP TIMER
-    endTime = timer()
-
-    # Simulation results and cleanup
-    finalPortRoles = getPortInfo(Graph)
-    finalCountingStats = "\nSender count: {0}\nNeeded Updated Count: {1}".format(Graph.graph["RSTA"], Graph.graph["RSTA_recv"])
-    logRSTAEvent("\n=====RESULT=====\n" + finalPortRoles, logFile)
-    logRSTAEvent(finalCountingStats, logFile)
-    logRSTAEvent("\nTime to execute: {0}".format(endTime - startTime), logFile)
-    Graph.graph["RSTA_time"] = endTime - startTime
+    return
 
-    logFile.close()
+# A sender transmits its message vector to each of its neighbors
+def send(Graph, sender, sendingQueue, treeValidator):
+    table = Graph.graph["portTable"]
+    Graph.graph["RSTA"] += 1
+
+    # Get sender/transmitter information
+    sender_MsgVector = Graph.nodes[sender]["msgVector"]
+
+    if(Tracer.textEnabled):
+        Tracer.text("---------\n({0}) Current sender: {1} | Msg vector: {2}\n".format(Graph.graph["RSTA"], sender, sender_MsgVector))
+
+    # For each neighbor of the sender
+    for receiver in cachedCSR(Graph).neighbors(sender):
+        # Get receiver information
+        recvPort = table.port(receiver, sender) # port received on
+        receiver_PortState = table.getRole(recvPort)
+        receiver_PortVector = getPortVector(table, recvPort)
+        receiver_RootVector = Graph.nodes[receiver]["rootVector"]
+
+        if(Tracer.textEnabled):
+            receiverInfo = "{0} - {1}: ".format(receiver, getPortName(receiver, sender))
+        updated = False
+
+        if(Tracer.enabled):
+            Tracer.deliver(Graph.graph["step"], sender, receiver, sender_MsgVector)
+
+        # If the sent message vector is SUPERIOR to the receiver port vector
+        if(senderVectorIsSuperior(sender_MsgVector, receiver_PortVector)):
+            Graph.graph["RSTA_recv"] += 1
+            Graph.graph["step"] += 2 # Two comparisons have to be made regardless at this step, vs portVector and vs rootVector
+
+            # If the sent message vector is also superior to the receiver root vector
+            if(senderVectorIsSuperior(sender_MsgVector, receiver_RootVector)):
+                if(Tracer.textEnabled):
+                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["step"]-1) + " " + str(Graph.graph["step"]), receiver_PortState, ROOT_ROLE)
+                # Make the receiving port a root + fwding port, change all other ports to sync
+                syncVectors(Graph, sender_MsgVector, receiver, recvPort)
+                treeValidator.addParent(sender, receiver)
+                updated = True
+
+            # If the root vector on the receiver is still superior
+            else:
+                if(Tracer.textEnabled):
+                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["step"]-1) + " " + str(Graph.graph["step"]), receiver_PortState, ALT_ROLE)
+                # Make the receiving port an alternate + blocking port
+                updatedPortVector = RSTAVector(sender_MsgVector.RootPathCost+1,
+                                    sender_MsgVector.DesignatedBridgeID) # RPC + 1 for received link cost
+                setPortInfo(Graph, receiver, recvPort, updatedPortVector, ALT_ROLE)
+                updated = True
+
+        # If the sent message vector is IDENTICAL to the receiver port vector, ignore it
+        elif(senderVectorIsIdentical(sender_MsgVector, receiver_PortVector)):
+            Graph.graph["step"] += 2
+            if(Tracer.textEnabled):
+                receiverInfo += "({0})No change, identical vectors\n".format(str(Graph.graph["step"]-1) + " " + str(Graph.graph["step"]))
+
+        # If the sent message vector is INFERIOR to the receiver port vector
+        elif(not senderVectorIsSuperior(sender_MsgVector, receiver_PortVector)):
+            Graph.graph["step"] += 2
+
+            # If the receiver port role is already designated, ignore it
+            if(receiver_PortState == DESIGNATED_ROLE):
+                if(Tracer.textEnabled):
+                    receiverInfo += "({0})No change, already designated\n".format(str(Graph.graph["step"]-1) + " " + str(Graph.graph["step"]))
+
+            # Otherwise, move the port to the designated + fwding role
+            else:
+                Graph.graph["RSTA_recv"] += 1
+                if(Tracer.textEnabled):
+                    receiverInfo += "({0}){1} ----> {2}\n".format(str(Graph.graph["step"]-1) + " " + str(Graph.graph["step"]), receiver_PortState, DESIGNATED_ROLE)
+                setRole(Graph, receiver, recvPort, DESIGNATED_ROLE)
+                updated = True
 
-    return
+        # Catch-all for vector comparision issues
+        elif(Tracer.textEnabled):
+            receiverInfo += "Vector parsing error\n"
 
+        # A changed receiver sends its message vector in turn (vertices are only queued once at a time)
+        if(updated and sendingQueue.append(receiver) and Tracer.enabled):
+            Tracer.enqueue(Graph.graph["step"], receiver, len(sendingQueue))
 
-# Add a given node to the sending queue if it isn't there already
-def addToSendingQueue(sendingQueue, node):
-    if(node not in sendingQueue):
-        sendingQueue.append(node)
+        if(Tracer.textEnabled):
+            Tracer.text(receiverInfo)
 
     return
 
@@ -219,7 +282,7 @@ def senderVectorIsSuperior(senderVector, receiverVector):
     # If sender RPC + 1 > receiver RPC, or RPCs are equal (after + 1) and sender BID > receiver BID
     if(
         (senderVector.RootPathCost+1 < receiverVector.RootPathCost) or
-        (senderVector.RootPathCost+1 == receiverVector.RootPathCost and 
+        (senderVector.RootPathCost+1 == receiverVector.RootPathCost and
         senderVector.DesignatedBridgeID < receiverVector.DesignatedBridgeID)
     ):
         isSuperior = True
@@ -231,7 +294,7 @@ def senderVectorIsSuperior(senderVector, receiverVector):
 def senderVectorIsIdentical(senderVector, receiverVector):
     isIdentical = False
 
-    if(senderVector.RootPathCost+1 == receiverVector.RootPathCost and 
+    if(senderVector.RootPathCost+1 == receiverVector.RootPathCost and
        senderVector.DesignatedBridgeID == receiverVector.DesignatedBridgeID):
        isIdentical = True
 
@@ -240,16 +303,18 @@ def senderVectorIsIdentical(senderVector, receiverVector):
 
 # Set new root port as such, block all other ports with sync role
 def syncVectors(Graph, superiorVector, node, newRootPort):
-    for port in Graph.neighbors(node):
-        portName = node + "_" + port
+    table = Graph.graph["portTable"]
+
+    for neighbor in cachedCSR(Graph).neighbors(node):
+        port = table.port(node, neighbor)
 
-        if(portName == newRootPort):
+        if(port == newRootPort):
             updatedPortVector = RSTAVector(superiorVector.RootPathCost+1, superiorVector.DesignatedBridgeID)
-            Graph.nodes[node][portName] = portInfo(updatedPortVector, ROOT_ROLE)
+            setPortInfo(Graph, node, port, updatedPortVector, ROOT_ROLE)
             Graph.nodes[node]["rootVector"] = updatedPortVector
         else:
             updatedPortVector = RSTAVector(superiorVector.RootPathCost+2, Graph.nodes[node]["BID"])
-            Graph.nodes[node][portName] = portInfo(updatedPortVector, SYNC_ROLE)
+            setPortInfo(Graph, node, port, updatedPortVector, SYNC_ROLE)
 
     # Set the new message vector to the root vector (RPC + 1)
     Graph.nodes[node]["msgVector"] = RSTAVector(superiorVector.RootPathCost+1, Graph.nodes[node]["BID"])
@@ -257,21 +322,15 @@ def syncVectors(Graph, superiorVector, node, newRootPort):
     return
 
 
-# Log a given RSTA event
-def logRSTAEvent(eventMsg, logFile):
-    logFile.write(eventMsg)
-
-    return
-
-
 # Print out RSTA graph information
 def getPortInfo(Graph):
     output = ""
+    table = Graph.graph["portTable"]
+    core = getCSR(Graph)
 
     for node in Graph:
         output += "\n{0}\n".format(node)
-        for neighbor in Graph.neighbors(node):
-            port = node + "_" + neighbor
-            output += "\t{0} - {1}\n".format(port, Graph.nodes[node][port].state)
+        for neighbor in core.neighbors(node):
+            output += "\t{0} - {1}\n".format(getPortName(node, neighbor), table.getRole(table.port(node, neighbor)))
 
-    return output
\ No newline at end of file
+    return output
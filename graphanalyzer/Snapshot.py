@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+'''
+===========================
+CONVERGED STATE SNAPSHOTS
+===========================
+'''
+from IndexedPriorityQueue import IndexedPriorityQueue
+from CSRGraph import updateCSR
+
+#
+# Constants
+#
+MISSING = object() # Placeholder for attributes a vertex did not have when they were recorded
+
+# Vertex attributes kept in a graph-wide table rather than on the vertex, attribute --> graph attribute of the table
+TABLE_ATTRIBUTES = {'RT': 'portTable'} # RSTA ports (see PortTable)
+
+'''
+Snapshot of a converged graph that failure experiments can be rolled back to.
+
+While a snapshot is active it is kept in Graph.graph['snapshot'], and the algorithms report the
+vertex state they are about to change (see save and removeEdge). Only the first change to a vertex
+attribute is recorded, as a copy of its converged value. Restoring puts back only what was
+recorded, so it costs time proportional to what the experiment touched, not to the size of the
+graph.
+
+Graph = The converged graph
+treeValidator = The tree validator of the converged graph, if experiments change it in place
+'''
+class Snapshot:
+    def __init__(self, Graph, treeValidator=None):
+        self.Graph = Graph
+        self.treeValidator = treeValidator
+
+        # Graph-wide values are counters and references, a shallow copy is enough
+        self.graphAttributes = {key: value for key, value in Graph.graph.items() if key != 'snapshot'}
+
+        self.vertexAttributes = {} # (vertex, attribute) --> converged value
+        self.removedEdges = [] # (u, v, edge data, neighbor order of u, neighbor order of v)
+
+        Graph.graph['snapshot'] = self
+        if(treeValidator):
+            treeValidator.startJournal()
+
+    # Record the converged value of a vertex attribute before it is changed
+    def save(self, vertex, attribute):
+        key = (vertex, attribute)
+
+        if(key not in self.vertexAttributes):
+            table = self.getTable(attribute)
+
+            if(table is not None):
+                self.vertexAttributes[key] = table.getRows(vertex)
+            else:
+                self.vertexAttributes[key] = copyState(self.Graph.nodes[vertex].get(attribute, MISSING))
+
+        return
+
+    # Remove an edge, remembering its data and where it sat in each endpoint's neighbor order
+    def removeEdge(self, u, v):
+        adjacency = self.Graph._adj
+        self.removedEdges.append((u, v, adjacency[u][v], list(adjacency[u]), list(adjacency[v])))
+        self.Graph.remove_edge(u, v)
+        updateCSR(self.Graph, u, v)
+
+        return
+
+    # Roll the graph back to its converged state, the snapshot stays active for the next experiment
+    def restore(self):
+        Graph = self.Graph
+
+        # Edges go back in reverse order, with each endpoint's neighbors in their converged order
+        adjacency = Graph._adj
+        for u, v, data, uNeighbors, vNeighbors in reversed(self.removedEdges):
+            adjacency[u][v] = data
+            adjacency[v][u] = data
+            reorder(adjacency[u], uNeighbors)
+            reorder(adjacency[v], vNeighbors)
+
+        for (vertex, attribute), value in self.vertexAttributes.items():
+            table = self.getTable(attribute)
+            if(table is not None):
+                # The rows are copied into the table, the recorded ones survive the next experiment
+                table.setRows(vertex, value)
+                continue
+
+            # Path bundles are indexed by edge, the index is moved back along with the bundle
+            if(attribute == 'pathBundle' and 'edgeIndex' in self.graphAttributes):
+                self.graphAttributes['edgeIndex'].updateBundle(vertex, Graph.nodes[vertex][attribute], value)
+
+            if(value is MISSING):
+                Graph.nodes[vertex].pop(attribute, None)
+            else:
+                # Hand out a copy, so the recorded value survives the next experiment
+                Graph.nodes[vertex][attribute] = copyState(value)
+
+        Graph.graph.clear()
+        Graph.graph.update(self.graphAttributes)
+        Graph.graph['snapshot'] = self
+
+        # The CSR core of the converged graph (if it had one) gets the endpoints' rows back
+        updateCSR(Graph, *(vertex for u, v, *_ in self.removedEdges for vertex in (u, v)))
+
+        if(self.treeValidator):
+            self.treeValidator.rollback()
+
+        self.vertexAttributes = {}
+        self.removedEdges = []
+
+        return
+
+    # The table an attribute is kept in (None for attributes kept on the vertex)
+    def getTable(self, attribute):
+        return self.graphAttributes.get(TABLE_ATTRIBUTES.get(attribute))
+
+    # Stop recording changes, the graph keeps whatever state it is in
+    def release(self):
+        self.Graph.graph.pop('snapshot', None)
+
+        if(self.treeValidator):
+            self.treeValidator.stopJournal()
+
+        return
+
+'''
+Record the converged value of vertex attributes before they are changed (no-op without a snapshot)
+
+Graph = The graph the algorithm is run on
+vertex = The vertex about to change
+attributes = The names of the vertex attributes about to change
+'''
+def save(Graph, vertex, *attributes):
+    snapshot = Graph.graph.get('snapshot')
+
+    if(snapshot):
+        for attribute in attributes:
+            snapshot.save(vertex, attribute)
+
+    return
+
+'''
+Remove an edge from the graph so an active snapshot can put it back (the graph's CSR core follows)
+'''
+def removeEdge(Graph, u, v):
+    snapshot = Graph.graph.get('snapshot')
+
+    if(snapshot):
+        snapshot.removeEdge(u, v)
+    else:
+        Graph.remove_edge(u, v)
+        updateCSR(Graph, u, v)
+
+    return
+
+'''
+Copy vertex state deep enough that changing it in place does not change the copy
+
+The algorithms keep immutable values (paths, RSTA vectors, roles) inside lists, dictionaries and
+queues, so only the containers are copied.
+'''
+def copyState(value):
+    if(isinstance(value, IndexedPriorityQueue)):
+        return value.copy()
+
+    if(isinstance(value, dict)):
+        return {key: copyState(entry) for key, entry in value.items()}
+
+    if(isinstance(value, list)):
+        return [copyState(entry) for entry in value]
+
+    return value
+
+# Put the keys of a dictionary back in the given order
+def reorder(dictionary, keys):
+    entries = [(key, dictionary[key]) for key in keys]
+    dictionary.clear()
+    dictionary.update(entries)
+
+    return
@@ -15,7 +15,7 @@ def run(graphConfig, programConfig, args):
     #threeTier = GraphGenerator.generateGraph("foldedClos", graphConfig["single"]["foldedClos"], logDirectory=programConfig["results"]["log"])
     #nx.write_gpickle(threeTier, "test.gpickle")
 
-    threeTier = nx.read_gpickle("clos_k4_t3.gpickle")
+    threeTier = GraphGenerator.fromGpickle("clos_k4_t3.gpickle")
     ClosAddressing.addVIDss(threeTier, 3, topTierRoot=False)
     '''
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+'''
+===========================
+ALGORITHM EVENT TRACING
+===========================
+'''
+import atexit
+import json
+import logging
+import struct
+from collections import Counter
+
+#
+# Constants
+#
+# Event types
+DELIVER = "deliver"             # A vertex received an update from a neighbor
+BUNDLE_UPDATE = "bundle-update" # A vertex has a new path bundle (or a new distance/parent)
+ROLE_CHANGE = "role-change"     # A port of a vertex changed role
+ENQUEUE = "enqueue"             # A vertex was queued to send its update
+TEXT = "text"                   # A line of the text log
+PHASE = "phase"                 # The algorithm started a phase (init, recovery, ...), its step counter restarts
+PHASE_END = "phase-end"         # The algorithm finished a phase, the step is the phase's final step count
+
+EVENT_TYPES = (DELIVER, BUNDLE_UPDATE, ROLE_CHANGE, ENQUEUE, TEXT, PHASE, PHASE_END)
+
+'''
+Tracing state, checked by the algorithms before they build an event so that nothing is formatted
+while tracing is off:
+
+    if(Tracer.enabled):
+        Tracer.deliver(step, sender, receiver, payload)
+
+    if(Tracer.textEnabled):
+        Tracer.text("...".format(...))
+
+enabled = A sink is attached (structured events are wanted)
+textEnabled = A sink that writes the text log is attached
+'''
+sinks = []
+enabled = False
+textEnabled = False
+
+'''
+Replace the sinks events are written to (the old sinks are not closed)
+'''
+def setSinks(newSinks):
+    global sinks, enabled, textEnabled
+
+    sinks = list(newSinks)
+    enabled = bool(sinks)
+    textEnabled = any(sink.acceptsText for sink in sinks)
+
+    return
+
+def addSink(sink):
+    setSinks(sinks + [sink])
+    return
+
+def closeSinks():
+    for sink in sinks:
+        sink.close()
+
+    setSinks([])
+    return
+
+def emit(event, step, vertex, other=None, payload=None):
+    for sink in sinks:
+        sink.write(event, step, vertex, other, payload)
+
+    return
+
+'''
+Events
+
+step = The step counter of the graph when the event happened
+'''
+def deliver(step, sender, receiver, payload):
+    emit(DELIVER, step, receiver, sender, payload)
+    return
+
+def bundleUpdate(step, vertex, bundle):
+    emit(BUNDLE_UPDATE, step, vertex, None, bundle)
+    return
+
+def roleChange(step, vertex, port, role):
+    emit(ROLE_CHANGE, step, vertex, port, role)
+    return
+
+def enqueue(step, vertex, queueLength):
+    emit(ENQUEUE, step, vertex, None, queueLength)
+    return
+
+def phase(step, name):
+    emit(PHASE, step, None, None, name)
+    return
+
+def phaseEnd(step, name):
+    emit(PHASE_END, step, None, None, name)
+    return
+
+def text(message):
+    for sink in sinks:
+        if(sink.acceptsText):
+            sink.writeText(message)
+
+    return
+
+'''
+Plain form of an event payload (paths become their vertex indices, vectors and tuples become lists)
+'''
+def describe(value):
+    if(value is None or isinstance(value, (str, int, float, bool))):
+        return value
+
+    if(hasattr(value, "vertices")): # Path
+        return list(value.vertices)
+
+    if(isinstance(value, dict)):
+        return {str(key): describe(entry) for key, entry in value.items()}
+
+    if(isinstance(value, (list, tuple, set))):
+        return [describe(entry) for entry in value]
+
+    return str(value)
+
+'''
+Sinks
+'''
+class Sink:
+    acceptsText = False
+
+    def write(self, event, step, vertex, other, payload):
+        return
+
+    def writeText(self, message):
+        return
+
+    def close(self):
+        return
+
+'''
+The text log, written through the logging module as before
+'''
+class TextSink(Sink):
+    acceptsText = True
+
+    def writeText(self, message):
+        logging.warning(message)
+        return
+
+'''
+Number of events of each type, nothing is written (e.g. to count the messages of a benchmark run)
+'''
+class CountSink(Sink):
+    def __init__(self):
+        self.counts = Counter()
+
+    def write(self, event, step, vertex, other, payload):
+        self.counts[event] += 1
+        return
+
+'''
+One JSON object per event
+'''
+class JSONLSink(Sink):
+    def __init__(self, fileName):
+        self.file = open(fileName, "w")
+
+    def write(self, event, step, vertex, other, payload):
+        self.file.write(json.dumps({"event": event, "step": step, "vertex": describe(vertex), "other": describe(other), "payload": describe(payload)}, separators=(",", ":")))
+        self.file.write("\n")
+        return
+
+    def close(self):
+        if(not self.file.closed):
+            self.file.close()
+        return
+
+'''
+Fixed-size binary records, with vertices and payloads stored once in an interned string table (see EventLog)
+
+Layout: header, records, string table. The header holds the offset of the string table, which is
+written when the sink is closed. Every string is stored as a 4-byte length and its UTF-8 bytes.
+Vertices are stored as their string form and payloads as JSON.
+'''
+BINARY_MAGIC = b"MTPTRACE"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sHHIQ")   # magic, version, record size, number of records, string table offset
+BINARY_RECORD = struct.Struct("<B3xIiii")  # event, step, vertex, other, payload (string table indices, -1 for none)
+BINARY_EVENT_CODES = {event: code for code, event in enumerate(EVENT_TYPES)}
+NO_STRING = -1
+
+class BinarySink(Sink):
+    def __init__(self, fileName):
+        self.file = open(fileName, "wb")
+        self.strings = {} # string --> index in the string table
+        self.numOfRecords = 0
+
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BINARY_RECORD.size, 0, 0))
+
+    def intern(self, value):
+        index = self.strings.get(value)
+        if(index is None):
+            index = self.strings[value] = len(self.strings)
+
+        return index
+
+    def write(self, event, step, vertex, other, payload):
+        vertex = NO_STRING if vertex is None else self.intern(str(vertex))
+        other = NO_STRING if other is None else self.intern(str(other))
+
+        payload = NO_STRING if payload is None else self.intern(json.dumps(describe(payload), separators=(",", ":")))
+
+        self.file.write(BINARY_RECORD.pack(BINARY_EVENT_CODES[event], step, vertex, other, payload))
+        self.numOfRecords += 1
+        return
+
+    def close(self):
+        if(self.file.closed):
+            return
+
+        stringTableOffset = self.file.tell()
+        self.file.write(struct.pack("<I", len(self.strings)))
+        for string in self.strings:
+            encoded = string.encode("utf-8")
+            self.file.write(struct.pack("<I", len(encoded)))
+            self.file.write(encoded)
+
+        self.file.seek(0)
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BINARY_RECORD.size, self.numOfRecords, stringTableOffset))
+        self.file.close()
+        return
+
+# Sinks that can be picked by name (e.g. from the command line), all take the file to write to
+SINKS = {"jsonl": JSONLSink, "binary": BinarySink}
+SINK_EXTENSIONS = {"jsonl": "jsonl", "binary": "trace"}
+
+# The text log is written by default, as it was before tracing existed
+setSinks([TextSink()])
+
+atexit.register(closeSinks)
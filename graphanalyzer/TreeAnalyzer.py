@@ -9,6 +9,9 @@ class TreeValidator:
         # Mark the root of the tree, as it will never have a parent
         self.root = root
 
+        # Relationships of each vertex before its first change, while changes are being journaled (see Snapshot)
+        self.journal = None
+
         # Add inputted vertices into new graph
         for vertex in vertices:
             self.graph.nodes[vertex]['children'] = []   # mark children on the given node
@@ -36,12 +39,18 @@ class TreeValidator:
         return
 
     def removeRelationship(self, parent, child):
+        self.journalVertex(parent)
+        self.journalVertex(child)
+
         self.graph.nodes[parent]['children'].remove(child)
         self.graph.nodes[child]['parent'] = None
         self.graph.remove_edge(parent, child)
         return
 
     def addRelationship(self, parent, child):
+        self.journalVertex(parent)
+        self.journalVertex(child)
+
         self.graph.nodes[parent]['children'].append(child)
         self.graph.nodes[child]['parent'] = parent
         self.graph.add_edge(parent, child)
@@ -69,4 +78,38 @@ class TreeValidator:
         return self.graph
 
     def getStrandedVertices(self):
-        return [vertex for vertex in self.graph.nodes if self.graph.nodes[vertex]['parent'] == None and vertex != self.root]
\ No newline at end of file
+        return [vertex for vertex in self.graph.nodes if self.graph.nodes[vertex]['parent'] == None and vertex != self.root]
+
+    def startJournal(self):
+        self.journal = {}
+        return
+
+    def stopJournal(self):
+        self.journal = None
+        return
+
+    def journalVertex(self, vertex):
+        if(self.journal is not None and vertex not in self.journal):
+            self.journal[vertex] = (self.graph.nodes[vertex]['parent'], list(self.graph.nodes[vertex]['children']))
+        return
+
+    # Undo every relationship change since the journal was started (or last rolled back)
+    def rollback(self):
+        if(not self.journal):
+            return
+
+        # Drop the current relationships of every changed vertex, then put the journaled ones back
+        for vertex in self.journal:
+            parent = self.graph.nodes[vertex]['parent']
+            if(parent is not None and self.graph.has_edge(parent, vertex)):
+                self.graph.remove_edge(parent, vertex)
+
+        for vertex, (parent, children) in self.journal.items():
+            self.graph.nodes[vertex]['parent'] = parent
+            self.graph.nodes[vertex]['children'] = children
+
+            if(parent is not None):
+                self.graph.add_edge(parent, vertex)
+
+        self.journal = {}
+        return
@@ -4,60 +4,458 @@
 YENS'S ALGORITHM
 ===========================
 '''
-from networkx import shortest_path, Graph as newGraph
+## Standard modules
+import csv
+import heapq
+from itertools import count
+from multiprocessing import Pool, cpu_count
+from os.path import join as getFile
+from timeit import default_timer as timer # Get elasped time of execution
 
+## External modules
+from networkx import NetworkXNoPath
+
+## Custom modules
+import Instrumentation
+import Tracer
+from PathBundle import Path, setVertexIndices
+
+#
+# Constants
+#
+WEIGHT = "weight" # Edge attribute holding the edge cost, edges without it cost 1
+PATHS_FILE = "{}ya_paths.csv"
+PATHS_COLUMNS = ["vertex", "rank", "cost", "path"]
+BUNDLES_FILE = "{}ya_bundles.csv"
+BUNDLES_COLUMNS = ["vertex", "bundle_lengths", "shortest_lengths", "shared", "stretch"]
+CHUNKS_PER_WORKER = 4 # Targets are handed out in several chunks per worker so uneven targets balance out
+
+# Graph and shared shortest path tree of this process (all-targets batch)
+batchGraph = None
+batchSettings = None
+
+'''
+The K shortest loopless paths from the source to the sink (Yen's algorithm)
+
+Every spur search runs on a masked view of the base graph: the root path's vertices and the edges
+already used by accepted paths with the same root path are skipped while searching, so the graph is
+never copied or changed. Unweighted graphs are searched with a bidirectional BFS, weighted ones with
+Dijkstra's algorithm.
+
+baseGraph = The graph the paths are found in
+source = The first vertex of every path
+sink = The last vertex of every path
+K = Number of paths to find
+
+Returns the paths (lists of vertices) in increasing order of cost, fewer than K if the graph does not
+have K loopless paths from the source to the sink
+'''
 def init(baseGraph, source, sink, K=2):
-    # Determine the shortest path from the source to sink via an existing shortest path algorithm
-    A1 = shortest_path(baseGraph, source=source, target=sink, weight="weight", method="dijkstra")
-    
-    # Set up the structures to hold permenant and candidate paths
-    A = [A1]
-    B = []
+    Instrumentation.phase("search")
+    weighted = isWeighted(baseGraph)
+    A = kShortestPaths(baseGraph, source, sink, K, weighted)
 
-    # Set up a second, empty graph. This will be used to handle the edge and node removals
-    derivedGraph = newGraph()
+    Instrumentation.phase("analysis")
+    if(Tracer.textEnabled):
+        for k, path in enumerate(A):
+            Tracer.text("Path {0}: {1} (cost {2})".format(k + 1, path, pathCost(baseGraph, path, weighted)))
 
-    # For each additional path needed
-    for k in range(1, K+1):
-        # The spur node ranges from the first node to the next to last node in the previous k-shortest path.
-        for i in range(0, len(A[k-1])-1):
-            # Reset the derived graph to the original base graph
-            derivedGraph.add_edges_from(baseGraph.edges(data=True))
+    print(A)
 
-            # Spur node is retrieved from the previous k-shortest path, k − 1.
-            spurNode = A[k-1][i]
+    return A
 
-            # The sequence of nodes from the source to the spur node of the previous k-shortest path.
-            rootPath = A[k-1][:(i+1)]
+'''
+Yen's algorithm for one source and sink
 
-            for path in A:
-                if(rootPath == path[:(i+1)]):
-                    derivedGraph.remove_edge(path[i], path[i+1])
+Spur computations are reused (Lawler's refinement): a path found by deviating from its parent at
+some vertex shares its root paths before that vertex with the parent, whose spur paths from those
+vertices are already candidates, so only the vertices from its deviation onward are spur vertices.
 
-            for rootPathNode in rootPath:
-                if(rootPathNode != spurNode):
-                    derivedGraph.remove_node(rootPathNode)
+Candidates are kept in a heap ordered by cost and length (ties in the order they were found) with a
+set of the paths seen, so each candidate is only queued once.
 
-            # Calculate the spur path from the spur node to the sink.
-            spurPath = shortest_path(derivedGraph, source=spurNode, target=sink, weight="weight", method="dijkstra")
+firstPath = A shortest path from the source to the sink if one is already known (e.g. from a shortest
+            path tree shared by several sinks), None to search for it
+'''
+def kShortestPaths(baseGraph, source, sink, K, weighted, firstPath=None):
+    spurPath = dijkstraPath if weighted else bfsPath
 
-            # Entire path is made up of the root path and spur path.
-            totalPath = rootPath + spurPath
+    if(firstPath is None):
+        try:
+            firstPath = spurPath(baseGraph, source, sink, set(), set())
+        except NetworkXNoPath:
+            return []
+
+    A = [] # Accepted paths
+    B = [] # Candidates, (cost, length, order found, path, index of the vertex it deviates from its parent at)
+    seen = {tuple(firstPath)}
+    order = count()
+    nextVertices = {} # Root path (tuple) --> next vertices of the accepted paths starting with that root path
 
-            # Add the potential k-shortest path to the heap.
-            if(totalPath not in B):
-                    B.append(totalPath)
+    heapq.heappush(B, (pathCost(baseGraph, firstPath, weighted), len(firstPath), next(order), firstPath, 0))
 
-        # This handles the case of there being no spur paths, or no spur paths left
-        if(not B):
+    while B and len(A) < K:
+        cost, _, _, path, deviation = heapq.heappop(B)
+        A.append(path)
+
+        for i in range(len(path) - 1):
+            nextVertices.setdefault(tuple(path[:i+1]), set()).add(path[i+1])
+
+        if(len(A) == K):
             break
-        
-        # Sort the potential k-shortest paths by cost.
-        B.sort(key = lambda i: (len(i), i))
 
-        # Add the lowest cost path becomes the k-shortest path.
-        A[k] = B.pop(0)
+        # Cost of the root path up to each vertex
+        rootCosts = [0]
+        for i in range(len(path) - 1):
+            rootCosts.append(rootCosts[-1] + edgeCost(baseGraph, path[i], path[i+1], weighted))
 
-    print(A)
+        # The spur vertex ranges from the vertex the path deviated at to the next to last vertex of the path
+        for i in range(deviation, len(path) - 1):
+            spurVertex = path[i]
+            rootPath = path[:i+1]
+
+            # Mask out the root path (except the spur vertex) and the edges accepted paths with this root path took next
+            blockedVertices = set(rootPath[:-1])
+            blockedEdges = set()
+            for nextVertex in nextVertices.get(tuple(rootPath), ()):
+                blockedEdges.add((spurVertex, nextVertex))
+                blockedEdges.add((nextVertex, spurVertex))
+
+            try:
+                spur = spurPath(baseGraph, spurVertex, sink, blockedVertices, blockedEdges)
+            except NetworkXNoPath:
+                continue
+
+            # Entire path is made up of the root path and spur path.
+            totalPath = rootPath[:-1] + spur
+            key = tuple(totalPath)
+
+            if(key not in seen):
+                seen.add(key)
+                totalCost = rootCosts[i] + pathCost(baseGraph, spur, weighted)
+                heapq.heappush(B, (totalCost, len(totalPath), next(order), totalPath, i))
+
+    return A
+
+'''
+The K shortest loopless paths from one source to every other vertex
+
+The shortest path tree of the source is built once and gives every target its first path, the
+targets are then split into chunks that a pool of processes runs Yen's algorithm on.
+
+Graph = The graph the paths are found in
+source = The first vertex of every path
+K = Number of paths to find for each target
+workers = Number of processes to spread the targets over (None for every core)
+
+Returns {vertex: [Path, ...]} with the same vertex indices and order (best path first) as the path
+bundles of the meshed tree algorithms, so the two can be compared directly (see compareBundles).
+Paths to different targets share their prefixes like bundle paths do.
+'''
+def allTargets(Graph, source, K, workers=None):
+    if('index_to_vertex' not in Graph.graph):
+        setVertexIndices(Graph)
+
+    weighted = isWeighted(Graph)
+    parents = shortestPathTree(Graph, source, weighted)
+    targets = [vertex for vertex in parents if vertex != source]
+
+    if(workers is None):
+        workers = cpu_count()
+    workers = max(1, min(workers, len(targets)))
+    settings = (source, K, weighted, parents)
+
+    if(workers == 1):
+        initWorker(Graph, settings)
+        results = findPaths(targets)
+    else:
+        chunkSize = -(-len(targets) // (workers * CHUNKS_PER_WORKER))
+        chunks = [targets[i:i+chunkSize] for i in range(0, len(targets), chunkSize)]
+
+        with Pool(processes=workers, initializer=initWorker, initargs=(Graph, settings)) as pool:
+            results = [result for chunk in pool.map(findPaths, chunks) for result in chunk]
+
+    # Paths come back from the workers as vertex lists, rebuilt here as bundle paths with shared prefixes
+    prefixes = {}
+    kShortest = {source: [toPath(Graph, [source], prefixes)]}
+    for target, paths in results:
+        kShortest[target] = [toPath(Graph, path, prefixes) for path in paths]
+
+    return kShortest
+
+def initWorker(Graph, settings):
+    global batchGraph, batchSettings
+
+    batchGraph = Graph
+    batchSettings = settings
+
+    return
+
+# Yen's algorithm for each target of a chunk, starting from its path in the shared shortest path tree
+def findPaths(targets):
+    source, K, weighted, parents = batchSettings
+    return [(target, kShortestPaths(batchGraph, source, target, K, weighted, firstPath=treePath(parents, target))) for target in targets]
+
+'''
+Shortest path tree of a source (BFS for unweighted graphs, Dijkstra's algorithm for weighted ones)
+
+Returns {vertex: parent} for every vertex reachable from the source (the source's parent is None)
+'''
+def shortestPathTree(Graph, source, weighted):
+    if(weighted):
+        distances = {source: 0}
+        parents = {source: None}
+        done = set()
+        order = count()
+        heap = [(0, next(order), source)]
+
+        while heap:
+            distance, _, vertex = heapq.heappop(heap)
+            if(vertex in done):
+                continue
+            done.add(vertex)
+
+            for neighbor, data in Graph._adj[vertex].items():
+                newDistance = distance + data.get(WEIGHT, 1)
+                if(neighbor not in done and newDistance < distances.get(neighbor, float('inf'))):
+                    distances[neighbor] = newDistance
+                    parents[neighbor] = vertex
+                    heapq.heappush(heap, (newDistance, next(order), neighbor))
+
+        return {vertex: parents[vertex] for vertex in done}
+
+    parents = {source: None}
+    frontier = [source]
+    while frontier:
+        nextFrontier = []
+        for vertex in frontier:
+            for neighbor in Graph._adj[vertex]:
+                if(neighbor not in parents):
+                    parents[neighbor] = vertex
+                    nextFrontier.append(neighbor)
+        frontier = nextFrontier
+
+    return parents
+
+def treePath(parents, target):
+    path = []
+    while target is not None:
+        path.append(target)
+        target = parents[target]
+    path.reverse()
+
+    return path
+
+# Bundle path of a list of vertices, reusing the already built path of each prefix
+def toPath(Graph, vertices, prefixes):
+    path = None
+
+    for vertex in vertices:
+        key = (id(path), vertex) # The prefixes dictionary keeps every path it hands out alive, so ids stay unique
+        if(key not in prefixes):
+            index = Graph.nodes[vertex]['index']
+            prefixes[key] = Path(index) if path is None else path.extend(index)
+        path = prefixes[key]
+
+    return path
+
+'''
+Compare the path bundle of every vertex against its K shortest paths
+
+Returns one row per vertex with a bundle:
+    vertex = The vertex
+    bundle_lengths = Hop count of each bundle path
+    shortest_lengths = Hop count of each of the K shortest paths
+    shared = Number of bundle paths that are among the K shortest paths
+    stretch = Total hops of the bundle over total hops of as many shortest paths (1.0 is optimal)
+'''
+def compareBundles(Graph, kShortest):
+    rows = []
+
+    for vertex in Graph:
+        bundle = Graph.nodes[vertex].get('pathBundle')
+        if(not bundle or vertex not in kShortest):
+            continue
+
+        shortest = kShortest[vertex]
+        shortestSet = set(path.vertices for path in shortest)
+        bundleHops = sum(len(path) - 1 for path in bundle)
+        shortestHops = sum(len(path) - 1 for path in shortest[:len(bundle)])
+
+        rows.append({"vertex": vertex,
+                     "bundle_lengths": [len(path) - 1 for path in bundle],
+                     "shortest_lengths": [len(path) - 1 for path in shortest],
+                     "shared": sum(1 for path in bundle if path.vertices in shortestSet),
+                     "stretch": bundleHops / shortestHops if shortestHops else 1.0})
+
+    return rows
+
+'''
+Find the K shortest paths from the source to every vertex and write them as a table with one row per path
+
+If the graph carries converged path bundles (e.g. a pickled N-Paths run), each vertex's bundle is also
+compared against its K shortest paths and written as a second table (see compareBundles).
+
+Returns {vertex: [Path, ...]} (see allTargets)
+'''
+def run(Graph, source, K, logFilePath, nameOfTest, workers=None):
+    Instrumentation.phase("search")
+    start = timer()
+    kShortest = allTargets(Graph, source, K, workers=workers)
+    print("{0} shortest paths to {1} vertices found in {2:0.2f} seconds".format(K, len(kShortest), timer() - start))
+
+    Instrumentation.phase("analysis")
+
+    labels = Graph.graph['index_to_vertex']
+    weighted = isWeighted(Graph)
+    fileName = getFile(logFilePath, PATHS_FILE.format(nameOfTest + "_" if nameOfTest else ""))
+
+    with open(fileName, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=PATHS_COLUMNS)
+        writer.writeheader()
+
+        for vertex, paths in kShortest.items():
+            for rank, path in enumerate(paths):
+                vertices = [labels[index] for index in path.vertices]
+                writer.writerow({"vertex": vertex, "rank": rank + 1, "cost": pathCost(Graph, vertices, weighted), "path": " ".join(str(v) for v in vertices)})
+
+    print("Paths written to {0}".format(fileName))
+
+    bundleRows = compareBundles(Graph, kShortest)
+    if(bundleRows):
+        fileName = getFile(logFilePath, BUNDLES_FILE.format(nameOfTest + "_" if nameOfTest else ""))
+
+        with open(fileName, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=BUNDLES_COLUMNS)
+            writer.writeheader()
+
+            for row in bundleRows:
+                writer.writerow(dict(row, bundle_lengths=" ".join(map(str, row["bundle_lengths"])), shortest_lengths=" ".join(map(str, row["shortest_lengths"]))))
+
+        print("Bundle comparison of {0} vertices written to {1}".format(len(bundleRows), fileName))
+
+    return kShortest
+
+def isWeighted(Graph):
+    return any(WEIGHT in data for _, _, data in Graph.edges(data=True))
+
+def edgeCost(Graph, u, v, weighted):
+    return Graph[u][v].get(WEIGHT, 1) if weighted else 1
+
+def pathCost(Graph, path, weighted):
+    if(not weighted):
+        return len(path) - 1
+
+    return sum(edgeCost(Graph, path[i], path[i+1], weighted) for i in range(len(path) - 1))
+
+'''
+Shortest path (fewest edges) from source to target, skipping the masked vertices and edges
+
+A bidirectional BFS: the smaller frontier is expanded a whole level at a time, and the search stops
+at the first level the two searches meet in.
+
+Raises NetworkXNoPath if the masks disconnect the target from the source
+'''
+def bfsPath(Graph, source, target, blockedVertices, blockedEdges):
+    if(source == target):
+        return [source]
+
+    adjacency = Graph._adj
+    forwardParents = {source: None}
+    backwardParents = {target: None}
+    forwardFrontier = [source]
+    backwardFrontier = [target]
+
+    while forwardFrontier and backwardFrontier:
+        # Expand the smaller side
+        if(len(forwardFrontier) <= len(backwardFrontier)):
+            frontier, parents, otherParents = forwardFrontier, forwardParents, backwardParents
+            forward = True
+        else:
+            frontier, parents, otherParents = backwardFrontier, backwardParents, forwardParents
+            forward = False
+
+        nextFrontier = []
+        meeting = None
+
+        for vertex in frontier:
+            for neighbor in adjacency[vertex]:
+                if(neighbor in parents or neighbor in blockedVertices):
+                    continue
+                if((vertex, neighbor) in blockedEdges):
+                    continue
+
+                parents[neighbor] = vertex
+                nextFrontier.append(neighbor)
+
+                if(neighbor in otherParents):
+                    meeting = neighbor
+                    break
+
+            if(meeting is not None):
+                break
+
+        if(meeting is not None):
+            return joinPaths(forwardParents, backwardParents, meeting)
+
+        if(forward):
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+
+    raise NetworkXNoPath("No path from {0} to {1}".format(source, target))
+
+# Path through the vertex where the two searches met, following each side's parents back to its start
+def joinPaths(forwardParents, backwardParents, meeting):
+    path = []
+    vertex = meeting
+    while vertex is not None:
+        path.append(vertex)
+        vertex = forwardParents[vertex]
+    path.reverse()
+
+    vertex = backwardParents[meeting]
+    while vertex is not None:
+        path.append(vertex)
+        vertex = backwardParents[vertex]
+
+    return path
+
+'''
+Cheapest path from source to target by edge weight, skipping the masked vertices and edges
+
+Raises NetworkXNoPath if the masks disconnect the target from the source
+'''
+def dijkstraPath(Graph, source, target, blockedVertices, blockedEdges):
+    adjacency = Graph._adj
+    distances = {source: 0}
+    parents = {source: None}
+    done = set()
+    order = count()
+    heap = [(0, next(order), source)]
+
+    while heap:
+        distance, _, vertex = heapq.heappop(heap)
+        if(vertex in done):
+            continue
+        done.add(vertex)
+
+        if(vertex == target):
+            path = []
+            while vertex is not None:
+                path.append(vertex)
+                vertex = parents[vertex]
+            path.reverse()
+            return path
+
+        for neighbor, data in adjacency[vertex].items():
+            if(neighbor in done or neighbor in blockedVertices or (vertex, neighbor) in blockedEdges):
+                continue
+
+            newDistance = distance + data.get(WEIGHT, 1)
+            if(newDistance < distances.get(neighbor, float('inf'))):
+                distances[neighbor] = newDistance
+                parents[neighbor] = vertex
+                heapq.heappush(heap, (newDistance, next(order), neighbor))
 
-    return A
\ No newline at end of file
+    raise NetworkXNoPath("No path from {0} to {1}".format(source, target))
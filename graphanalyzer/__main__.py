@@ -21,6 +21,7 @@ import GraphGenerator # Generate graphs via well-known algorithms
 import FigureGenerator
 import TestGenerator
 import Algorithms
+import Benchmark
 
 # Configuration
 import parseConfig as config
@@ -53,7 +54,7 @@ def main():
 
     # Generate a single graph of the given type
     if(typeOfTest == "single"):
-        graph = GraphGenerator.generateGraph(typeOfGraph, graphConfig["single"][typeOfGraph], seed=testSeed, graphDirectory=programConfig["graphs"], logDirectory=programConfig["results"]["log"])
+        graph = GraphGenerator.generateGraph(typeOfGraph, graphConfig["single"][typeOfGraph], seed=testSeed, graphDirectory=programConfig["graphs"], logDirectory=programConfig["results"]["log"], storeDirectory=args.graph_store)
 
         # Option if you want to see a picture of the graph (Graphviz-generated)
         if(args.picture):
@@ -73,5 +74,13 @@ def main():
     elif(typeOfTest == "test"):
         TestGenerator.run(graphConfig , programConfig, args)
 
+    # Run the benchmark suite (every algorithm on every graph family), exits with an error on regressions
+    elif(typeOfTest == "benchmark"):
+        algorithm = None if args.algorithm == "none" else ("remedy" if args.algorithm == "npaths" and args.remedy else args.algorithm)
+        rows, regressions = Benchmark.run(graphConfig["benchmark"], programConfig["results"]["log"], nameOfTest, algorithm=algorithm, storeBaseline=args.baseline)
+
+        if(regressions):
+            sys.exit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -10,14 +10,23 @@ def parseArgs():
     argParser = argparse.ArgumentParser(description="Graph and shortest path tree algorithm analysis script. Please update JSON config files before running.")
 
     # Tree algorithms
-    argParser.add_argument('algorithm', choices=["mta", "npaths", "bfs", "rsta", "da", "ya", "none"], help="tree algorithm to run on graph (or none).")
+    argParser.add_argument('algorithm', choices=["mta", "npaths", "bfs", "rsta", "sta", "da", "ya", "none"], help="tree algorithm to run on graph (or none).")
 
     # Tree algorithm modifiers
     argParser.add_argument('--root', default=0, metavar="vertex", help="the root of the tree (leave blank for none)")
     argParser.add_argument("--remedy", default=False, action="store_true", help="(MTA N-paths) m number of remedy paths, not any paths") # MTA N-paths, remedy paths
-    argParser.add_argument("-m", "--backups", default=2, type=int, metavar='numOfBackups', help="(MTA N-paths) number of backup paths, N = m+1") # MTA N-paths, number of additional paths
+    argParser.add_argument("-m", "--backups", default=2, type=int, metavar='numOfBackups', help="(MTA N-paths, YA) number of backup paths, N = m+1") # MTA N-paths, number of additional paths
     argParser.add_argument("-r", "--remove", type=int, nargs=2, metavar=('vertex1', 'vertex2'), help="(all algorithms, only MTA N-paths confirmed to work) remove edge to test algorithm recovery") # Allow the user to remove an edge from the graph (result is algorithm-dependent)
-    argParser.add_argument("-t", "--target", type=int, help="(YA) The target/sink for the algorithm")
+    argParser.add_argument("--step-model", default="textbook", choices=["textbook", "actual"], help="(DA) count steps with the textbook model (visits, neighbor and unvisited-set checks) or the operations actually performed")
+    argParser.add_argument("--sweep", default=False, action="store_true", help="(mta, npaths, rsta) converge once, then test the failure of every edge and write a per-edge results table")
+    argParser.add_argument("-w", "--workers", type=int, metavar="numOfWorkers", help="(sweep, YA) number of processes to spread the edge failures or targets over (default: all cores)")
+    argParser.add_argument("--trace", choices=["jsonl", "binary"], help="(all algorithms) also write algorithm events (deliveries, bundle updates, role changes, enqueues) to a structured trace file")
+    argParser.add_argument("--measure", default=False, action="store_true", help="(all algorithms) record the wall time, CPU time and peak memory of each algorithm phase to a metrics file")
+    argParser.add_argument("--cprofile", default=False, action="store_true", help="(all algorithms) measure like --measure and also write a cProfile dump of each phase")
+    argParser.add_argument("--baseline", default=False, action="store_true", help="(benchmark) store the results as the new baseline instead of comparing against it")
+    argParser.add_argument("-t", "--target", type=int, help="(YA) The target/sink for the algorithm (leave out for every vertex)")
+    argParser.add_argument("--graph-store", metavar="directory", help="(single graphs) read seeded, deterministic and graphml graphs from a store of compact .npz copies in this directory, generating and storing them the first time")
+    argParser.add_argument("--distance-cache", metavar="directory", help="(npaths) read hop distances from a memory-mapped all-pairs distance matrix cached in this directory (computed once per graph)")
 
     # Graph visualization
     argParser.add_argument("-p", "--picture", default=False, action="store_true", help="Save Graphviz-generated picture of graph") # Graphviz-based